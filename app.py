@@ -5,18 +5,28 @@ import time
 import logging
 import re
 import os
+import uuid
 from datetime import datetime
 
-from src.utils.file_loader import load_file
+from src.utils.crawler import crawl_text
 from src.utils.web_scraper import scrape_url
-from src.core.summarizer import summarize
-from src.core.qa import answer_question
+from src.core.qa import add_to_corpus, answer_from_corpus, answer_question_stream
+from src.ui.cache import (
+    cached_load_file, cached_summarize_stream, cached_text_stats, document_hash, get_cached_retriever,
+    remember_summary, summarize_file_stream
+)
+from src.utils.document_store import get_document_store, summary_params
+from src.utils.file_loader import compute_file_hash
+from src.utils.job_queue import DONE, FINISHED_STATUSES, QUEUED, get_job_queue
+from src.utils.search_index import get_search_index
+from src.utils.segmentation import preload_sentence_spans
 from src.ui.layout import render_layout
 from src.ui.components import (
     display_logo, info_card, success_box, info_box, error_box,
-    file_stats_display, qa_result, progress_steps, enhanced_sidebar_info, custom_metric
+    file_stats_display, qa_result, progress_steps, enhanced_sidebar_info, custom_metric,
+    progress_tracker, search_result, stream_output
 )
-from src.config import APP_CONFIG
+from src.config import APP_CONFIG, JOB_CONFIG, MODEL_CONFIG, SCRAPER_CONFIG, SEARCH_CONFIG, STORE_CONFIG
 
 # Thiết lập logging
 logger = logging.getLogger(__name__)
@@ -45,6 +55,149 @@ if 'current_step' not in st.session_state:
     st.session_state.current_step = 0
 if 'start_time' not in st.session_state:
     st.session_state.start_time = None
+if 'qa_index' not in st.session_state:
+    st.session_state.qa_index = None
+if 'doc_hash' not in st.session_state:
+    st.session_state.doc_hash = ""
+# Mã phiên và công việc nền nằm trong query params để không mất khi tải lại trang
+if 'owner' not in st.session_state:
+    st.session_state.owner = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.owner
+if 'job_id' not in st.session_state:
+    job_param = st.query_params.get("job", "")
+    st.session_state.job_id = int(job_param) if job_param.isdigit() else None
+
+# Chỉ gửi việc vào hàng đợi khi có worker đang chạy (python -m src.worker)
+job_queue = get_job_queue()
+background_jobs = job_queue is not None and job_queue.active_workers() > 0
+
+def index_document():
+    """Xây dựng chỉ mục hỏi đáp cho văn bản hiện tại, một lần cho mỗi tài liệu
+
+    Mã băm của văn bản được tính một lần ở đây và dùng làm khóa cache cho
+    các bước sau. Chỉ mục được cache theo mã băm nên không phải xây dựng lại
+    khi Streamlit chạy lại script. Tài liệu cũng được lưu vào kho tài liệu để
+    mở lại ở phiên sau, vào chỉ mục tìm kiếm toàn văn, và vào kho để hỏi đáp
+    trên nhiều tài liệu.
+    """
+    text = st.session_state.text
+    doc_hash = document_hash(text) if text else ""
+    if doc_hash != st.session_state.doc_hash:
+        # Bản tóm tắt của tài liệu trước không được dùng cho hỏi đáp hay tỷ lệ nén của tài liệu mới
+        st.session_state.summary = ""
+        st.session_state.pop("summary_length", None)
+        st.session_state.pop("summary_word_count", None)
+    st.session_state.doc_hash = doc_hash
+    if text and not text.startswith("Lỗi"):
+        store = get_document_store()
+        if store is not None:
+            try:
+                store.add(text, st.session_state.file_name, st.session_state.doc_hash)
+            except Exception as e:
+                logger.error(f"Lỗi khi lưu tài liệu vào kho: {str(e)}")
+        search_index = get_search_index()
+        if search_index is not None:
+            try:
+                search_index.add_document(st.session_state.doc_hash, st.session_state.file_name, text)
+            except Exception as e:
+                logger.error(f"Lỗi khi lập chỉ mục tìm kiếm: {str(e)}")
+        st.session_state.qa_index = get_cached_retriever(text, st.session_state.doc_hash)
+        if MODEL_CONFIG["qa"]["corpus"].get("enabled"):
+            try:
+                add_to_corpus(text, st.session_state.file_name, MODEL_CONFIG["qa"]["max_length"])
+            except Exception as e:
+                logger.error(f"Lỗi khi thêm tài liệu vào kho: {str(e)}")
+    else:
+        st.session_state.qa_index = None
+
+def open_stored_document(doc_hash: str) -> bool:
+    """Mở lại tài liệu đã phân tích từ kho tài liệu
+
+    Chỉ đọc văn bản, vị trí câu và bản tóm tắt gần nhất; thống kê và chỉ mục
+    hỏi đáp được đọc từ kho khi cần đến.
+
+    Args:
+        doc_hash: Mã băm của tài liệu
+
+    Returns:
+        True nếu mở được tài liệu
+    """
+    store = get_document_store()
+    info = store.info(doc_hash) if store is not None else None
+    text = store.text(doc_hash) if info is not None else None
+    if text is None:
+        return False
+
+    spans = store.sentence_spans(doc_hash)
+    if spans is not None:
+        preload_sentence_spans(text, spans)
+
+    st.session_state.text = text
+    st.session_state.file_name = info["name"]
+    index_document()
+
+    # Bản tóm tắt gần nhất, chỉ dùng nếu được tạo với cấu hình tóm tắt hiện tại
+    latest = store.latest(doc_hash, "summary")
+    if latest is not None:
+        params, summary = latest
+        length = params.split(":", 1)[0]
+        if params == summary_params(length):
+            st.session_state.summary = summary
+            st.session_state.summary_length = length
+            st.session_state.summary_word_count = len(summary.split())
+    st.session_state.current_step = 2 if st.session_state.summary else 1
+    return True
+
+def submit_job(kind: str, payload: dict):
+    """Gửi công việc vào hàng đợi nền và theo dõi trạng thái trong phiên hiện tại
+
+    Args:
+        kind: Loại công việc (xem src.worker.HANDLERS)
+        payload: Tham số của công việc
+    """
+    st.session_state.job_id = job_queue.submit(kind, payload, st.session_state.owner)
+    st.query_params["job"] = str(st.session_state.job_id)
+    st.session_state.current_step = 0 if kind != "summarize" else st.session_state.current_step
+
+def clear_job():
+    """Ngừng theo dõi công việc nền"""
+    st.session_state.job_id = None
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+@st.fragment(run_every=JOB_CONFIG.get("ui_poll_interval", 2))
+def job_status():
+    """Hiển thị trạng thái công việc nền, tự cập nhật cho tới khi công việc xong
+
+    Khi công việc hoàn thành, tài liệu (và bản tóm tắt) được mở từ kho tài liệu
+    rồi chạy lại toàn bộ trang để hiển thị kết quả.
+    """
+    job_id = st.session_state.job_id
+    job = job_queue.get(job_id) if job_id is not None else None
+    if job is None:
+        return
+
+    if job["status"] in FINISHED_STATUSES:
+        clear_job()
+        if job["status"] == DONE and open_stored_document(job["result"]["doc_hash"]):
+            st.session_state.job_message = ("success", "✅ Công việc nền đã hoàn thành!")
+        elif job["status"] == DONE:
+            st.session_state.job_message = ("error", "❌ Không đọc được kết quả từ kho tài liệu.")
+        else:
+            st.session_state.job_message = ("error", f"❌ {job['error'] or 'Công việc đã bị hủy.'}")
+        st.rerun()
+
+    labels = {"ingest_file": "Đang trích xuất tài liệu", "ingest_url": "Đang tải nội dung website",
+              "summarize": "Đang tóm tắt nội dung"}
+    label = labels.get(job["kind"], "Đang xử lý")
+    if job["status"] == QUEUED:
+        st.info(f"⏳ {label}: đang chờ worker ({job_queue.position(job_id)} công việc phía trước)")
+    else:
+        total = max(job["progress_total"], 1)
+        st.progress(min(job["progress_done"] / total, 1.0),
+                    text=f"⚙️ {label}... ({job['progress_done']}/{job['progress_total']})")
+    if st.button("Hủy công việc", key="cancel_job"):
+        job_queue.cancel(job_id)
 
 # Sidebar với logo và thông tin
 with st.sidebar:
@@ -75,6 +228,24 @@ with st.sidebar:
         label_visibility="collapsed"
     )
 
+    # Mở lại tài liệu đã phân tích ở các phiên trước
+    document_store = get_document_store()
+    recent_documents = document_store.recent(STORE_CONFIG.get("recent_limit", 20)) if document_store else []
+    if recent_documents:
+        with st.expander("📚 Tài liệu đã phân tích"):
+            # Mã băm rút gọn giúp phân biệt các tài liệu trùng tên
+            names = {doc["doc_hash"]: f"{doc['name']} ({doc['doc_hash'][:8]})" for doc in recent_documents}
+            selected_hash = st.selectbox(
+                "Chọn tài liệu",
+                options=list(names),
+                format_func=lambda doc_hash: names[doc_hash],
+                key="stored_document"
+            )
+            if st.button("Mở tài liệu", key="open_stored_document", use_container_width=True):
+                st.session_state.start_time = time.time()
+                if not open_stored_document(selected_hash):
+                    st.error("Không đọc được tài liệu từ kho.")
+
     # Thông tin về dữ liệu hiện tại với styling mới
     if st.session_state.text:
         st.markdown("""
@@ -91,9 +262,10 @@ with st.sidebar:
         """, unsafe_allow_html=True)
         
         # Sử dụng custom metrics
-        # Tính toán stats
-        word_count = len(st.session_state.text.split())
-        char_count = len(st.session_state.text)
+        # Lấy stats đã cache theo mã băm tài liệu
+        stats = cached_text_stats(st.session_state.doc_hash, st.session_state.text)
+        word_count = stats["word_count"]
+        char_count = stats["char_count"]
         
         # Hiển thị metrics trong sidebar
         st.markdown(f"""
@@ -186,6 +358,13 @@ process_steps = [
 
 progress_steps(process_steps, st.session_state.current_step)
 
+# Trạng thái công việc nền (kể cả sau khi tải lại trang) và thông báo kết quả
+if job_queue is not None and st.session_state.job_id is not None:
+    job_status()
+if st.session_state.get("job_message"):
+    kind, message = st.session_state.pop("job_message")
+    (success_box if kind == "success" else error_box)(message)
+
 # Container chính
 main_container = st.container()
 with main_container:
@@ -209,22 +388,56 @@ with main_container:
                 if file:
                     st.session_state.file_name = file.name
 
+                    # Tóm tắt các trang đầu trong lúc các trang sau còn đang được đọc
+                    summarize_while_loading = not background_jobs and st.checkbox(
+                        "Tóm tắt ngay trong lúc đọc tài liệu",
+                        key="summarize_while_loading",
+                        help="Bản tóm tắt (độ dài trung bình) được tạo dần theo từng trang thay vì chờ đọc xong cả file"
+                    )
+
                     if st.button("Xử lý tài liệu", key="process_file", use_container_width=True):
                         st.session_state.start_time = time.time()
-                        with st.spinner("Đang xử lý tài liệu..."):
-                            # Hiển thị tiến trình xử lý
-                            progress_bar = st.progress(0)
-                            for i in range(100):
-                                time.sleep(0.02)
-                                progress_bar.progress(i + 1)
-
-                            st.session_state.text = load_file(file)
-                            if st.session_state.text and not st.session_state.text.startswith("Lỗi"):
-                                st.session_state.current_step = 1  # Cập nhật bước
-                                success_box(f"✅ Đã xử lý thành công: <strong>{file.name}</strong>")
+                        if background_jobs:
+                            # Lưu file để worker đọc, tên file theo mã băm nên upload lại không tạo bản sao
+                            uploads_dir = JOB_CONFIG["uploads_dir"]
+                            os.makedirs(uploads_dir, exist_ok=True)
+                            upload_path = os.path.join(
+                                uploads_dir, compute_file_hash(file) + os.path.splitext(file.name)[1].lower()
+                            )
+                            with open(upload_path, "wb") as f:
+                                f.write(file.getbuffer())
+                            submit_job("ingest_file", {"path": upload_path, "name": file.name})
+                            st.rerun()
+                        if summarize_while_loading:
+                            on_progress = progress_tracker("Đang đọc và tóm tắt tài liệu")
+                            result = stream_output(summarize_file_stream(file, "medium", on_progress),
+                                                   "📝 Bản nháp theo từng trang")
+                            st.session_state.text = result["text"] if result["type"] == "done" else ""
+                            index_document()
+                            if result["type"] == "done":
+                                remember_summary(st.session_state.doc_hash, "medium", result["summary"])
+                                st.session_state.summary = result["summary"]
+                                st.session_state.summary_length = "medium"
+                                st.session_state.summary_word_count = len(result["summary"].split())
+                                st.session_state.current_step = 2
+                                success_box(f"✅ Đã xử lý và tóm tắt: <strong>{file.name}</strong>")
+                                st.caption(f"⚡ Kết quả đầu tiên sau {result['time_to_first_output']:.2f}s, "
+                                           f"hoàn thành sau {result['total_seconds']:.2f}s")
                                 st.balloons()
                             else:
-                                error_box(f"❌ {st.session_state.text}")
+                                error_box(f"❌ {result['message']}")
+                        else:
+                            with st.spinner("Đang xử lý tài liệu..."):
+                                # Tiến trình theo số trang thực tế đã trích xuất
+                                on_progress = progress_tracker("Đang trích xuất nội dung")
+                                st.session_state.text = cached_load_file(file, progress_callback=on_progress)
+                                index_document()
+                                if st.session_state.text and not st.session_state.text.startswith("Lỗi"):
+                                    st.session_state.current_step = 1  # Cập nhật bước
+                                    success_box(f"✅ Đã xử lý thành công: <strong>{file.name}</strong>")
+                                    st.balloons()
+                                else:
+                                    error_box(f"❌ {st.session_state.text}")
 
             elif input_type == "Nhập URL Website":
                 st.markdown("<h3>Phân tích Website</h3>", unsafe_allow_html=True)
@@ -232,18 +445,40 @@ with main_container:
 
                 url = st.text_input("Nhập URL website", placeholder="https://example.com", key="url_input")
 
+                crawl_pages = st.checkbox(
+                    "Thu thập nhiều trang cùng website",
+                    key="crawl_site",
+                    help="Đi theo các liên kết cùng website, tuân theo robots.txt và bỏ qua các trang trùng nội dung"
+                )
+                if crawl_pages:
+                    crawl_col1, crawl_col2 = st.columns(2)
+                    with crawl_col1:
+                        max_pages = st.number_input("Số trang tối đa", min_value=1, max_value=500,
+                                                    value=SCRAPER_CONFIG["crawl_max_pages"], key="crawl_max_pages")
+                    with crawl_col2:
+                        max_depth = st.number_input("Độ sâu liên kết", min_value=0, max_value=10,
+                                                    value=SCRAPER_CONFIG["crawl_max_depth"], key="crawl_max_depth")
+
                 if url:
                     if st.button("Trích xuất nội dung", key="extract_url", use_container_width=True):
                         st.session_state.start_time = time.time()
+                        if background_jobs:
+                            submit_job("ingest_url", {
+                                "url": url,
+                                "crawl": crawl_pages,
+                                "max_pages": int(max_pages) if crawl_pages else None,
+                                "max_depth": int(max_depth) if crawl_pages else None
+                            })
+                            st.rerun()
                         with st.spinner("Đang trích xuất nội dung từ website..."):
-                            # Hiển thị tiến trình xử lý
-                            progress_bar = st.progress(0)
-                            for i in range(100):
-                                time.sleep(0.01)
-                                progress_bar.progress(i + 1)
-
-                            st.session_state.text = scrape_url(url)
+                            if crawl_pages:
+                                # Tiến trình theo số trang đã thu thập
+                                on_progress = progress_tracker("Đang thu thập các trang")
+                                st.session_state.text = crawl_text(url, int(max_pages), int(max_depth), on_progress)
+                            else:
+                                st.session_state.text = scrape_url(url)
                             st.session_state.file_name = url
+                            index_document()
 
                             if st.session_state.text and not st.session_state.text.startswith("Lỗi"):
                                 st.session_state.current_step = 1  # Cập nhật bước
@@ -267,6 +502,7 @@ with main_container:
                         st.session_state.start_time = time.time()
                         st.session_state.text = text_input
                         st.session_state.file_name = "Văn bản nhập trực tiếp"
+                        index_document()
                         st.session_state.current_step = 1  # Cập nhật bước
                         success_box("✅ Đã nhận văn bản!")
 
@@ -284,6 +520,35 @@ with main_container:
             else:
                 info_box("Chưa có nội dung. Vui lòng nhập dữ liệu từ một trong các nguồn bên trái.")
 
+        # Tìm kiếm toàn văn trên mọi tài liệu đã phân tích
+        search_index = get_search_index()
+        if search_index is not None and len(search_index):
+            st.markdown("<h3>🔎 Tìm trong các tài liệu đã phân tích</h3>", unsafe_allow_html=True)
+            search_query = st.text_input(
+                "Từ khóa tìm kiếm",
+                placeholder='Ví dụ: "hà nội" kinh tế, nghiên*',
+                help='Không cần gõ dấu. Đặt cụm từ trong dấu nháy kép, thêm * để tìm theo tiền tố.',
+                key="search_query"
+            )
+            if search_query:
+                results = search_index.search(
+                    search_query,
+                    limit=SEARCH_CONFIG.get("max_results", 10),
+                    snippet_words=SEARCH_CONFIG.get("snippet_words", 30)
+                )
+                if not results:
+                    info_box("Không tìm thấy tài liệu nào phù hợp.")
+                document_store = get_document_store()
+                for result in results:
+                    search_result(result["name"], result["snippet"], result["highlights"])
+                    if document_store is not None and result["doc_hash"] in document_store:
+                        if st.button("Mở tài liệu này", key=f"open_result_{result['doc_hash']}"):
+                            st.session_state.start_time = time.time()
+                            if open_stored_document(result["doc_hash"]):
+                                st.rerun()
+                            else:
+                                error_box("❌ Không đọc được tài liệu từ kho.")
+
     # Tab tóm tắt
     with summary_tab:
         st.markdown("""
@@ -348,26 +613,34 @@ with main_container:
 
                 if st.button("🚀 Tạo bản tóm tắt", key="generate_summary", use_container_width=True):
                     st.session_state.start_time = time.time()
-                    with st.spinner("🤖 AI đang phân tích và tóm tắt nội dung..."):
-                        # Enhanced progress bar
-                        progress_container = st.container()
-                        with progress_container:
-                            progress_text = st.empty()
-                            progress_bar = st.progress(0)
-                            
-                            steps = ["Phân tích văn bản...", "Trích xuất ý chính...", "Tạo bản tóm tắt...", "Hoàn thành!"]
-                            
-                            for i in range(100):
-                                step_index = min(i // 25, len(steps) - 1)
-                                progress_text.markdown(f"**{steps[step_index]}** ({i+1}%)")
-                                time.sleep(0.03)
-                                progress_bar.progress(i + 1)
-
-                        st.session_state.summary = summarize(st.session_state.text, length)
+                    document_store = get_document_store()
+                    if (background_jobs and document_store is not None
+                            and st.session_state.doc_hash in document_store
+                            and document_store.get(st.session_state.doc_hash, "summary", summary_params(length)) is None):
+                        submit_job("summarize", {"doc_hash": st.session_state.doc_hash, "length": length})
+                        st.rerun()
+                    # Tiến trình theo số đoạn văn bản đã được tóm tắt, bản tóm tắt từng đoạn hiện dần
+                    on_progress = progress_tracker("Đang tóm tắt các đoạn văn bản")
+                    result = stream_output(
+                        cached_summarize_stream(
+                            st.session_state.text,
+                            st.session_state.doc_hash,
+                            length,
+                            progress_callback=on_progress
+                        ),
+                        "📝 Bản nháp theo từng đoạn"
+                    )
+                    if result["type"] == "done":
+                        st.session_state.summary = result["summary"]
                         st.session_state.summary_length = length
+                        st.session_state.summary_word_count = len(st.session_state.summary.split())
                         st.session_state.current_step = 2  # Cập nhật bước
                         st.success("🎉 Tóm tắt hoàn thành!")
+                        st.caption(f"⚡ Kết quả đầu tiên sau {result['time_to_first_output']:.2f}s, "
+                                   f"hoàn thành sau {result['total_seconds']:.2f}s")
                         st.balloons()
+                    else:
+                        error_box(f"❌ {result['message']}")
 
             with col2:
                 # Enhanced info panel
@@ -409,8 +682,9 @@ with main_container:
                     """, unsafe_allow_html=True)
 
                     if st.session_state.summary:
-                        words_count = len(st.session_state.summary.split())
-                        compression_ratio = 1 - (words_count / len(st.session_state.text.split()))
+                        words_count = st.session_state.summary_word_count
+                        stats = cached_text_stats(st.session_state.doc_hash, st.session_state.text)
+                        compression_ratio = 1 - (words_count / max(1, stats["word_count"]))
                         
                         st.markdown(f"""
                         <div style="
@@ -512,7 +786,7 @@ with main_container:
         </div>
         """, unsafe_allow_html=True)
 
-        if st.session_state.summary:
+        if st.session_state.text and not st.session_state.text.startswith("Lỗi"):
             # Enhanced question input section
             st.markdown("""
             <div class="card fade-in-up" style="
@@ -536,19 +810,28 @@ with main_container:
             </div>
             """, unsafe_allow_html=True)
 
+            # Nguồn trả lời: toàn bộ văn bản (dùng bản tóm tắt khi không tìm thấy) hoặc chỉ bản tóm tắt
+            qa_sources = ["Toàn bộ văn bản"]
+            if st.session_state.summary:
+                qa_sources.append("Bản tóm tắt")
+            if MODEL_CONFIG["qa"]["corpus"].get("enabled"):
+                qa_sources.append("Toàn bộ kho tài liệu")
+            qa_source = st.radio("📚 Trả lời dựa trên", options=qa_sources, horizontal=True, key="qa_source")
+
             # Hiển thị nội dung tóm tắt với enhanced styling
-            with st.expander("📖 Xem lại bản tóm tắt", expanded=False):
-                st.markdown(f"""
-                <div style="
-                    background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-                    border-radius: 15px;
-                    padding: 1.5rem;
-                    line-height: 1.7;
-                    color: #2c3e50;
-                ">
-                    {st.session_state.summary}
-                </div>
-                """, unsafe_allow_html=True)
+            if st.session_state.summary:
+                with st.expander("📖 Xem lại bản tóm tắt", expanded=False):
+                    st.markdown(f"""
+                    <div style="
+                        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
+                        border-radius: 15px;
+                        padding: 1.5rem;
+                        line-height: 1.7;
+                        color: #2c3e50;
+                    ">
+                        {st.session_state.summary}
+                    </div>
+                    """, unsafe_allow_html=True)
 
             # Enhanced suggestion buttons
             st.markdown("**💡 Câu hỏi gợi ý:**")
@@ -581,21 +864,27 @@ with main_container:
             if question:
                 if st.button("🔍 Tìm câu trả lời", key="answer_question", use_container_width=True):
                     with st.spinner("🤖 AI đang tìm câu trả lời..."):
-                        # Enhanced progress with steps
-                        progress_container = st.container()
-                        with progress_container:
-                            progress_text = st.empty()
-                            progress_bar = st.progress(0)
-                            
-                            steps = ["Phân tích câu hỏi...", "Tìm kiếm thông tin...", "Tạo câu trả lời...", "Hoàn thành!"]
-                            
-                            for i in range(100):
-                                step_index = min(i // 25, len(steps) - 1)
-                                progress_text.markdown(f"**{steps[step_index]}** ({i+1}%)")
-                                time.sleep(0.01)
-                                progress_bar.progress(i + 1)
-
-                        answer = answer_question(question, st.session_state.summary)
+                        # Tiến trình theo số từ của câu hỏi đã được tra chỉ mục
+                        on_progress = progress_tracker("Đang tìm kiếm thông tin")
+                        if qa_source == "Toàn bộ kho tài liệu":
+                            answer = answer_from_corpus(question, progress_callback=on_progress)
+                        else:
+                            # Đoạn liên quan hiện ngay sau bước truy xuất, trước khi có câu trả lời
+                            if qa_source == "Bản tóm tắt":
+                                events = answer_question_stream(question, st.session_state.summary,
+                                                                progress_callback=on_progress)
+                            else:
+                                if st.session_state.qa_index is None:
+                                    index_document()
+                                events = answer_question_stream(
+                                    question,
+                                    st.session_state.text,
+                                    summary=st.session_state.summary,
+                                    index=st.session_state.qa_index,
+                                    progress_callback=on_progress
+                                )
+                            result = stream_output(events, "📄 Đoạn văn bản liên quan")
+                            answer = result if result["type"] == "done" else result["message"]
 
                         # Hiển thị câu trả lời với enhanced styling
                         st.markdown("""
@@ -620,10 +909,18 @@ with main_container:
                                 confidence=answer.get('score', None)
                             )
                             st.success("✅ Tìm thấy câu trả lời!")
+                            if answer.get("source") == "summary":
+                                info_box("Không tìm thấy câu trả lời rõ ràng trong văn bản gốc, câu trả lời được lấy từ bản tóm tắt.")
+                            if answer.get("sources"):
+                                sources = "<br>".join(
+                                    f"📄 {source['name']} (đoạn {source['chunk'] + 1}, độ tương đồng {source['score']:.2f})"
+                                    for source in answer["sources"]
+                                )
+                                info_box(f"<strong>Nguồn:</strong><br>{sources}")
                         else:
                             error_box(f"❌ Lỗi: {answer}" if isinstance(answer, str) else "Không thể xử lý câu hỏi.")
         else:
-            error_box("⚠️ Vui lòng tạo bản tóm tắt trước khi sử dụng chức năng hỏi đáp.")
+            error_box("⚠️ Vui lòng nhập dữ liệu ở tab 'Nhập dữ liệu' trước khi sử dụng chức năng hỏi đáp.")
 
 # Enhanced Footer
 st.markdown("---")
@@ -0,0 +1 @@
+"""Các script đo hiệu năng của ứng dụng"""
\ No newline at end of file
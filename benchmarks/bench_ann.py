@@ -0,0 +1,71 @@
+"""Đo độ phủ (recall) và độ trễ của chỉ mục IVF so với tìm kiếm chính xác
+
+Chạy từ thư mục gốc của dự án:
+
+    python -m benchmarks.bench_ann --size 100000 --dim 384 --nprobe 1 4 8 16 32
+"""
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from src.core.ann_index import IVFIndex
+
+def build_dataset(size: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Tạo tập vector có cấu trúc cụm giống vector nhúng của các đoạn văn bản
+
+    Args:
+        size: Số vector
+        dim: Số chiều
+        clusters: Số chủ đề (cụm) sinh dữ liệu
+        seed: Hạt giống ngẫu nhiên
+
+    Returns:
+        Ma trận float32 đã chuẩn hóa L2
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size)] + 1.5 * rng.standard_normal((size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, top_k: int) -> np.ndarray:
+    """Tìm kiếm chính xác bằng một phép nhân ma trận - vector"""
+    scores = vectors @ query
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top[np.argsort(-scores[top])]
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000, help="Số vector trong chỉ mục")
+    parser.add_argument("--dim", type=int, default=384, help="Số chiều vector")
+    parser.add_argument("--queries", type=int, default=200, help="Số câu hỏi")
+    parser.add_argument("--top-k", type=int, default=10, help="Số kết quả mỗi câu hỏi")
+    parser.add_argument("--lists", type=int, default=None, help="Số cụm IVF, mặc định căn bậc hai số vector")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Các giá trị nprobe cần đo")
+    args = parser.parse_args(argv)
+
+    vectors = build_dataset(args.size + args.queries, args.dim, clusters=max(1, args.size // 500))
+    vectors, queries = vectors[:args.size], vectors[args.size:]
+
+    index = IVFIndex(args.dim, n_lists=args.lists, min_train_size=args.size)
+    start = time.perf_counter()
+    index.add(vectors)
+    print(f"Huấn luyện và thêm {args.size} vector: {time.perf_counter() - start:.2f}s ({len(index.centroids)} cụm)")
+
+    start = time.perf_counter()
+    truth = [set(exact_search(vectors, query, args.top_k).tolist()) for query in queries]
+    exact_ms = (time.perf_counter() - start) / args.queries * 1000
+
+    print(f"{'nprobe':>9} {'Recall@' + str(args.top_k):>10} {'Độ trễ (ms)':>12} {'Tăng tốc':>9}")
+    print(f"{'chính xác':>9} {1.0:>10.3f} {exact_ms:>12.3f} {1.0:>8.2f}x")
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        results = [index.search(query, top_k=args.top_k, nprobe=nprobe) for query in queries]
+        latency_ms = (time.perf_counter() - start) / args.queries * 1000
+        recall = np.mean([len(expected & {i for i, _ in found}) / args.top_k for expected, found in zip(truth, results)])
+        print(f"{nprobe:>9} {recall:>10.3f} {latency_ms:>12.3f} {exact_ms / latency_ms:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Đo tốc độ và kích thước đầu ra của các chế độ trích xuất HTML
+
+Chạy từ thư mục gốc của dự án, với thư mục các trang HTML đã lưu:
+
+    python -m benchmarks.bench_html_extraction --dir saved_pages/
+
+Nếu không chỉ định --dir, các trang mẫu có menu, sidebar, bình luận và bài
+viết chính được tạo sẵn trong bộ nhớ.
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from src.utils import html_extractor
+
+# Đoạn văn mẫu cho phần bài viết chính
+SAMPLE_PARAGRAPH = (
+    "Báo cáo phân tích tình hình hoạt động trong quý, với các số liệu chi tiết về doanh thu, "
+    "chi phí và lợi nhuận của từng bộ phận trong công ty."
+)
+
+def build_page(paragraphs: int, seed: int) -> bytes:
+    """Tạo một trang tin tức mẫu gồm phần điều hướng, sidebar, bài viết và bình luận
+
+    Args:
+        paragraphs: Số đoạn văn của bài viết
+        seed: Hạt giống ngẫu nhiên
+
+    Returns:
+        Nội dung HTML (UTF-8)
+    """
+    rng = random.Random(seed)
+    menu = "".join(f'<li><a href="/muc-{i}">Chuyên mục {i}</a></li>' for i in range(30))
+    related = "".join(f'<li><a href="/bai-{rng.randint(0, 10**6)}">Bài viết liên quan số {i} về chủ đề khác</a></li>'
+                      for i in range(20))
+    body = "".join(f"<p>{SAMPLE_PARAGRAPH} Đoạn {i}, mã {rng.randint(0, 10**6)}.</p>" for i in range(paragraphs))
+    comments = "".join(f'<div class="comment"><span>Độc giả {i}</span><p>Cảm ơn bài viết, rất hữu ích!</p></div>'
+                       for i in range(paragraphs // 4))
+    scripts = "".join(f"<script>window.dataLayer.push({{'event': 'view', 'id': {i}}});</script>" for i in range(20))
+    html = (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Trang {seed}</title>"
+        f"<style>body {{ font-family: sans-serif; }}</style>{scripts}</head><body>"
+        f"<header><div class='logo'>Báo mẫu</div></header><nav><ul>{menu}</ul></nav>"
+        f"<div class='container'><aside class='sidebar'><ul>{related}</ul></aside>"
+        f"<article class='article-content'><h1>Tiêu đề bài viết {seed}</h1>{body}</article>"
+        f"<div class='comments'>{comments}</div></div>"
+        f"<footer><p>Bản quyền thuộc về Báo mẫu.</p></footer></body></html>"
+    )
+    return html.encode("utf-8")
+
+def load_pages(directory: str) -> List[bytes]:
+    """Đọc các trang HTML đã lưu trong thư mục
+
+    Args:
+        directory: Thư mục chứa file .html/.htm
+
+    Returns:
+        Nội dung các trang
+    """
+    paths = sorted(p for p in Path(directory).rglob("*") if p.suffix.lower() in (".html", ".htm"))
+    return [path.read_bytes() for path in paths]
+
+def run_mode(extract: Callable[[bytes], str], pages: List[bytes], repeat: int):
+    """Đo thời gian tốt nhất để trích xuất toàn bộ trang
+
+    Args:
+        extract: Hàm trích xuất nhận nội dung HTML
+        pages: Các trang HTML
+        repeat: Số lần chạy
+
+    Returns:
+        (thời gian nhỏ nhất (giây), tổng số ký tự đầu ra)
+    """
+    best = float("inf")
+    output_chars = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output_chars = sum(len(extract(page)) for page in pages)
+        best = min(best, time.perf_counter() - start)
+    return best, output_chars
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=None, help="Thư mục các trang HTML đã lưu")
+    parser.add_argument("--pages", type=int, default=50, help="Số trang mẫu khi không có --dir")
+    parser.add_argument("--paragraphs", type=int, default=200, help="Số đoạn văn mỗi trang mẫu")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần chạy cho mỗi chế độ")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.dir) if args.dir else [build_page(args.paragraphs, seed) for seed in range(args.pages)]
+    if not pages:
+        print("Không có trang HTML nào để đo")
+        return
+    total_mb = sum(len(page) for page in pages) / (1024 * 1024)
+    print(f"{len(pages)} trang, {total_mb:.1f}MB HTML, lxml: {'có' if html_extractor.etree is not None else 'không'}")
+
+    modes = [(mode, lambda page, mode=mode: html_extractor.extract_text(page, mode=mode))
+             for mode in ("soup", "fast", "readability")]
+
+    print(f"{'Chế độ':>12} {'Thời gian (s)':>14} {'MB/s':>8} {'Tăng tốc':>9} {'Ký tự đầu ra':>14} {'So với soup':>12}")
+    baseline_time = baseline_chars = None
+    for name, extract in modes:
+        seconds, output_chars = run_mode(extract, pages, args.repeat)
+        if baseline_time is None:
+            baseline_time, baseline_chars = seconds, max(1, output_chars)
+        print(f"{name:>12} {seconds:>14.3f} {total_mb / seconds:>8.1f} {baseline_time / seconds:>8.2f}x "
+              f"{output_chars:>14,} {output_chars / baseline_chars:>11.0%}")
+
+if __name__ == "__main__":
+    main()
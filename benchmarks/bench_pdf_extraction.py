@@ -0,0 +1,82 @@
+"""Đo tốc độ trích xuất PDF tuần tự so với song song theo số trang
+
+Chạy từ thư mục gốc của dự án:
+
+    python -m benchmarks.bench_pdf_extraction --pages 10 50 100 200 --workers 4
+"""
+
+import argparse
+import io
+import os
+import time
+from typing import List
+
+import fitz
+
+from src.config import FILE_CONFIG
+from src.utils.file_loader import extract_text_from_pdf, extract_text_from_pdf_parallel
+
+# Đoạn văn mẫu để tạo trang PDF có mật độ chữ giống tài liệu thật
+SAMPLE_PARAGRAPH = (
+    "Báo cáo phân tích tình hình hoạt động trong quý với các số liệu chi tiết về doanh thu, "
+    "chi phí và lợi nhuận của từng bộ phận. "
+) * 6
+
+def build_pdf(page_count: int, lines_per_page: int = 45) -> bytes:
+    """Tạo file PDF mẫu trong bộ nhớ
+
+    Args:
+        page_count: Số trang
+        lines_per_page: Số dòng chữ trên mỗi trang
+
+    Returns:
+        Nội dung file PDF
+    """
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page()
+        text = "\n".join(f"{i}.{j} {SAMPLE_PARAGRAPH[:90]}" for j in range(lines_per_page))
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def time_call(func, data: bytes, repeat: int) -> float:
+    """Đo thời gian tốt nhất qua nhiều lần chạy
+
+    Args:
+        func: Hàm trích xuất nhận file object
+        data: Nội dung file PDF
+        repeat: Số lần chạy
+
+    Returns:
+        Thời gian nhỏ nhất (giây)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        file = io.BytesIO(data)
+        start = time.perf_counter()
+        func(file)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 100, 200], help="Các số trang cần đo")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Số tiến trình cho chế độ song song")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần chạy cho mỗi cấu hình")
+    args = parser.parse_args(argv)
+
+    # Bỏ giới hạn số trang và ngưỡng tối thiểu để đo đúng chế độ song song
+    FILE_CONFIG["max_pages"] = None
+    FILE_CONFIG["parallel_min_pages"] = 0
+
+    print(f"{'Trang':>6} {'Tuần tự (s)':>12} {'Song song (s)':>14} {'Tăng tốc':>9}")
+    for page_count in args.pages:
+        data = build_pdf(page_count)
+        serial = time_call(lambda f: extract_text_from_pdf(f, parallel=False), data, args.repeat)
+        parallel = time_call(lambda f: extract_text_from_pdf_parallel(f, workers=args.workers), data, args.repeat)
+        print(f"{page_count:>6} {serial:>12.3f} {parallel:>14.3f} {serial / parallel:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
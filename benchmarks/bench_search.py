@@ -0,0 +1,81 @@
+"""Đo tốc độ lập chỉ mục và độ trễ truy vấn của tìm kiếm toàn văn
+
+Chạy từ thư mục gốc của dự án:
+
+    python -m benchmarks.bench_search --docs 100000 --words 300
+
+Chỉ mục được tạo trong thư mục tạm với các tài liệu tiếng Việt ngẫu nhiên,
+không ảnh hưởng tới chỉ mục của ứng dụng.
+"""
+
+import argparse
+import hashlib
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from src.utils.search_index import SearchIndex
+
+# Từ vựng sinh tài liệu mẫu: từ phổ biến và tên riêng hiếm gặp hơn
+COMMON_WORDS = (
+    "báo cáo phân tích kinh tế tăng trưởng doanh thu chi phí lợi nhuận thị trường nghiên cứu "
+    "dữ liệu người dùng công ty dự án kế hoạch chính sách giáo dục đào tạo sức khỏe môi trường "
+    "phát triển đầu tư sản xuất xuất khẩu nhập khẩu ngân hàng tài chính công nghệ thông tin"
+).split()
+RARE_WORDS = ["Hà Nội", "Đà Nẵng", "Huế", "Cần Thơ", "Hải Phòng", "Quảng Ninh", "Đồng Nai", "Bình Dương"]
+
+# Các truy vấn được đo: từ phổ biến, từ hiếm không dấu, cụm từ, tiền tố, kết hợp
+QUERIES = ["kinh tế", "duong", '"ha noi"', "nghien*", '"da nang" dau tu', "quang* ninh", "khong co tu nay"]
+
+def build_document(words: int, rng: random.Random) -> str:
+    """Tạo một tài liệu mẫu
+
+    Args:
+        words: Số từ
+        rng: Bộ sinh ngẫu nhiên
+
+    Returns:
+        Văn bản
+    """
+    tokens = [rng.choice(COMMON_WORDS) for _ in range(words)]
+    for _ in range(max(1, words // 100)):
+        tokens[rng.randrange(words)] = rng.choice(RARE_WORDS)
+    return " ".join(tokens) + "."
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100000, help="Số tài liệu trong chỉ mục")
+    parser.add_argument("--words", type=int, default=300, help="Số từ mỗi tài liệu")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần chạy mỗi truy vấn")
+    parser.add_argument("--limit", type=int, default=10, help="Số kết quả mỗi truy vấn")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        index = SearchIndex(Path(directory) / "search.db")
+        start = time.perf_counter()
+        for i in range(args.docs):
+            text = build_document(args.words, rng)
+            index.add_document(hashlib.sha256(f"{i}:{text}".encode("utf-8")).hexdigest(), f"tai-lieu-{i}.pdf", text)
+        seconds = time.perf_counter() - start
+        print(f"Lập chỉ mục {args.docs} tài liệu ({args.words} từ): {seconds:.1f}s ({args.docs / seconds:.0f} tài liệu/s)")
+
+        start = time.perf_counter()
+        index.optimize()
+        print(f"Gộp segment: {time.perf_counter() - start:.1f}s")
+
+        print(f"{'Truy vấn':>22} {'Kết quả':>8} {'Trung vị (ms)':>14} {'Lớn nhất (ms)':>14}")
+        for query in QUERIES:
+            timings, results = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = index.search(query, limit=args.limit)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{query:>22} {len(results):>8} {statistics.median(timings):>14.1f} {max(timings):>14.1f}")
+        index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Kiểm tra tải HTTP API (src.api) với nhiều client đồng thời
+
+Chạy từ thư mục gốc của dự án:
+
+    python -m benchmarks.load_test_api --concurrency 200 --requests 5000
+
+Không truyền --url thì script tự khởi động `python -m src.api` trên một cổng
+trống và dừng server khi xong. Các tài liệu mẫu được gửi một lần qua /stats
+để lấy doc_hash, sau đó các client gửi xen kẽ /summarize, /qa và /stats theo
+doc_hash. Kết quả gồm số request mỗi giây, độ trễ p50/p95/p99 và số lỗi theo
+mã trạng thái của từng endpoint. Với --stream, /summarize và /qa được gọi qua
+endpoint server-sent events và thời gian tới sự kiện đầu tiên được báo riêng.
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from benchmarks.bench_search import build_document
+
+# Câu hỏi gửi tới /qa
+QUESTIONS = ["Doanh thu tăng trưởng thế nào?", "Chính sách giáo dục là gì?",
+             "Văn bản nói về gì?", "Kết luận của báo cáo là gì?"]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout: float = 120):
+    """Chờ server trả lời /health"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server {url} không phản hồi sau {timeout}s")
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+async def run_load(url: str, concurrency: int, requests: int, docs: int, words: int,
+                   endpoints: List[str], stream: bool = False, seed: int = 0):
+    rng = random.Random(seed)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await wait_ready(session, url)
+
+        # Gửi văn bản mẫu một lần, các request sau chỉ dùng doc_hash
+        doc_hashes = []
+        for i in range(docs):
+            text = build_document(words, rng)
+            async with session.post(f"{url}/stats", json={"text": text, "name": f"load-test-{i}"}) as response:
+                doc_hashes.append((await response.json())["doc_hash"])
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        first_outputs: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Counter] = defaultdict(Counter)
+        remaining = requests
+
+        async def client():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                endpoint = rng.choice(endpoints)
+                body = {"doc_hash": rng.choice(doc_hashes)}
+                if endpoint == "summarize":
+                    body["length"] = rng.choice(["short", "medium", "long"])
+                elif endpoint == "qa":
+                    body["question"] = rng.choice(QUESTIONS)
+                streamed = stream and endpoint != "stats"
+                first_output = None
+                start = time.perf_counter()
+                try:
+                    path = f"{url}/{endpoint}/stream" if streamed else f"{url}/{endpoint}"
+                    async with session.post(path, json=body) as response:
+                        if streamed:
+                            async for line in response.content:
+                                if first_output is None and line.startswith(b"event:"):
+                                    first_output = (time.perf_counter() - start) * 1000
+                        else:
+                            await response.read()
+                        status = response.status
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = type(e).__name__
+                latencies[endpoint].append((time.perf_counter() - start) * 1000)
+                if first_output is not None:
+                    first_outputs[endpoint].append(first_output)
+                statuses[endpoint][status] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        seconds = time.perf_counter() - start
+
+    print(f"{requests} request, {concurrency} client đồng thời, {docs} tài liệu ({words} từ): "
+          f"{seconds:.1f}s ({requests / seconds:.0f} request/s)")
+    print(f"{'Endpoint':>10} {'Số request':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'Lớn nhất':>9} {'Đầu tiên p50':>13}  Mã trạng thái")
+    for endpoint in endpoints:
+        values = latencies[endpoint]
+        if not values:
+            continue
+        codes = ", ".join(f"{code}: {count}" for code, count in sorted(statuses[endpoint].items(), key=str))
+        # Thời gian tới sự kiện đầu tiên chỉ có với endpoint dạng luồng
+        first = f"{statistics.median(first_outputs[endpoint]):.1f}" if first_outputs[endpoint] else "-"
+        print(f"{endpoint:>10} {len(values):>11} {statistics.median(values):>9.1f} {percentile(values, 0.95):>9.1f} "
+              f"{percentile(values, 0.99):>9.1f} {max(values):>9.1f} {first:>13}  {codes}")
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Địa chỉ API đang chạy, mặc định tự khởi động server")
+    parser.add_argument("--concurrency", type=int, default=200, help="Số client đồng thời")
+    parser.add_argument("--requests", type=int, default=2000, help="Tổng số request")
+    parser.add_argument("--docs", type=int, default=20, help="Số tài liệu mẫu")
+    parser.add_argument("--words", type=int, default=2000, help="Số từ mỗi tài liệu")
+    parser.add_argument("--endpoints", nargs="+", default=["summarize", "qa", "stats"],
+                        choices=["summarize", "qa", "stats"], help="Các endpoint được gửi")
+    parser.add_argument("--stream", action="store_true",
+                        help="Gọi /summarize/stream và /qa/stream, đo thời gian tới kết quả đầu tiên")
+    args = parser.parse_args(argv)
+
+    server: Optional[subprocess.Popen] = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen([sys.executable, "-m", "src.api", "--port", str(port)])
+    try:
+        asyncio.run(run_load(url.rstrip("/"), args.concurrency, args.requests, args.docs, args.words,
+                             args.endpoints, args.stream))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+"""HTTP API (JSON) cho các bước phân tích, dùng từ các dịch vụ khác
+
+Ví dụ:
+
+    python -m src.api --host 0.0.0.0 --port 8080
+
+Các endpoint:
+    GET  /health      trạng thái server và thống kê cache HTTP của scraper
+    POST /load_file   upload file PDF/Word (multipart, trường "file", hoặc body là nội dung file với ?name=)
+    POST /scrape      {"url": ..., "crawl": false, "max_pages": null, "max_depth": null}
+    POST /summarize   {"text" hoặc "doc_hash", "length": "medium"}
+    POST /qa          {"question": ..., "text" hoặc "doc_hash"}
+    POST /stats       {"text" hoặc "doc_hash"}
+    POST /summarize/stream, /qa/stream
+                      như trên, trả về server-sent events ("partial", "token", "done" hoặc "error")
+
+Văn bản nhận được (từ file, URL hoặc gửi trực tiếp) được lưu vào kho tài liệu
+và trả về kèm doc_hash, nên các request sau chỉ cần gửi doc_hash. Kho tài liệu,
+chỉ mục BM25 và mô hình dùng chung với giao diện và worker, nên bản tóm tắt
+hay thống kê đã có không phải tính lại.
+
+Việc tính toán chạy trong một nhóm luồng có giới hạn (API_CONFIG["compute_workers"]),
+các request trùng nhau đang chạy được gộp thành một lần tính, và khi số
+request chờ vượt API_CONFIG["max_waiting"] server trả về 503 thay vì để hàng
+đợi tăng vô hạn. Lỗi được trả về dạng {"error": "..."}.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+from src.config import API_CONFIG, APP_CONFIG, FILE_CONFIG, JOB_CONFIG, MODEL_CONFIG, SCRAPER_CONFIG
+from src.core.qa import answer_question, answer_question_stream, get_retriever
+from src.core.summarizer import LENGTH_CONFIG, summarize, summarize_stream
+from src.utils.crawler import iter_crawl_async, join_pages
+from src.utils.document_store import get_document_store, summary_params
+from src.utils.file_loader import load_file
+from src.utils.http_cache import get_http_cache
+from src.utils.search_index import get_search_index
+from src.utils.text_processor import analyze_text_stats
+from src.utils.web_scraper import create_session, fetch_url
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Kích thước mỗi lần đọc file upload
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Mã băm tài liệu hợp lệ (SHA-256 dạng hex)
+_DOC_HASH = re.compile(r"[0-9a-f]{64}")
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+def _http_error(error_class: type, message: str, **kwargs) -> web.HTTPException:
+    return error_class(text=json.dumps({"error": message}, ensure_ascii=False),
+                       content_type="application/json", **kwargs)
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    """Mã hóa một sự kiện dạng server-sent event"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+
+def _is_error(text: str) -> bool:
+    """Các hàm xử lý trả về thông báo lỗi thay vì ném ngoại lệ"""
+    return text.startswith(("Lỗi", "Đã xảy ra lỗi"))
+
+class Limiter:
+    """Giới hạn số việc chạy đồng thời, từ chối khi quá nhiều việc đang chờ"""
+
+    def __init__(self, concurrency: int, max_waiting: int):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._max_waiting = max_waiting
+        self.waiting = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self.waiting >= self._max_waiting:
+            raise _http_error(web.HTTPServiceUnavailable, "Server đang quá tải, vui lòng thử lại sau",
+                              headers={"Retry-After": "1"})
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+class AnalysisService:
+    """Trạng thái dùng chung giữa các request: nhóm luồng, giới hạn, cache văn bản"""
+
+    def __init__(self, config: Dict[str, Any] = API_CONFIG):
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=config["compute_workers"], thread_name_prefix="api")
+        # Đọc/ghi kho tài liệu chạy ở nhóm luồng riêng để kết quả đã có không phải chờ sau các phép tính
+        self.io_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="api-io")
+        self.compute: Optional[Limiter] = None
+        self.scrapes: Optional[Limiter] = None
+        self.session = None
+        self.store = get_document_store()
+        self.search_index = get_search_index()
+        # Văn bản theo mã băm: giữ cùng một đối tượng chuỗi để các cache theo văn bản tra nhanh
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        # Câu trả lời theo (mã băm, câu hỏi, cấu hình truy xuất)
+        self._answers: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Các phép tính đang chạy, request trùng khóa chờ cùng một kết quả
+        self._inflight: Dict[Tuple, "asyncio.Future"] = {}
+
+    async def start(self, app: web.Application):
+        # Semaphore và phiên aiohttp phải được tạo trong event loop của server
+        self.compute = Limiter(self.config["compute_workers"], self.config["max_waiting"])
+        self.scrapes = Limiter(self.config["max_concurrent_scrapes"], self.config["max_waiting"])
+        self.session = create_session()
+
+    async def stop(self, app: web.Application):
+        await self.session.close()
+        self.executor.shutdown(wait=False)
+        self.io_executor.shutdown(wait=False)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Chạy hàm tốn CPU trong nhóm luồng, trong giới hạn số việc đồng thời"""
+        async with self.compute.slot():
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def run_once(self, key: Tuple, func: Callable[..., Any], *args) -> Any:
+        """Như run, nhưng các request cùng khóa đang chạy dùng chung một lần tính
+
+        Request bị ngắt kết nối không hủy phép tính mà các request khác đang chờ.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.run(func, *args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def io(self, func: Callable[..., Any], *args) -> Any:
+        """Chạy thao tác đọc/ghi kho tài liệu, không tính vào giới hạn tính toán"""
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, func, *args)
+
+    def remember(self, text: str, name: str) -> str:
+        """Lưu văn bản vào kho tài liệu (nếu bật) và cache trong bộ nhớ
+
+        Args:
+            text: Văn bản
+            name: Tên hiển thị
+
+        Returns:
+            Mã băm của văn bản
+        """
+        doc_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            known = doc_hash in self._texts
+            text = self._texts.setdefault(doc_hash, text)
+            self._texts.move_to_end(doc_hash)
+            while len(self._texts) > self.config["max_documents"]:
+                self._texts.popitem(last=False)
+        if not known and self.store is not None and doc_hash not in self.store:
+            self.store.add(text, name, doc_hash)
+            if self.search_index is not None:
+                self.search_index.add_document(doc_hash, name, text)
+        return doc_hash
+
+    def text(self, doc_hash: str) -> Optional[str]:
+        """Văn bản theo mã băm, từ bộ nhớ hoặc kho tài liệu"""
+        with self._lock:
+            text = self._texts.get(doc_hash)
+            if text is not None:
+                self._texts.move_to_end(doc_hash)
+                return text
+        text = self.store.text(doc_hash) if self.store is not None else None
+        if text is not None:
+            with self._lock:
+                text = self._texts.setdefault(doc_hash, text)
+        return text
+
+    async def document(self, data: Dict[str, Any]) -> Tuple[str, str]:
+        """Đọc văn bản của request từ "text" hoặc "doc_hash"
+
+        Returns:
+            (mã băm, văn bản)
+
+        Raises:
+            web.HTTPException: Khi thiếu văn bản hoặc không tìm thấy doc_hash
+        """
+        text = data.get("text")
+        if isinstance(text, str) and text.strip():
+            doc_hash = await self.io(self.remember, text, str(data.get("name") or "Văn bản từ API"))
+            return doc_hash, text
+
+        doc_hash = data.get("doc_hash")
+        if not isinstance(doc_hash, str) or not _DOC_HASH.fullmatch(doc_hash):
+            raise _http_error(web.HTTPBadRequest, "Cần \"text\" hoặc \"doc_hash\"")
+        text = await self.io(self.text, doc_hash)
+        if text is None:
+            raise _http_error(web.HTTPNotFound, f"Không tìm thấy tài liệu {doc_hash}")
+        return doc_hash, text
+
+    def stored(self, doc_hash: str, kind: str, params: str = "") -> Optional[Any]:
+        """Kết quả đã lưu trong kho tài liệu hoặc None"""
+        return self.store.get(doc_hash, kind, params) if self.store is not None else None
+
+    # Các phép tính chạy trong nhóm luồng tính toán, lưu kết quả vào kho tài liệu
+
+    def summarize_document(self, doc_hash: str, text: str, length: str, params: str) -> str:
+        summary = summarize(text, length)
+        if self.store is not None and not _is_error(summary):
+            self.store.put(doc_hash, "summary", summary, params)
+        return summary
+
+    def text_stats(self, doc_hash: str, text: str) -> Dict[str, Any]:
+        stats = analyze_text_stats(text)
+        if self.store is not None:
+            self.store.put(doc_hash, "stats", stats)
+        return stats
+
+    def retriever(self, doc_hash: str, text: str):
+        """Bộ truy xuất của tài liệu, chỉ mục BM25 được lưu trong kho tài liệu"""
+        chunk_size = MODEL_CONFIG["qa"]["max_length"]
+        directory = self.store.path(doc_hash, f"bm25-c{chunk_size}") if self.store is not None else None
+        return get_retriever(text, chunk_size, directory)
+
+    def _remember_answer(self, key: Tuple[str, str, str], result: Dict[str, Any]):
+        with self._lock:
+            self._answers[key] = result
+            while len(self._answers) > self.config["max_answers"]:
+                self._answers.popitem(last=False)
+
+    def answer(self, key: Tuple[str, str, str], text: str, question: str) -> Any:
+        result = answer_question(question, text, index=self.retriever(key[0], text))
+        if isinstance(result, dict):
+            self._remember_answer(key, result)
+        return result
+
+    # Các luồng sự kiện, chạy trong nhóm luồng tính toán bởi stream_events
+
+    def summary_events(self, doc_hash: str, text: str, length: str, params: str) -> Iterator[Dict[str, Any]]:
+        for event in summarize_stream(text, length):
+            if event["type"] == "done" and self.store is not None:
+                self.store.put(doc_hash, "summary", event["summary"], params)
+            yield event
+
+    def answer_events(self, key: Tuple[str, str, str], text: str, question: str) -> Iterator[Dict[str, Any]]:
+        for event in answer_question_stream(question, text, index=self.retriever(key[0], text)):
+            if event["type"] == "done":
+                self._remember_answer(key, {"answer": event["answer"], "score": event["score"]})
+            yield event
+
+    async def stream_events(self, request: web.Request,
+                            make_events: Callable[[], Iterator[Dict[str, Any]]]) -> web.StreamResponse:
+        """Chạy một luồng sự kiện trong nhóm luồng tính toán và gửi dạng server-sent events
+
+        Client ngắt kết nối thì luồng sự kiện dừng ở sự kiện tiếp theo.
+
+        Args:
+            request: Request HTTP
+            make_events: Hàm tạo luồng sự kiện (chạy trong luồng tính toán)
+
+        Returns:
+            Response dạng text/event-stream
+        """
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        stopped = threading.Event()
+
+        def produce():
+            events = make_events()
+            try:
+                for event in events:
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as e:
+                logger.exception("Lỗi khi tạo luồng sự kiện")
+                error = {"type": "error", "message": f"Đã xảy ra lỗi khi xử lý: {str(e)}"}
+                loop.call_soon_threadsafe(queue.put_nowait, error)
+            finally:
+                events.close()
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        async with self.compute.slot():
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+            await response.prepare(request)
+            future = loop.run_in_executor(self.executor, produce)
+            try:
+                event = await queue.get()
+                while event is not None:
+                    await response.write(_sse(event))
+                    event = await queue.get()
+                await response.write_eof()
+            finally:
+                stopped.set()
+                # Giữ chỗ tính toán cho tới khi luồng sự kiện thật sự dừng
+                await asyncio.shield(future)
+        return response
+
+    def cached_answer(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        """Câu trả lời đã tính cho cùng tài liệu, câu hỏi và cấu hình"""
+        with self._lock:
+            result = self._answers.get(key)
+            if result is not None:
+                self._answers.move_to_end(key)
+            return result
+
+async def _json_body(request: web.Request) -> Dict[str, Any]:
+    try:
+        data = await request.json()
+    except ValueError:
+        raise _http_error(web.HTTPBadRequest, "Body phải là JSON")
+    if not isinstance(data, dict):
+        raise _http_error(web.HTTPBadRequest, "Body phải là một object JSON")
+    return data
+
+def _crawl_limit(data: Dict[str, Any], name: str, minimum: int, maximum: int) -> Optional[int]:
+    """Đọc giới hạn thu thập (max_pages, max_depth) từ body, không vượt quá giới hạn trong SCRAPER_CONFIG"""
+    value = data.get(name)
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (bool, float)):
+            raise ValueError(value)
+        value = int(value)
+    except (TypeError, ValueError):
+        raise _http_error(web.HTTPBadRequest, f"{name} phải là số nguyên")
+    if value < minimum:
+        raise _http_error(web.HTTPBadRequest, f"{name} phải lớn hơn hoặc bằng {minimum}")
+    return min(value, maximum)
+
+def _service(request: web.Request) -> AnalysisService:
+    return request.app["service"]
+
+async def health(request: web.Request) -> web.Response:
+    service = _service(request)
+    # Tỷ lệ dùng lại trang đã lưu của cache HTTP, để theo dõi hiệu quả của cache scraper
+    http_cache = get_http_cache()
+    return web.json_response({
+        "status": "ok",
+        "version": APP_CONFIG["version"],
+        "waiting": service.compute.waiting + service.scrapes.waiting,
+        "in_flight": len(service._inflight),
+        "http_cache": await service.io(http_cache.stats) if http_cache is not None else None
+    })
+
+async def load_file_handler(request: web.Request) -> web.Response:
+    service = _service(request)
+    max_bytes = service.config["max_upload_mb"] * 1024 * 1024
+
+    # Nhận file theo từng phần vào file tạm, không giữ cả file trong bộ nhớ
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        part = await reader.next()
+        while part is not None and part.name != "file":
+            part = await reader.next()
+        if part is None:
+            return _error(400, "Thiếu trường \"file\"")
+        name = part.filename or request.query.get("name", "")
+        read_chunk = lambda: part.read_chunk(UPLOAD_CHUNK_SIZE)
+    else:
+        name = request.query.get("name", "")
+        read_chunk = lambda: request.content.read(UPLOAD_CHUNK_SIZE)
+
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension not in FILE_CONFIG["allowed_extensions"]:
+        return _error(415, f"Chỉ hỗ trợ file {', '.join(FILE_CONFIG['allowed_extensions'])}")
+
+    uploads_dir = JOB_CONFIG["uploads_dir"]
+    os.makedirs(uploads_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=uploads_dir, prefix="api-", suffix=f".{extension}")
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await read_chunk()
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    return _error(413, f"File vượt quá {service.config['max_upload_mb']}MB")
+                f.write(chunk)
+
+        # File trên đĩa cho phép trích xuất PDF song song (FILE_CONFIG["parallel_extraction"])
+        def extract() -> str:
+            with open(path, "rb") as file:
+                return load_file(file)
+
+        text = await service.run(extract)
+    finally:
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+
+    if _is_error(text):
+        return _error(422, text)
+    doc_hash = await service.io(service.remember, text, name)
+    return web.json_response({"doc_hash": doc_hash, "name": name, "char_count": len(text), "text": text})
+
+async def scrape_handler(request: web.Request) -> web.Response:
+    service = _service(request)
+    data = await _json_body(request)
+    url = data.get("url")
+    if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+        return _error(400, "URL không hợp lệ")
+
+    max_pages = _crawl_limit(data, "max_pages", 1, SCRAPER_CONFIG.get("crawl_max_pages", 50))
+    max_depth = _crawl_limit(data, "max_depth", 0, SCRAPER_CONFIG.get("crawl_max_depth", 2))
+
+    # Trích xuất HTML và đọc/ghi cache HTTP chạy trong nhóm luồng I/O, không chặn event loop
+    async with service.scrapes.slot():
+        if data.get("crawl"):
+            pages = [page async for page in iter_crawl_async(url, max_pages, max_depth, executor=service.io_executor)]
+            text = join_pages(pages) if pages else "Lỗi: Không thu thập được trang nào từ website."
+        else:
+            text = await fetch_url(service.session, url, service.io_executor)
+
+    if _is_error(text):
+        return _error(502, text)
+    doc_hash = await service.io(service.remember, text, url)
+    return web.json_response({"doc_hash": doc_hash, "url": url, "char_count": len(text), "text": text})
+
+async def summarize_handler(request: web.Request) -> web.Response:
+    service = _service(request)
+    data = await _json_body(request)
+    length = data.get("length", "medium")
+    if length not in LENGTH_CONFIG:
+        return _error(400, f"length phải là một trong {', '.join(LENGTH_CONFIG)}")
+
+    doc_hash, text = await service.document(data)
+    params = summary_params(length)
+    summary = await service.io(service.stored, doc_hash, "summary", params)
+    if summary is None:
+        summary = await service.run_once(("summary", doc_hash, params), service.summarize_document,
+                                         doc_hash, text, length, params)
+    if _is_error(summary):
+        return _error(500, summary)
+    return web.json_response({"doc_hash": doc_hash, "length": length, "summary": summary})
+
+async def qa_handler(request: web.Request) -> web.Response:
+    service = _service(request)
+    data = await _json_body(request)
+    question = data.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return _error(400, "Câu hỏi không hợp lệ")
+
+    doc_hash, text = await service.document(data)
+    key = (doc_hash, question.strip(), repr(sorted(MODEL_CONFIG["qa"]["retriever"].items())))
+    result = service.cached_answer(key)
+    if result is None:
+        result = await service.run_once(("qa",) + key, service.answer, key, text, question)
+    if not isinstance(result, dict):
+        return _error(422 if not _is_error(result) else 500, result)
+    return web.json_response({"doc_hash": doc_hash, **result})
+
+async def stats_handler(request: web.Request) -> web.Response:
+    service = _service(request)
+    data = await _json_body(request)
+    doc_hash, text = await service.document(data)
+    stats = await service.io(service.stored, doc_hash, "stats")
+    if stats is None:
+        stats = await service.run_once(("stats", doc_hash), service.text_stats, doc_hash, text)
+    return web.json_response({"doc_hash": doc_hash, **stats})
+
+async def _send_events(request: web.Request, events: List[Dict[str, Any]]) -> web.StreamResponse:
+    """Gửi các sự kiện đã có sẵn (kết quả đã lưu) dạng server-sent events, không chiếm chỗ tính toán"""
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    for event in events:
+        await response.write(_sse(event))
+    await response.write_eof()
+    return response
+
+async def summarize_stream_handler(request: web.Request) -> web.StreamResponse:
+    service = _service(request)
+    data = await _json_body(request)
+    length = data.get("length", "medium")
+    if length not in LENGTH_CONFIG:
+        return _error(400, f"length phải là một trong {', '.join(LENGTH_CONFIG)}")
+
+    doc_hash, text = await service.document(data)
+    params = summary_params(length)
+    summary = await service.io(service.stored, doc_hash, "summary", params)
+    if summary is not None:
+        return await _send_events(request, [
+            {"type": "done", "summary": summary, "time_to_first_output": 0.0, "total_seconds": 0.0}
+        ])
+    return await service.stream_events(request, lambda: service.summary_events(doc_hash, text, length, params))
+
+async def qa_stream_handler(request: web.Request) -> web.StreamResponse:
+    service = _service(request)
+    data = await _json_body(request)
+    question = data.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return _error(400, "Câu hỏi không hợp lệ")
+
+    doc_hash, text = await service.document(data)
+    key = (doc_hash, question.strip(), repr(sorted(MODEL_CONFIG["qa"]["retriever"].items())))
+    result = service.cached_answer(key)
+    if result is not None:
+        return await _send_events(request, [
+            {"type": "token", "text": result["answer"]},
+            {"type": "done", **result, "time_to_first_output": 0.0, "total_seconds": 0.0}
+        ])
+    return await service.stream_events(request, lambda: service.answer_events(key, text, question))
+
+def create_app(config: Dict[str, Any] = API_CONFIG) -> web.Application:
+    """Tạo ứng dụng aiohttp với các endpoint phân tích
+
+    Args:
+        config: Cấu hình như API_CONFIG
+
+    Returns:
+        Ứng dụng aiohttp
+    """
+    app = web.Application(client_max_size=config["max_body_mb"] * 1024 * 1024)
+    service = AnalysisService(config)
+    app["service"] = service
+    app.on_startup.append(service.start)
+    app.on_cleanup.append(service.stop)
+    app.router.add_get("/health", health)
+    app.router.add_post("/load_file", load_file_handler)
+    app.router.add_post("/scrape", scrape_handler)
+    app.router.add_post("/summarize", summarize_handler)
+    app.router.add_post("/summarize/stream", summarize_stream_handler)
+    app.router.add_post("/qa", qa_handler)
+    app.router.add_post("/qa/stream", qa_stream_handler)
+    app.router.add_post("/stats", stats_handler)
+    return app
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m src.api", description="HTTP API tóm tắt, hỏi đáp và thống kê tài liệu")
+    parser.add_argument("--host", default=API_CONFIG["host"], help="Địa chỉ lắng nghe")
+    parser.add_argument("--port", type=int, default=API_CONFIG["port"], help="Cổng lắng nghe")
+    parser.add_argument("--compute-workers", type=int, default=API_CONFIG["compute_workers"],
+                        help="Số luồng tính toán")
+    args = parser.parse_args(argv)
+
+    config = {**API_CONFIG, "compute_workers": args.compute_workers}
+    # Hàng đợi kết nối lớn để chịu được nhiều client kết nối cùng lúc
+    web.run_app(create_app(config), host=args.host, port=args.port, backlog=1024, access_log=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Xử lý hàng loạt tài liệu từ dòng lệnh, không cần giao diện Streamlit
+
+Ví dụ:
+
+    python -m src.batch ./documents -o results.jsonl --workers 4
+    python -m src.batch "archive/**/*.pdf" -o results.jsonl --length short
+
+Mỗi tài liệu được xử lý qua load_file → summarize → analyze_text_stats và ghi
+thành một dòng JSON. Chạy lại cùng lệnh sẽ bỏ qua các file đã có trong file
+kết quả, nên có thể tiếp tục sau khi bị gián đoạn. Với --index, các tài liệu
+được thêm vào kho hỏi đáp nhiều tài liệu (xem MODEL_CONFIG["qa"]["corpus"])
+và chỉ mục tìm kiếm toàn văn (SEARCH_CONFIG).
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Set
+
+from src.config import FILE_CONFIG, MODEL_CONFIG
+from src.core.qa import add_to_corpus
+from src.core.summarizer import summarize
+from src.utils.file_loader import get_page_count, load_file
+from src.utils.search_index import get_search_index
+from src.utils.text_processor import analyze_text_stats
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Các bước xử lý được đo thời gian
+STAGES = ("load", "summarize", "stats")
+
+def collect_files(inputs: Iterable[str]) -> List[str]:
+    """Tìm các file cần xử lý từ danh sách thư mục hoặc mẫu glob
+
+    Args:
+        inputs: Danh sách đường dẫn thư mục, file hoặc mẫu glob
+
+    Returns:
+        Danh sách đường dẫn tuyệt đối đã sắp xếp, không trùng lặp
+    """
+    extensions = tuple(f".{ext}" for ext in FILE_CONFIG["allowed_extensions"])
+    files = set()
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.update(os.path.join(root, name) for name in names if name.lower().endswith(extensions))
+        else:
+            files.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+
+    return sorted(os.path.abspath(path) for path in files)
+
+def load_completed(output_path: str) -> Set[str]:
+    """Đọc danh sách file đã xử lý từ file kết quả JSON Lines
+
+    Dòng cuối bị ghi dở do tiến trình dừng đột ngột sẽ được cắt bỏ.
+
+    Args:
+        output_path: Đường dẫn file kết quả
+
+    Returns:
+        Tập đường dẫn các file đã có kết quả
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, "r+b") as f:
+        data = f.read()
+        # Cắt phần dòng cuối chưa ghi xong
+        valid_end = data.rfind(b"\n") + 1
+        if valid_end < len(data):
+            logger.warning(f"Bỏ dòng kết quả ghi dở ở cuối {output_path}")
+            f.truncate(valid_end)
+
+    for line in data[:valid_end].splitlines():
+        try:
+            completed.add(json.loads(line)["path"])
+        except (ValueError, KeyError):
+            logger.warning("Bỏ qua dòng kết quả không hợp lệ")
+
+    return completed
+
+def process_document(path: str, length: str) -> Dict[str, Any]:
+    """Xử lý một tài liệu: trích xuất, tóm tắt và thống kê
+
+    Args:
+        path: Đường dẫn file
+        length: Độ dài tóm tắt ("short", "medium", "long")
+
+    Returns:
+        Bản ghi kết quả kèm thời gian của từng bước
+    """
+    record = {
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "pages": 0,
+        "timings": {}
+    }
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        text = load_file(f)
+        if not text.startswith("Lỗi"):
+            record["pages"] = get_page_count(f)
+    record["timings"]["load"] = time.perf_counter() - start
+
+    if text.startswith("Lỗi"):
+        record["error"] = text
+        return record
+
+    start = time.perf_counter()
+    record["summary"] = summarize(text, length)
+    record["timings"]["summarize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    record["stats"] = analyze_text_stats(text)
+    record["timings"]["stats"] = time.perf_counter() - start
+
+    return record
+
+def format_throughput(totals: Dict[str, Any], seconds: float) -> str:
+    """Định dạng thông lượng docs/s, pages/s, MB/s
+
+    Args:
+        totals: Tổng số tài liệu, trang và byte
+        seconds: Thời gian tương ứng
+
+    Returns:
+        Chuỗi mô tả thông lượng
+    """
+    seconds = max(seconds, 1e-9)
+    return (f"{totals['docs'] / seconds:.2f} docs/s, "
+            f"{totals['pages'] / seconds:.2f} pages/s, "
+            f"{totals['bytes'] / seconds / (1024 * 1024):.2f} MB/s")
+
+def index_document(path: str) -> int:
+    """Thêm tài liệu đã xử lý vào kho hỏi đáp nhiều tài liệu và chỉ mục tìm kiếm
+
+    Chạy trong tiến trình chính để bộ nhúng chỉ được nạp một lần; kho vẫn có thể
+    được giao diện và worker ghi cùng lúc vì CorpusIndex khóa thư mục kho giữa các
+    tiến trình. Văn bản được đọc lại từ cache trích xuất nên không phải trích xuất
+    lần nữa.
+
+    Args:
+        path: Đường dẫn file
+
+    Returns:
+        Số đoạn đã thêm vào kho
+    """
+    with open(path, "rb") as f:
+        text = load_file(f)
+    if text.startswith("Lỗi"):
+        return 0
+    search_index = get_search_index()
+    if search_index is not None:
+        search_index.add_document(hashlib.sha256(text.encode("utf-8")).hexdigest(), os.path.basename(path), text)
+    return add_to_corpus(text, os.path.basename(path), MODEL_CONFIG["qa"]["max_length"])
+
+def run_batch(files: List[str], output_path: str, length: str = "medium", workers: int = 1,
+              index_corpus: bool = False) -> Dict[str, Any]:
+    """Xử lý danh sách file bằng pool tiến trình và ghi kết quả JSON Lines
+
+    Args:
+        files: Danh sách file cần xử lý
+        output_path: File kết quả, được ghi nối tiếp
+        length: Độ dài tóm tắt
+        workers: Số tiến trình xử lý
+        index_corpus: Thêm các tài liệu xử lý thành công vào kho hỏi đáp và chỉ mục tìm kiếm
+
+    Returns:
+        Thống kê tổng hợp của lần chạy
+    """
+    completed = load_completed(output_path)
+    pending = [path for path in files if path not in completed]
+    logger.info(f"Tổng {len(files)} file, đã xử lý {len(files) - len(pending)}, còn lại {len(pending)}")
+
+    totals = {"docs": 0, "pages": 0, "bytes": 0, "errors": 0}
+    stage_totals = {stage: {"docs": 0, "pages": 0, "bytes": 0, "seconds": 0.0} for stage in STAGES}
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_document, path, length): path for path in pending}
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                logger.error(f"Lỗi khi xử lý {path}: {str(e)}")
+                record = {"path": path, "error": str(e), "bytes": 0, "pages": 0, "timings": {}}
+
+            # Ghi và flush ngay để có thể tiếp tục nếu bị gián đoạn
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+            if index_corpus and "error" not in record:
+                try:
+                    index_document(path)
+                except Exception as e:
+                    logger.error(f"Lỗi khi thêm {path} vào kho: {str(e)}")
+
+            totals["docs"] += 1
+            totals["pages"] += record["pages"]
+            totals["bytes"] += record["bytes"]
+            totals["errors"] += 1 if "error" in record else 0
+            for stage, seconds in record["timings"].items():
+                stage_totals[stage]["docs"] += 1
+                stage_totals[stage]["pages"] += record["pages"]
+                stage_totals[stage]["bytes"] += record["bytes"]
+                stage_totals[stage]["seconds"] += seconds
+
+            if totals["docs"] % 10 == 0 or totals["docs"] == len(pending):
+                logger.info(f"Đã xử lý {totals['docs']}/{len(pending)} file - "
+                            f"{format_throughput(totals, time.perf_counter() - started)}")
+
+    elapsed = time.perf_counter() - started
+    report = {"totals": totals, "elapsed": elapsed, "stages": stage_totals}
+
+    print(f"Hoàn thành {totals['docs']} file ({totals['errors']} lỗi) trong {elapsed:.1f}s")
+    print(f"  Tổng thể   : {format_throughput(totals, elapsed)}")
+    # Thông lượng từng bước tính trên tổng thời gian CPU của bước đó ở mọi tiến trình
+    for stage in STAGES:
+        stage_total = stage_totals[stage]
+        print(f"  {stage:<11}: {format_throughput(stage_total, stage_total['seconds'])} (mỗi tiến trình)")
+
+    return report
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="Xử lý hàng loạt tài liệu PDF/Word và ghi kết quả JSON Lines"
+    )
+    parser.add_argument("inputs", nargs="+", help="Thư mục, file hoặc mẫu glob (ví dụ: 'docs/**/*.pdf')")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="File kết quả JSON Lines")
+    parser.add_argument("-l", "--length", choices=["short", "medium", "long"], default="medium", help="Độ dài tóm tắt")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Số tiến trình xử lý")
+    parser.add_argument("--index", action="store_true", help="Thêm tài liệu vào kho hỏi đáp nhiều tài liệu và chỉ mục tìm kiếm")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.inputs)
+    if not files:
+        parser.error("Không tìm thấy file PDF/Word nào")
+
+    run_batch(files, args.output, length=args.length, workers=args.workers, index_corpus=args.index)
+
+if __name__ == "__main__":
+    main()
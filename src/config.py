@@ -94,21 +94,113 @@ APP_CONFIG = {
 # Cấu hình mô hình AI
 MODEL_CONFIG = {
     "summarization": {
+        # Backend tóm tắt: "simulate" (demo có độ trễ giả lập), "extractive" (câu đầu/giữa/cuối),
+        # "textrank" (xếp hạng câu bằng TF-IDF + TextRank trên CPU)
+        # hoặc "transformers" (mô hình cục bộ, cần cài transformers + torch)
+        "backend": "textrank",
+        # Có thể dùng mô hình nhỏ như "sshleifer/distilbart-cnn-6-6" hoặc
+        # "hf-internal-testing/tiny-random-bart" để chạy thử trên CPU
         "model_name": "facebook/bart-large-cnn",
         "max_length": 1024,
         "use_gpu": True,
+        "batch_size": 8,  # Số đoạn văn bản trong mỗi lượt suy luận
+        "max_concurrency": 8,  # Số đoạn được tóm tắt song song tối đa
+        "chunk_words": 1000,  # Số từ mỗi đoạn ở cấp đầu của cây map-reduce
     },
     "qa": {
         "model_name": "deepset/roberta-base-squad2",
         "max_length": 512,
         "use_gpu": True,
+        "retriever": {
+            # Cách tìm đoạn liên quan: "bm25" (từ khóa) hoặc "dense" (vector nhúng, bắt được câu hỏi diễn đạt khác)
+            "method": "bm25",
+            # Bộ nhúng: "hashing" (tất định, không cần mô hình) hoặc "sentence-transformers"
+            "embedder": "hashing",
+            "model_name": "sentence-transformers/all-MiniLM-L6-v2",
+            "dim": 384,  # Số chiều của bộ nhúng hashing
+            "vectors_dir": DATA_DIR / "vectors",
+            "vectors_max_mb": 1024,  # Tổng dung lượng các kho vector, vượt quá thì xóa kho ít dùng nhất
+        },
+        "corpus": {
+            # Kho tài liệu để hỏi đáp trên nhiều tài liệu, dùng chỉ mục IVF và bộ nhúng ở trên
+            "enabled": True,
+            "index_dir": DATA_DIR / "corpus",
+            "n_lists": None,  # Số cụm IVF, None = căn bậc hai số đoạn lúc huấn luyện
+            "nprobe": 8,  # Số cụm được quét mỗi truy vấn, tăng để chính xác hơn
+            "min_train_size": 1024,  # Số đoạn tối thiểu trước khi phân cụm, ít hơn thì tìm chính xác
+            "top_k": 3,
+        },
     }
 }
 
 # Cấu hình xử lý file
 FILE_CONFIG = {
     "allowed_extensions": ["pdf", "docx"],
-    "max_pages": 100,
+    "max_pages": None,  # Số trang PDF tối đa được trích xuất, None = toàn bộ tài liệu
+    "parallel_extraction": False,  # Trích xuất PDF song song bằng nhiều tiến trình
+    "extraction_workers": None,  # Số tiến trình, None = số CPU
+    "parallel_min_pages": 16,  # Tài liệu ít trang hơn vẫn xử lý tuần tự
+}
+
+# Cấu hình cache
+CACHE_CONFIG = {
+    "extraction_enabled": True,  # Cache văn bản trích xuất theo SHA-256 của file
+    "extraction_dir": DATA_DIR / "cache" / "extraction",
+    "extraction_max_mb": 512,
+    "http_enabled": True,  # Cache trang web đã trích xuất, kiểm tra lại theo ETag/Last-Modified
+    "http_dir": DATA_DIR / "cache" / "http",
+    "http_max_mb": 256,
+    "http_default_ttl": 3600,  # Thời gian còn hạn (giây) khi máy chủ không gửi Cache-Control/Expires
+    # Cache kết quả giữa các lần Streamlit chạy lại script (src/ui/cache.py)
+    "ui_ttl_seconds": 3600,  # Thời gian sống của mỗi mục
+    "ui_max_documents": 8,  # Số văn bản trích xuất từ file được giữ
+    "ui_max_entries": 64,  # Số bản tóm tắt / thống kê được giữ
+    "ui_max_indexes": 8,  # Số chỉ mục hỏi đáp được giữ
+}
+
+# Cấu hình kho tài liệu đã phân tích, lưu văn bản và kết quả giữa các phiên
+STORE_CONFIG = {
+    "enabled": True,
+    "db_path": DATA_DIR / "documents.db",  # Thông tin tài liệu, bản tóm tắt, thống kê
+    "content_dir": DATA_DIR / "documents",  # Văn bản, vị trí câu và chỉ mục hỏi đáp của từng tài liệu
+    "recent_limit": 20,  # Số tài liệu gần đây hiển thị để mở lại
+}
+
+# Cấu hình tìm kiếm toàn văn trên mọi tài liệu đã phân tích (SQLite FTS5)
+SEARCH_CONFIG = {
+    "enabled": True,
+    "db_path": DATA_DIR / "search.db",
+    "passage_words": 200,  # Số từ mỗi đoạn được lập chỉ mục, đoạn trích lấy từ đoạn khớp tốt nhất
+    "max_results": 10,  # Số tài liệu tối đa mỗi lần tìm
+    "snippet_words": 30,  # Số từ tối đa của đoạn trích
+    "max_ranked_passages": 5000,  # Số đoạn khớp mới nhất được xếp hạng, giới hạn độ trễ với từ rất phổ biến
+    "max_prefix_terms": 64,  # Số từ tối đa được tìm thay cho một từ có dấu * ở cuối
+}
+
+# Cấu hình hàng đợi công việc chạy nền (python -m src.worker)
+JOB_CONFIG = {
+    "enabled": True,  # Giao diện chỉ gửi việc vào hàng đợi khi có worker đang chạy, nếu không thì xử lý trực tiếp
+    "db_path": DATA_DIR / "jobs.db",
+    "uploads_dir": DATA_DIR / "uploads",  # File upload được lưu ở đây để worker đọc
+    "workers": 2,  # Số tiến trình worker mặc định
+    "poll_interval": 1.0,  # Số giây worker chờ khi hàng đợi trống
+    "ui_poll_interval": 2,  # Số giây giữa các lần giao diện cập nhật trạng thái công việc
+    "heartbeat_interval": 5,  # Số giây giữa các lần worker ghi nhịp tim
+    "stale_after": 60,  # Không có nhịp tim sau số giây này thì công việc được đưa lại vào hàng đợi
+    "max_attempts": 2,  # Số lần chạy tối đa của một công việc
+}
+
+# Cấu hình HTTP API (python -m src.api)
+API_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "compute_workers": 4,  # Số luồng chạy tóm tắt, hỏi đáp, thống kê, trích xuất file
+    "max_concurrent_scrapes": 32,  # Số URL được tải đồng thời
+    "max_waiting": 512,  # Số request chờ tối đa, vượt quá thì trả về 503
+    "max_upload_mb": 50,  # Kích thước file upload tối đa
+    "max_body_mb": 20,  # Kích thước body JSON tối đa (văn bản gửi trực tiếp)
+    "max_documents": 32,  # Số văn bản được giữ trong bộ nhớ theo mã băm
+    "max_answers": 1024,  # Số câu trả lời được giữ trong bộ nhớ
 }
 
 # Cấu hình scraper
@@ -118,5 +210,17 @@ SCRAPER_CONFIG = {
     "user_agents": [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15",
-    ]
+    ],
+    "backoff_base": 0.5,  # Thời gian chờ trước lần thử lại đầu tiên (giây), tăng gấp đôi mỗi lần
+    "max_concurrency": 16,  # Số kết nối đồng thời tối đa
+    "per_host_limit": 4,  # Số kết nối đồng thời tối đa tới cùng một host
+    "blocked_content_types": ["application/pdf", "image/", "video/", "audio/"],
+    "max_content_size": 10 * 1024 * 1024,  # Kích thước tối đa có thể download (10MB)
+    "extraction_mode": "readability",  # "readability" (nội dung chính), "fast" (toàn bộ văn bản) hoặc "soup" (BeautifulSoup)
+    # Thu thập nhiều trang cùng website (src/utils/crawler.py)
+    "crawl_max_pages": 50,  # Số trang tối đa
+    "crawl_max_depth": 2,  # Số bước liên kết tối đa tính từ trang đầu
+    "crawl_concurrency": 8,  # Số trang được tải đồng thời
+    "respect_robots": True,  # Tuân theo robots.txt (Disallow, Crawl-delay)
+    "near_duplicate_distance": 3  # Khoảng cách Hamming tối đa giữa simhash của hai trang coi là trùng
 }
\ No newline at end of file
@@ -0,0 +1,510 @@
+"""Module chỉ mục láng giềng gần đúng (IVF) cho tìm kiếm trên cả kho tài liệu"""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+class IVFIndex:
+    """Chỉ mục IVF (inverted file) trên các vector đã chuẩn hóa L2
+
+    Các vector được phân cụm bằng k-means cầu; mỗi cụm giữ danh sách id của
+    các vector thuộc cụm. Khi truy vấn, chỉ các nprobe cụm có tâm gần câu hỏi
+    nhất được quét, nên chi phí tỷ lệ với nprobe / n_lists của kho thay vì
+    toàn bộ kho. Trước khi đủ dữ liệu để huấn luyện, chỉ mục tìm kiếm chính xác.
+
+    Dữ liệu được lưu dạng file ghi nối tiếp (vectors.f32, assignments.i32)
+    nên thêm vector mới chỉ ghi phần mới. Chỉ mục không tự khóa: khi nhiều tiến
+    trình dùng chung thư mục, người gọi phải giữ khóa liên tiến trình quanh
+    add, train và refresh (CorpusIndex làm việc này).
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    ASSIGNMENTS_FILE = "assignments.i32"
+    CENTROIDS_FILE = "centroids.npy"
+
+    def __init__(self, dim: int, n_lists: Optional[int] = None, nprobe: int = 8,
+                 min_train_size: int = 1024, directory: Optional[Union[str, Path]] = None):
+        """Khởi tạo chỉ mục rỗng hoặc mở chỉ mục đã lưu trong directory
+
+        Args:
+            dim: Số chiều vector
+            n_lists: Số cụm, None = khoảng căn bậc hai số vector lúc huấn luyện
+            nprobe: Số cụm được quét mặc định khi truy vấn
+            min_train_size: Số vector tối thiểu để huấn luyện phân cụm
+            directory: Thư mục lưu chỉ mục, None = chỉ giữ trong bộ nhớ
+        """
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.directory = Path(directory) if directory else None
+
+        self.size = 0
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._assignments = np.empty(0, dtype=np.int32)
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        # Phiên bản file tâm cụm đã đọc hoặc ghi, để nhận ra tiến trình khác huấn luyện lại
+        self._centroids_version: Optional[Tuple[int, int]] = None
+
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.size]
+
+    def _reserve(self, size: int):
+        """Tăng dung lượng mảng theo cấp số nhân để thêm vector với chi phí khấu hao O(1)"""
+        if size <= len(self._vectors):
+            return
+        capacity = max(size, 2 * len(self._vectors), 1024)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self._vectors[:self.size]
+        assignments = np.empty(capacity, dtype=np.int32)
+        assignments[:self.size] = self._assignments[:self.size]
+        self._vectors, self._assignments = vectors, assignments
+
+    def _assign(self, vectors: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        """Gán mỗi vector vào cụm có tâm gần nhất (tích vô hướng lớn nhất), theo lô để giới hạn bộ nhớ"""
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch_size):
+            block = vectors[start:start + batch_size]
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def _rebuild_lists(self):
+        """Dựng lại danh sách id của từng cụm từ mảng gán cụm"""
+        assignments = self._assignments[:self.size]
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def train(self, n_iter: int = 10, sample_size: int = 256, seed: int = 0):
+        """Phân cụm k-means cầu trên các vector hiện có và gán lại toàn bộ vector
+
+        Args:
+            n_iter: Số vòng lặp k-means
+            sample_size: Số vector mẫu mỗi cụm dùng để huấn luyện
+            seed: Hạt giống ngẫu nhiên, giữ kết quả tất định
+        """
+        vectors = self.vectors
+        n_lists = self.n_lists or max(1, int(np.sqrt(self.size)))
+        n_lists = min(n_lists, self.size)
+        rng = np.random.default_rng(seed)
+
+        sample = vectors
+        if self.size > n_lists * sample_size:
+            sample = vectors[rng.choice(self.size, n_lists * sample_size, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            # Cộng các vector theo cụm bằng một phép nhân ma trận thưa one-hot
+            one_hot = sparse.csr_matrix(
+                (np.ones(len(sample), dtype=np.float32), (assignments, np.arange(len(sample)))),
+                shape=(n_lists, len(sample))
+            )
+            sums = np.asarray(one_hot @ sample)
+            # Cụm rỗng được khởi tạo lại bằng một vector ngẫu nhiên
+            empty = np.flatnonzero(np.bincount(assignments, minlength=n_lists) == 0)
+            sums[empty] = sample[rng.choice(len(sample), len(empty))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            centroids = (sums / norms).astype(np.float32)
+
+        self.centroids = np.ascontiguousarray(centroids)
+        self._assignments[:self.size] = self._assign(vectors)
+        self._rebuild_lists()
+        logger.info(f"Đã huấn luyện chỉ mục IVF: {self.size} vector, {n_lists} cụm")
+
+        if self.directory:
+            np.save(self.directory / self.CENTROIDS_FILE, self.centroids)
+            self._assignments[:self.size].tofile(self.directory / self.ASSIGNMENTS_FILE)
+            self._centroids_version = self._stored_centroids_version()
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Thêm vector vào chỉ mục, vector mới được gán ngay vào cụm gần nhất
+
+        Chỉ mục tự huấn luyện lần đầu khi đạt min_train_size vector.
+
+        Args:
+            vectors: Ma trận float32 (n, dim) đã chuẩn hóa L2
+
+        Returns:
+            Id của các vector vừa thêm
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.arange(self.size, self.size + len(vectors))
+        self._reserve(self.size + len(vectors))
+        self._vectors[self.size:self.size + len(vectors)] = vectors
+        self.size += len(vectors)
+
+        if self.directory:
+            with open(self.directory / self.VECTORS_FILE, "ab") as f:
+                vectors.tofile(f)
+
+        if self.trained:
+            assignments = self._assign(vectors)
+            self._assignments[ids] = assignments
+            for list_id in np.unique(assignments):
+                self._lists[list_id] = np.concatenate((self._lists[list_id], ids[assignments == list_id]))
+            if self.directory:
+                with open(self.directory / self.ASSIGNMENTS_FILE, "ab") as f:
+                    assignments.tofile(f)
+        elif self.size >= self.min_train_size:
+            self.train()
+
+        return ids
+
+    def search(self, query: np.ndarray, top_k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Tìm các vector có tích vô hướng lớn nhất với câu hỏi
+
+        Args:
+            query: Vector câu hỏi đã chuẩn hóa L2
+            top_k: Số kết quả cần lấy
+            nprobe: Số cụm được quét, None = giá trị mặc định của chỉ mục
+
+        Returns:
+            Danh sách (id, điểm) theo điểm giảm dần
+        """
+        if self.size == 0:
+            return []
+
+        if self.trained:
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            centroid_scores = self.centroids @ query
+            probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            candidates = np.concatenate([self._lists[i] for i in probed])
+            if not len(candidates):
+                return []
+            scores = self._vectors[candidates] @ query
+        else:
+            candidates = np.arange(self.size)
+            scores = self.vectors @ query
+
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def _stored_centroids_version(self) -> Optional[Tuple[int, int]]:
+        """Thời điểm sửa và kích thước của file tâm cụm trên đĩa, None nếu chưa có"""
+        try:
+            stat = (self.directory / self.CENTROIDS_FILE).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """Đọc các vector mà tiến trình khác đã ghi thêm vào thư mục chỉ mục
+
+        Chỉ phần mới của vectors.f32 và assignments.i32 được đọc.
+
+        Returns:
+            False nếu không cập nhật tiếp được (file bị cắt ngắn, tâm cụm đổi
+            hoặc thiếu cụm của vector mới) và cần mở lại chỉ mục
+        """
+        if not self.directory:
+            return True
+        vectors_path = self.directory / self.VECTORS_FILE
+        try:
+            nbytes = vectors_path.stat().st_size
+        except FileNotFoundError:
+            nbytes = 0
+        size, partial = divmod(nbytes, 4 * self.dim)
+        if partial or size < self.size or self._stored_centroids_version() != self._centroids_version:
+            return False
+        if size == self.size:
+            return True
+
+        count = size - self.size
+        with open(vectors_path, "rb") as f:
+            f.seek(self.size * self.dim * 4)
+            vectors = np.fromfile(f, dtype=np.float32, count=count * self.dim).reshape(-1, self.dim)
+        ids = np.arange(self.size, size)
+        if self.trained:
+            with open(self.directory / self.ASSIGNMENTS_FILE, "rb") as f:
+                f.seek(self.size * 4)
+                assignments = np.fromfile(f, dtype=np.int32, count=count)
+            if len(assignments) < count:
+                return False
+
+        self._reserve(size)
+        self._vectors[ids] = vectors
+        self.size = size
+        if self.trained:
+            self._assignments[ids] = assignments
+            for list_id in np.unique(assignments):
+                self._lists[list_id] = np.concatenate((self._lists[list_id], ids[assignments == list_id]))
+        return True
+
+    def _load(self):
+        """Đọc chỉ mục đã lưu, bỏ phần ghi dở nếu tiến trình trước dừng đột ngột"""
+        vectors_path = self.directory / self.VECTORS_FILE
+        if not vectors_path.exists():
+            return
+
+        vectors = np.fromfile(vectors_path, dtype=np.float32)
+        size = len(vectors) // self.dim
+        if vectors_path.stat().st_size != size * self.dim * 4:
+            # Cắt vector ghi dở để các vector thêm sau nằm đúng vị trí
+            os.truncate(vectors_path, size * self.dim * 4)
+        vectors = vectors[:size * self.dim].reshape(-1, self.dim)
+        self._reserve(len(vectors))
+        self._vectors[:len(vectors)] = vectors
+        self.size = len(vectors)
+
+        centroids_path = self.directory / self.CENTROIDS_FILE
+        assignments_path = self.directory / self.ASSIGNMENTS_FILE
+        if centroids_path.exists() and assignments_path.exists():
+            self.centroids = np.load(centroids_path)
+            self._centroids_version = self._stored_centroids_version()
+            assignments = np.fromfile(assignments_path, dtype=np.int32)
+            # Vector chưa kịp ghi cụm được gán lại
+            known = min(len(assignments), self.size)
+            self._assignments[:known] = assignments[:known]
+            if known < self.size:
+                self._assignments[known:self.size] = self._assign(self.vectors[known:])
+                self._assignments[:self.size].tofile(assignments_path)
+            self._rebuild_lists()
+
+    def truncate(self, size: int):
+        """Bỏ các vector từ vị trí size trở đi (dùng khi dữ liệu đi kèm bị ghi thiếu)
+
+        Args:
+            size: Số vector giữ lại
+        """
+        if size >= self.size:
+            return
+        self.size = size
+        if self.trained:
+            self._rebuild_lists()
+        if self.directory:
+            self.vectors.tofile(self.directory / self.VECTORS_FILE)
+            if self.trained:
+                self._assignments[:self.size].tofile(self.directory / self.ASSIGNMENTS_FILE)
+
+class CorpusIndex:
+    """Kho đoạn văn bản của nhiều tài liệu với chỉ mục IVF để tìm kiếm trên toàn kho
+
+    Mỗi đoạn được lưu kèm tài liệu nguồn trong entries.jsonl (ghi nối tiếp),
+    hàng thứ i của chỉ mục IVF ứng với dòng thứ i của file này.
+
+    Nhiều tiến trình (giao diện, API, worker, batch) có thể mở cùng một kho:
+    mọi thao tác đọc và ghi giữ khóa file corpus.lock (fcntl.flock), và trước
+    mỗi thao tác kho đọc thêm phần mà tiến trình khác đã ghi. Trên hệ điều hành
+    không có fcntl (Windows) chỉ khóa được trong tiến trình, nên chỉ một tiến
+    trình được phép ghi vào kho.
+    """
+
+    ENTRIES_FILE = "entries.jsonl"
+    META_FILE = "corpus.json"
+    LOCK_FILE = "corpus.lock"
+
+    def __init__(self, directory: Union[str, Path], embedder: Any, n_lists: Optional[int] = None,
+                 nprobe: int = 8, min_train_size: int = 1024):
+        """Mở hoặc tạo kho
+
+        Args:
+            directory: Thư mục lưu kho
+            embedder: Bộ nhúng (có thuộc tính name, dim và phương thức embed)
+            n_lists: Số cụm của chỉ mục IVF, None = tự động
+            nprobe: Số cụm được quét khi truy vấn
+            min_train_size: Số đoạn tối thiểu để huấn luyện phân cụm
+        """
+        self.directory = Path(directory)
+        self.embedder = embedder
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.index: Optional[IVFIndex] = None
+        self.entries: List[Dict[str, Any]] = []
+        self.documents: Dict[str, str] = {}
+        # Số byte của entries.jsonl đã đọc vào self.entries
+        self._entries_offset = 0
+        with self._locked(refresh=False):
+            self._open()
+
+    @contextmanager
+    def _locked(self, refresh: bool = True):
+        """Giữ khóa của kho trong tiến trình và giữa các tiến trình
+
+        Args:
+            refresh: Đọc thêm phần kho mà tiến trình khác đã ghi sau khi lấy khóa
+        """
+        with self._lock:
+            # Mở file khóa mỗi lần để tiến trình con tạo bằng fork không dùng chung khóa với tiến trình cha
+            with open(self.directory / self.LOCK_FILE, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    if refresh:
+                        self._refresh()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open(self):
+        """Đọc toàn bộ kho từ đĩa, bỏ phần ghi dở nếu tiến trình trước dừng đột ngột (khi giữ khóa)"""
+        # Kho tạo bởi bộ nhúng khác không dùng lại được, bắt đầu kho mới
+        meta_path = self.directory / self.META_FILE
+        meta = {"embedder": self.embedder.name}
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("embedder") != self.embedder.name:
+                logger.warning("Kho tài liệu được tạo bởi bộ nhúng khác, tạo lại kho")
+                for path in self.directory.iterdir():
+                    if path.is_file() and path.name != self.LOCK_FILE:
+                        path.unlink()
+                stored = None
+        else:
+            stored = None
+        if stored != meta:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        self.index = IVFIndex(self.embedder.dim, n_lists=self.n_lists, nprobe=self.nprobe,
+                              min_train_size=self.min_train_size, directory=self.directory)
+        self.entries = []
+        self.documents = {}
+        self._entries_offset = 0
+        self._read_entries()
+
+        # Giữ phần dữ liệu khớp nhau giữa vector và mô tả đoạn, bỏ phần ghi dở
+        entries_path = self.directory / self.ENTRIES_FILE
+        count = min(len(self.entries), self.index.size)
+        partial = 0
+        if entries_path.exists():
+            with open(entries_path, "rb") as f:
+                f.seek(self._entries_offset)
+                partial = sum(1 for _ in f)
+        self.index.truncate(count)
+        if len(self.entries) > count or partial:
+            logger.warning(f"Bỏ {len(self.entries) - count + partial} đoạn ghi dở trong kho tài liệu")
+            self.entries = self.entries[:count]
+            with open(entries_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.entries)
+            self._entries_offset = entries_path.stat().st_size
+        for entry in self.entries:
+            self.documents[entry["doc_id"]] = entry["name"]
+
+    def _read_entries(self):
+        """Đọc các dòng đầy đủ của entries.jsonl từ vị trí đã đọc tới"""
+        entries_path = self.directory / self.ENTRIES_FILE
+        if not entries_path.exists():
+            return
+        with open(entries_path, "rb") as f:
+            f.seek(self._entries_offset)
+            for line in f:
+                # Dòng thiếu ký tự xuống dòng hoặc không đọc được là phần ghi dở
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self.entries.append(json.loads(line))
+                except ValueError:
+                    break
+                self._entries_offset += len(line)
+
+    def _refresh(self):
+        """Đọc thêm phần kho mà tiến trình khác đã ghi (khi giữ khóa)"""
+        entries_path = self.directory / self.ENTRIES_FILE
+        try:
+            entries_size = entries_path.stat().st_size
+        except FileNotFoundError:
+            entries_size = 0
+        if not self.index.refresh() or entries_size < self._entries_offset:
+            self._open()
+            return
+
+        start = len(self.entries)
+        if entries_size > self._entries_offset:
+            self._read_entries()
+        if len(self.entries) != self.index.size or self._entries_offset != entries_size:
+            self._open()
+            return
+        for entry in self.entries[start:]:
+            self.documents[entry["doc_id"]] = entry["name"]
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._locked():
+            return doc_id in self.documents
+
+    def __len__(self) -> int:
+        with self._locked():
+            return len(self.documents)
+
+    def add_document(self, doc_id: str, name: str, chunks: List[str]) -> int:
+        """Thêm các đoạn của một tài liệu vào kho, bỏ qua nếu tài liệu đã có
+
+        Args:
+            doc_id: Định danh tài liệu (ví dụ SHA-256 của nội dung)
+            name: Tên hiển thị của tài liệu
+            chunks: Các đoạn văn bản của tài liệu
+
+        Returns:
+            Số đoạn đã thêm
+        """
+        if not chunks or doc_id in self:
+            return 0
+        # Nhúng trước khi lấy khóa để tiến trình khác không phải chờ mô hình
+        vectors = self.embedder.embed(chunks)
+        entries = [{"doc_id": doc_id, "name": name, "chunk": i, "text": chunk} for i, chunk in enumerate(chunks)]
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+
+        with self._locked():
+            # Tiến trình khác có thể vừa thêm cùng tài liệu
+            if doc_id in self.documents:
+                return 0
+
+            # Ghi mô tả đoạn trước, nếu bị gián đoạn phần thừa sẽ được cắt khi mở lại
+            with open(self.directory / self.ENTRIES_FILE, "ab") as f:
+                f.write(data)
+            self._entries_offset += len(data)
+            self.index.add(vectors)
+
+            self.entries.extend(entries)
+            self.documents[doc_id] = name
+            logger.info(f"Đã thêm {len(chunks)} đoạn của '{name}' vào kho ({len(self.documents)} tài liệu)")
+            return len(chunks)
+
+    def search(self, question: str, top_k: int = 3, nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tìm các đoạn liên quan nhất với câu hỏi trên toàn kho
+
+        Args:
+            question: Câu hỏi
+            top_k: Số đoạn cần lấy
+            nprobe: Số cụm được quét
+
+        Returns:
+            Danh sách đoạn (doc_id, name, chunk, text, score) theo điểm giảm dần
+        """
+        query = self.embedder.embed([question])[0]
+        with self._locked():
+            hits = self.index.search(query, top_k=top_k, nprobe=nprobe)
+            return [{**self.entries[i], "score": score} for i, score in hits if score > 0]
@@ -4,11 +4,48 @@ import logging
 import time
 import random
 import re
-from typing import Dict, Union, Any, Optional, List
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, Union, Any, Optional, List, Tuple
+
+import numpy as np
+
+from src.config import MODEL_CONFIG
+from src.core.ann_index import CorpusIndex
+from src.core.vector_store import Embedder, HashingEmbedder, SentenceTransformerEmbedder, VectorStore, prune_stores
+from src.utils.document import Document, get_document, normalize_term
+from src.utils.progress import ProgressCallback, measure_stream, report_progress
+from src.utils.segmentation import get_sentences
 
 # Thiết lập logging
 logger = logging.getLogger(__name__)
 
+# Tham số BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Điểm tin cậy tối thiểu để không phải dùng bản tóm tắt thay thế
+FALLBACK_MIN_SCORE = 0.3
+
+# Số chỉ mục văn bản được giữ trong bộ nhớ
+INDEX_CACHE_SIZE = 8
+
+# Chỉ mục đã xây dựng theo văn bản, dùng lại giữa các câu hỏi
+_index_cache: "OrderedDict[Tuple[str, str, int], Any]" = OrderedDict()
+_index_lock = threading.Lock()
+
+# Bộ nhúng dùng chung cho truy xuất ngữ nghĩa, tạo khi cần
+_embedder: Optional[Embedder] = None
+
+# Kho tài liệu dùng chung cho hỏi đáp trên nhiều tài liệu, mở khi cần
+_corpus: Optional[CorpusIndex] = None
+
 def preprocess_text(text: str) -> str:
     """Tiền xử lý văn bản để cải thiện chất lượng trả lời
 
@@ -26,42 +63,387 @@ def preprocess_text(text: str) -> str:
     text = text.replace("  ", " ")
     return text
 
-def find_relevant_context(question: str, full_context: str, max_length: int = 512) -> str:
+class BM25Index:
+    """Chỉ mục đảo (token → các đoạn chứa token) trên các đoạn của một văn bản
+
+    Chỉ mục được xây dựng một lần cho mỗi văn bản. Trọng số BM25 theo tần suất
+    và độ dài đoạn được tính sẵn cho từng posting, nên khi trả lời câu hỏi chỉ
+    cần duyệt posting của các từ trong câu hỏi, không phụ thuộc độ dài văn bản.
+    """
+
+    # Tên file khi lưu chỉ mục
+    POSTINGS_FILE = "postings.npz"
+    CHUNKS_FILE = "chunks.json"
+
+    def __init__(self, document: Document, chunk_size: int = 512, overlap: int = 100,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        """Chia tài liệu thành các đoạn có chồng lấp và xây dựng chỉ mục
+
+        Tần suất được đếm trực tiếp trên mảng id thuật ngữ của tài liệu, không
+        tách lại văn bản của từng đoạn.
+
+        Args:
+            document: Tài liệu đã tách từ
+            chunk_size: Kích thước mỗi đoạn (số từ)
+            overlap: Số từ chồng lấp giữa các đoạn
+            k1: Tham số bão hòa tần suất của BM25
+            b: Tham số chuẩn hóa độ dài của BM25
+        """
+        ranges = document.chunk_ranges(chunk_size, overlap)
+        self.chunks = [preprocess_text(document.span_text(start, end)) for start, end in ranges]
+
+        # Đếm tần suất thuật ngữ trong từng đoạn (bỏ các từ chỉ gồm dấu câu)
+        term_ids = document.term_ids
+        n_chunks = len(ranges)
+        lengths = np.zeros(n_chunks, dtype=np.float64)
+        posting_terms, posting_chunks, posting_counts = [], [], []
+        for chunk_id, (start, end) in enumerate(ranges):
+            chunk_terms = term_ids[start:end]
+            chunk_terms = chunk_terms[chunk_terms >= 0]
+            lengths[chunk_id] = len(chunk_terms)
+            unique_terms, counts = np.unique(chunk_terms, return_counts=True)
+            posting_terms.append(unique_terms)
+            posting_chunks.append(np.full(len(unique_terms), chunk_id, dtype=np.int32))
+            posting_counts.append(counts)
+
+        # Gom posting theo thuật ngữ, sắp xếp ổn định để chỉ số đoạn vẫn tăng dần
+        all_terms = np.concatenate(posting_terms) if posting_terms else np.empty(0, dtype=np.int64)
+        order = np.argsort(all_terms, kind="stable")
+        all_terms = all_terms[order]
+        chunk_ids = np.concatenate(posting_chunks)[order] if posting_chunks else np.empty(0, dtype=np.int32)
+        tf = np.concatenate(posting_counts)[order].astype(np.float64) if posting_counts else np.empty(0)
+        terms, offsets, document_frequencies = np.unique(all_terms, return_index=True, return_counts=True)
+
+        # Tính sẵn phần trọng số phụ thuộc tần suất và độ dài đoạn cho mỗi posting
+        avg_length = lengths.mean() if n_chunks else 0.0
+        norms = k1 * (1 - b + b * lengths / max(avg_length, 1e-9))
+        idf = np.log(1 + (n_chunks - document_frequencies + 0.5) / (document_frequencies + 0.5))
+        weights = np.repeat(idf, document_frequencies) * tf * (k1 + 1) / (tf + norms[chunk_ids])
+
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, offset, frequency in zip(terms.tolist(), offsets.tolist(), document_frequencies.tolist()):
+            self.postings[document.terms[term]] = (
+                chunk_ids[offset:offset + frequency],
+                weights[offset:offset + frequency]
+            )
+
+        logger.info(f"Đã xây dựng chỉ mục BM25: {n_chunks} đoạn, {len(self.postings)} từ")
+
+    def save(self, directory: Union[str, Path]):
+        """Lưu các đoạn (JSON) và posting (np.savez) vào thư mục
+
+        Posting của mọi thuật ngữ được nối thành hai mảng chỉ số đoạn và trọng
+        số, kèm vị trí bắt đầu của từng thuật ngữ. Ghi vào thư mục tạm rồi đổi
+        tên để không để lại dữ liệu ghi dở.
+
+        Args:
+            directory: Thư mục lưu
+        """
+        directory = Path(directory)
+        terms = list(self.postings)
+        lengths = [len(self.postings[term][0]) for term in terms]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        chunk_ids = np.concatenate([self.postings[term][0] for term in terms]) if terms else np.empty(0, np.int32)
+        weights = np.concatenate([self.postings[term][1] for term in terms]) if terms else np.empty(0)
+
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=directory.parent, prefix=".tmp-"))
+        try:
+            np.savez(tmp_dir / self.POSTINGS_FILE, offsets=offsets, chunk_ids=chunk_ids, weights=weights)
+            with open(tmp_dir / self.CHUNKS_FILE, "w", encoding="utf-8") as f:
+                json.dump({"terms": terms, "chunks": self.chunks}, f, ensure_ascii=False)
+            if directory.exists():
+                shutil.rmtree(directory)
+            os.replace(tmp_dir, directory)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> Optional["BM25Index"]:
+        """Mở chỉ mục đã lưu bằng save mà không phải tách từ lại văn bản
+
+        Args:
+            directory: Thư mục đã lưu
+
+        Returns:
+            Chỉ mục, hoặc None nếu chưa lưu
+        """
+        directory = Path(directory)
+        try:
+            with open(directory / cls.CHUNKS_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with np.load(directory / cls.POSTINGS_FILE) as arrays:
+                offsets = arrays["offsets"].tolist()
+                chunk_ids = arrays["chunk_ids"]
+                weights = arrays["weights"]
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Không đọc được chỉ mục BM25 {directory}: {str(e)}")
+            return None
+
+        index = cls.__new__(cls)
+        index.chunks = meta["chunks"]
+        index.postings = {
+            term: (chunk_ids[start:end], weights[start:end])
+            for term, start, end in zip(meta["terms"], offsets, offsets[1:])
+        }
+        return index
+
+    def search(self, question: str, top_k: int = 1,
+               progress_callback: Optional[ProgressCallback] = None) -> List[Tuple[int, float]]:
+        """Tìm các đoạn liên quan nhất với câu hỏi theo điểm BM25
+
+        Args:
+            question: Câu hỏi
+            top_k: Số đoạn cần lấy
+            progress_callback: Hàm nhận (số từ đã xử lý, tổng số từ của câu hỏi)
+
+        Returns:
+            Danh sách (chỉ số đoạn, điểm) theo điểm giảm dần, chỉ gồm các đoạn có điểm > 0
+        """
+        terms = list(dict.fromkeys(tokenize(question)))
+        scores: Dict[int, float] = defaultdict(float)
+
+        for i, term in enumerate(terms):
+            if term in self.postings:
+                chunk_ids, weights = self.postings[term]
+                for chunk_id, weight in zip(chunk_ids.tolist(), weights.tolist()):
+                    scores[chunk_id] += weight
+            report_progress(progress_callback, i + 1, len(terms))
+
+        # Sắp xếp theo điểm giảm dần, cùng điểm thì ưu tiên đoạn xuất hiện trước
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(chunk_id, score) for chunk_id, score in ranked[:top_k] if score > 0]
+
+def split_into_chunks(text: str, chunk_size: int = 512, overlap: int = 100) -> List[str]:
+    """Chia văn bản thành các đoạn có chồng lấp dùng cho truy xuất
+
+    Các đoạn được cắt theo vị trí từ của tài liệu đã tách từ (dùng chung với
+    thống kê và tóm tắt), rồi mới tiền xử lý từng đoạn.
+
+    Args:
+        text: Văn bản gốc (chưa tiền xử lý)
+        chunk_size: Kích thước mỗi đoạn (số từ)
+        overlap: Số từ chồng lấp giữa các đoạn
+
+    Returns:
+        Danh sách các đoạn văn bản đã tiền xử lý
+    """
+    document = get_document(text)
+    return [preprocess_text(document.span_text(start, end))
+            for start, end in document.chunk_ranges(chunk_size, overlap)]
+
+def tokenize(text: str) -> List[str]:
+    """Tách văn bản thành các thuật ngữ cùng cách chuẩn hóa với chỉ mục
+
+    Args:
+        text: Văn bản cần tách
+
+    Returns:
+        Danh sách thuật ngữ
+    """
+    return [term for term in map(normalize_term, text.split()) if term]
+
+def get_index(text: str, chunk_size: int = 512, directory: Optional[Union[str, Path]] = None) -> BM25Index:
+    """Lấy chỉ mục BM25 của văn bản, chỉ xây dựng lần đầu với mỗi văn bản
+
+    Args:
+        text: Văn bản gốc (chưa tiền xử lý)
+        chunk_size: Kích thước mỗi đoạn (số từ)
+        directory: Thư mục lưu chỉ mục trên đĩa (ví dụ trong kho tài liệu), None để chỉ giữ trong bộ nhớ
+
+    Returns:
+        Chỉ mục của văn bản
+    """
+    key = ("bm25", text, chunk_size)
+    with _index_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    index = BM25Index.load(directory) if directory is not None else None
+    if index is None:
+        index = BM25Index(get_document(text), chunk_size=chunk_size)
+        if directory is not None:
+            try:
+                index.save(directory)
+            except OSError as e:
+                logger.warning(f"Không lưu được chỉ mục BM25: {str(e)}")
+    else:
+        logger.info(f"Đã mở chỉ mục BM25 đã lưu: {Path(directory).name}")
+
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+def get_embedder() -> Embedder:
+    """Lấy bộ nhúng theo MODEL_CONFIG["qa"]["retriever"], chỉ khởi tạo một lần
+
+    Returns:
+        Bộ nhúng
+    """
+    global _embedder
+    settings = MODEL_CONFIG["qa"]["retriever"]
+    with _index_lock:
+        if _embedder is None:
+            if settings.get("embedder") == "sentence-transformers":
+                _embedder = SentenceTransformerEmbedder(settings["model_name"])
+            else:
+                _embedder = HashingEmbedder(dim=settings.get("dim", 384))
+        return _embedder
+
+def get_vector_store(text: str, chunk_size: int = 512,
+                     progress_callback: Optional[ProgressCallback] = None) -> VectorStore:
+    """Lấy kho vector của văn bản, chỉ nhúng lần đầu với mỗi văn bản
+
+    Kho vector được lưu dưới DATA_DIR/vectors theo SHA-256 của văn bản, nên
+    mở lại tài liệu cũ chỉ cần ánh xạ bộ nhớ ma trận đã lưu. Khi tổng dung
+    lượng vượt vectors_max_mb, các kho ít được dùng gần đây nhất bị xóa.
+
+    Args:
+        text: Văn bản gốc (chưa tiền xử lý)
+        chunk_size: Kích thước mỗi đoạn (số từ)
+        progress_callback: Hàm nhận (số đoạn đã nhúng, tổng số đoạn)
+
+    Returns:
+        Kho vector của văn bản
+    """
+    key = ("dense", text, chunk_size)
+    with _index_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    embedder = get_embedder()
+    settings = MODEL_CONFIG["qa"]["retriever"]
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    directory = Path(settings["vectors_dir"]) / f"{digest}-c{chunk_size}"
+
+    store = VectorStore.load(directory, embedder)
+    if store is None:
+        chunks = split_into_chunks(text, chunk_size)
+        store = VectorStore.build(chunks, embedder, progress_callback=progress_callback)
+        try:
+            store.save(directory)
+            prune_stores(settings["vectors_dir"], settings.get("vectors_max_mb", 1024) * 1024 * 1024, keep=directory)
+        except OSError as e:
+            logger.warning(f"Không lưu được kho vector: {str(e)}")
+        logger.info(f"Đã nhúng {len(chunks)} đoạn bằng {embedder.name}")
+    else:
+        logger.info(f"Đã mở kho vector đã lưu: {directory.name}")
+
+    with _index_lock:
+        _index_cache[key] = store
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return store
+
+def get_retriever(text: str, chunk_size: int = 512,
+                  directory: Optional[Union[str, Path]] = None) -> Union[BM25Index, VectorStore]:
+    """Lấy bộ truy xuất của văn bản theo MODEL_CONFIG["qa"]["retriever"]["method"]
+
+    Args:
+        text: Văn bản gốc (chưa tiền xử lý)
+        chunk_size: Kích thước mỗi đoạn (số từ)
+        directory: Thư mục lưu chỉ mục BM25 trên đĩa; kho vector luôn được lưu dưới vectors_dir
+
+    Returns:
+        Chỉ mục BM25 ("bm25") hoặc kho vector ("dense")
+    """
+    if MODEL_CONFIG["qa"]["retriever"].get("method") == "dense":
+        return get_vector_store(text, chunk_size)
+    return get_index(text, chunk_size, directory)
+
+def context_retriever(context: str, chunk_size: int = 512) -> Optional[Union[BM25Index, VectorStore]]:
+    """Bộ truy xuất cho context cần trả lời, chỉ khi context dài hơn một đoạn
+
+    Context ngắn (bản tóm tắt, một đoạn lấy từ kho tài liệu) được dùng trực
+    tiếp, nên các chuỗi chỉ dùng một lần không chiếm chỗ chỉ mục của tài liệu
+    thật trong cache hay tạo kho vector trên đĩa.
+
+    Args:
+        context: Văn bản cần trả lời
+        chunk_size: Kích thước mỗi đoạn (số từ)
+
+    Returns:
+        Chỉ mục BM25 hoặc kho vector (get_retriever), None nếu context ngắn
+    """
+    if len(context.split()) <= chunk_size:
+        return None
+    return get_retriever(context, chunk_size)
+
+def get_corpus() -> CorpusIndex:
+    """Mở kho tài liệu theo MODEL_CONFIG["qa"]["corpus"], chỉ một lần trong tiến trình
+
+    Returns:
+        Kho tài liệu
+    """
+    global _corpus
+    embedder = get_embedder()
+    settings = MODEL_CONFIG["qa"]["corpus"]
+    with _index_lock:
+        if _corpus is None:
+            _corpus = CorpusIndex(
+                settings["index_dir"],
+                embedder,
+                n_lists=settings.get("n_lists"),
+                nprobe=settings.get("nprobe", 8),
+                min_train_size=settings.get("min_train_size", 1024)
+            )
+        return _corpus
+
+def add_to_corpus(text: str, name: str, chunk_size: int = 512) -> int:
+    """Thêm tài liệu vào kho để có thể hỏi đáp trên nhiều tài liệu
+
+    Args:
+        text: Văn bản gốc của tài liệu
+        name: Tên hiển thị (tên file hoặc URL)
+        chunk_size: Kích thước mỗi đoạn (số từ)
+
+    Returns:
+        Số đoạn đã thêm (0 nếu tài liệu đã có trong kho)
+    """
+    doc_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    corpus = get_corpus()
+    if doc_id in corpus:
+        return 0
+    return corpus.add_document(doc_id, name, split_into_chunks(text, chunk_size))
+
+def find_relevant_context(question: str, full_context: str, max_length: int = 512,
+                          progress_callback: Optional[ProgressCallback] = None,
+                          index: Optional[Union[BM25Index, VectorStore]] = None) -> str:
     """Tìm phần context liên quan nhất với câu hỏi
 
     Args:
         question: Câu hỏi cần trả lời
         full_context: Toàn bộ văn bản
         max_length: Độ dài tối đa của context (số từ)
+        progress_callback: Hàm nhận (số bước tra cứu đã xong, tổng số bước)
+        index: Chỉ mục BM25 hoặc kho vector đã xây dựng sẵn cho văn bản, mặc định lấy qua get_retriever
 
     Returns:
         Phần văn bản liên quan nhất đến câu hỏi
     """
-    # Nếu context đủ ngắn, sử dụng toàn bộ
-    if len(full_context.split()) <= max_length:
-        return full_context
-
-    # Chia context thành các đoạn với overlap
-    words = full_context.split()
-    chunk_size = max_length
-    overlap = 100
-    chunks = []
-
-    i = 0
-    while i < len(words):
-        chunk_end = min(i + chunk_size, len(words))
-        chunk = ' '.join(words[i:chunk_end])
-        chunks.append(chunk)
-        i += chunk_size - overlap
-
-    # Tìm điểm số cho mỗi đoạn (số từ chung giữa câu hỏi và đoạn văn)
-    question_words = set(question.lower().split())
-    scores = []
+    if index is None:
+        # Nếu context đủ ngắn, sử dụng toàn bộ
+        if len(full_context.split()) <= max_length:
+            return full_context
+        index = get_retriever(full_context, max_length)
+
+    if len(index.chunks) <= 1:
+        return index.chunks[0] if index.chunks else full_context
+
+    results = index.search(question, top_k=1, progress_callback=progress_callback)
+
+    # Lấy đoạn có điểm cao nhất, nếu không có đoạn nào chứa từ của câu hỏi thì lấy đoạn đầu tiên
+    if results:
+        return index.chunks[results[0][0]]
+    return index.chunks[0]
 
-    for chunk in chunks:
-        chunk_words = set(chunk.lower().split())
-        common_words = question_words.intersection(chunk_words)
-        scores.append(len(common_words))
 """Module xử lý hỏi đáp (Question-Answering)"""
 
 import logging
@@ -172,20 +554,14 @@ def answer_question(question: str, context: str) -> Union[Dict[str, Any], str]:
     except Exception as e:
         logger.error(f"Lỗi khi xử lý câu hỏi: {str(e)}")
         return f"Đã xảy ra lỗi khi xử lý câu hỏi: {str(e)}"
-    # Lấy đoạn có điểm cao nhất
-    if max(scores) > 0:
-        best_chunk_index = scores.index(max(scores))
-        return chunks[best_chunk_index]
-    else:
-        # Nếu không tìm thấy đoạn nào có từ chung, lấy đoạn đầu tiên
-        return chunks[0]
 
-def simulate_qa_response(question: str, context: str) -> Dict[str, Any]:
+def simulate_qa_response(question: str, context: str, embedder: Optional[Embedder] = None) -> Dict[str, Any]:
     """Mô phỏng phản hồi hỏi đáp trong môi trường demo
 
     Args:
         question: Câu hỏi cần trả lời
         context: Văn bản chứa thông tin
+        embedder: Bộ nhúng để chọn câu theo độ tương đồng ngữ nghĩa thay vì số từ chung
 
     Returns:
         Kết quả trả lời và điểm tin cậy
@@ -196,16 +572,21 @@ def simulate_qa_response(question: str, context: str) -> Dict[str, Any]:
     time.sleep(1.0)
 
     # Tách thành câu
-    sentences = [s.strip() for s in context.replace(".", ".<stop>").split("<stop>") if s.strip()]
+    sentences = get_sentences(context)
 
     # Tìm câu liên quan nhất
     question_words = set(question.lower().split())
     sentence_scores = []
 
-    for sentence in sentences:
-        sentence_words = set(sentence.lower().split())
-        common_words = len(question_words.intersection(sentence_words))
-        sentence_scores.append((sentence, common_words))
+    if embedder is not None and sentences:
+        # Độ tương đồng cosine của mọi câu với câu hỏi trong một phép nhân ma trận
+        similarities = embedder.embed(sentences) @ embedder.embed([question])[0]
+        sentence_scores = list(zip(sentences, similarities.tolist()))
+    else:
+        for sentence in sentences:
+            sentence_words = set(sentence.lower().split())
+            common_words = len(question_words.intersection(sentence_words))
+            sentence_scores.append((sentence, common_words))
 
     # Sắp xếp câu theo điểm số
     sentence_scores.sort(key=lambda x: x[1], reverse=True)
@@ -219,8 +600,11 @@ def simulate_qa_response(question: str, context: str) -> Dict[str, Any]:
                 best_sentence += " " + sentence_scores[i+1][0]
                 break
 
-        # Điểm tin cậy dựa trên số từ chung
-        confidence = min(0.9, max(0.5, sentence_scores[0][1] / max(1, len(question_words))))
+        # Điểm tin cậy dựa trên độ tương đồng hoặc số từ chung
+        if embedder is not None:
+            confidence = min(0.9, max(0.5, sentence_scores[0][1]))
+        else:
+            confidence = min(0.9, max(0.5, sentence_scores[0][1] / max(1, len(question_words))))
 
         return {
             "answer": best_sentence,
@@ -233,12 +617,17 @@ def simulate_qa_response(question: str, context: str) -> Dict[str, Any]:
             "score": 0.1
         }
 
-def answer_question(question: str, context: str) -> Union[Dict[str, Any], str]:
+def answer_question(question: str, context: str,
+                    progress_callback: Optional[ProgressCallback] = None,
+                    index: Optional[Union[BM25Index, VectorStore]] = None) -> Union[Dict[str, Any], str]:
     """Trả lời câu hỏi dựa trên văn bản
 
     Args:
         question: Câu hỏi cần trả lời
         context: Văn bản chứa thông tin để trả lời
+        progress_callback: Hàm nhận (số bước đã xong, tổng số bước) gồm các từ
+            của câu hỏi được tra chỉ mục và bước tạo câu trả lời
+        index: Chỉ mục BM25 hoặc kho vector của context (từ get_retriever), dùng lại giữa các câu hỏi
 
     Returns:
         Kết quả trả lời kèm điểm tin cậy, hoặc thông báo lỗi
@@ -253,48 +642,190 @@ def answer_question(question: str, context: str) -> Union[Dict[str, Any], str]:
     try:
         # Tiền xử lý
         preprocessed_question = preprocess_text(question)
-        preprocessed_context = preprocess_text(context)
-
-        # Tìm context liên quan
-        relevant_context = find_relevant_context(preprocessed_question, preprocessed_context)
-
-        # Kiểm tra nếu câu hỏi thuộc dạng đặc biệt
-        result = None
-
-        # Câu hỏi về chủ đề/tiêu đề
-        if re.search(r'(chủ đề|tiêu đề|nói về gì|về gì|chủ yếu|ý chính)', preprocessed_question.lower()):
-            # Lấy câu đầu tiên làm ý chính
-            sentences = [s.strip() for s in relevant_context.replace(".", ".<stop>").split("<stop>") if s.strip()]
-            if sentences:
-                result = {
-                    "answer": f"Văn bản chủ yếu nói về {sentences[0]}",
-                    "score": 0.85
-                }
-
-        # Câu hỏi về điểm quan trọng nhất
-        elif re.search(r'(quan trọng nhất|điểm chính|đáng chú ý nhất)', preprocessed_question.lower()):
-            sentences = [s.strip() for s in relevant_context.replace(".", ".<stop>").split("<stop>") if s.strip()]
-            if len(sentences) > 1:
-                result = {
-                    "answer": f"Điểm quan trọng nhất là {sentences[1]}",
-                    "score": 0.8
-                }
-
-        # Câu hỏi về kết luận
-        elif re.search(r'(kết luận|kết quả|cuối cùng)', preprocessed_question.lower()):
-            sentences = [s.strip() for s in relevant_context.replace(".", ".<stop>").split("<stop>") if s.strip()]
-            if sentences:
-                result = {
-                    "answer": f"Kết luận của văn bản là {sentences[-1]}",
-                    "score": 0.82
-                }
-
-        # Các câu hỏi khác, sử dụng mô phỏng QA
-        if result is None:
-            result = simulate_qa_response(preprocessed_question, relevant_context)
 
+        # Tìm context liên quan qua chỉ mục, chừa một bước cuối cho việc tạo câu trả lời
+        index = index or context_retriever(context)
+        relevant_context = find_relevant_context(
+            preprocessed_question, context,
+            progress_callback=lambda done, total: report_progress(progress_callback, done, total + 1),
+            index=index
+        )
+
+        result = generate_answer(preprocessed_question, relevant_context, index)
+        report_progress(progress_callback, 1, 1)
         return result
 
     except Exception as e:
         logger.error(f"Lỗi khi trả lời câu hỏi: {str(e)}")
-        return f"Đã xảy ra lỗi khi xử lý câu hỏi: {str(e)}"
\ No newline at end of file
+        return f"Đã xảy ra lỗi khi xử lý câu hỏi: {str(e)}"
+
+def generate_answer(question: str, relevant_context: str,
+                    index: Optional[Union[BM25Index, VectorStore]] = None) -> Dict[str, Any]:
+    """Tạo câu trả lời từ đoạn văn bản liên quan đã tìm được
+
+    Args:
+        question: Câu hỏi đã tiền xử lý
+        relevant_context: Đoạn văn bản liên quan nhất (find_relevant_context)
+        index: Bộ truy xuất của văn bản, dùng lại bộ nhúng của kho vector nếu có;
+            None với context ngắn, khi đó dùng bộ nhúng chung nếu truy xuất ngữ nghĩa được bật
+
+    Returns:
+        Kết quả trả lời kèm điểm tin cậy
+    """
+    # Câu hỏi về chủ đề/tiêu đề
+    if re.search(r'(chủ đề|tiêu đề|nói về gì|về gì|chủ yếu|ý chính)', question.lower()):
+        # Lấy câu đầu tiên làm ý chính
+        sentences = get_sentences(relevant_context)
+        if sentences:
+            return {
+                "answer": f"Văn bản chủ yếu nói về {sentences[0]}",
+                "score": 0.85
+            }
+
+    # Câu hỏi về điểm quan trọng nhất
+    elif re.search(r'(quan trọng nhất|điểm chính|đáng chú ý nhất)', question.lower()):
+        sentences = get_sentences(relevant_context)
+        if len(sentences) > 1:
+            return {
+                "answer": f"Điểm quan trọng nhất là {sentences[1]}",
+                "score": 0.8
+            }
+
+    # Câu hỏi về kết luận
+    elif re.search(r'(kết luận|kết quả|cuối cùng)', question.lower()):
+        sentences = get_sentences(relevant_context)
+        if sentences:
+            return {
+                "answer": f"Kết luận của văn bản là {sentences[-1]}",
+                "score": 0.82
+            }
+
+    # Các câu hỏi khác, sử dụng mô phỏng QA
+    embedder = getattr(index, "embedder", None)
+    if index is None and MODEL_CONFIG["qa"]["retriever"].get("method") == "dense":
+        embedder = get_embedder()
+    return simulate_qa_response(question, relevant_context, embedder)
+
+def answer_with_fallback(question: str, text: str, summary: str = "",
+                         index: Optional[Union[BM25Index, VectorStore]] = None,
+                         progress_callback: Optional[ProgressCallback] = None,
+                         min_score: float = FALLBACK_MIN_SCORE) -> Union[Dict[str, Any], str]:
+    """Trả lời câu hỏi trên toàn bộ văn bản, dùng bản tóm tắt khi không tìm được câu trả lời
+
+    Args:
+        question: Câu hỏi cần trả lời
+        text: Toàn bộ văn bản gốc
+        summary: Bản tóm tắt, chỉ dùng khi trả lời trên văn bản gốc thất bại
+        index: Chỉ mục BM25 hoặc kho vector của văn bản gốc, xây dựng sẵn lúc nạp tài liệu
+        progress_callback: Hàm nhận (số bước đã xong, tổng số bước)
+        min_score: Điểm tin cậy tối thiểu để chấp nhận câu trả lời từ văn bản gốc
+
+    Returns:
+        Kết quả trả lời kèm điểm tin cậy và nguồn ("text" hoặc "summary"), hoặc thông báo lỗi
+    """
+    result = answer_question(question, text, progress_callback=progress_callback, index=index)
+    if isinstance(result, dict) and result.get("score", 0) >= min_score:
+        return {**result, "source": "text"}
+
+    if summary and summary.strip():
+        logger.info("Không tìm được câu trả lời trong văn bản gốc, thử lại với bản tóm tắt")
+        fallback = answer_question(question, summary)
+        if isinstance(fallback, dict):
+            return {**fallback, "source": "summary"}
+
+    if isinstance(result, dict):
+        return {**result, "source": "text"}
+    return result
+
+def answer_question_stream(question: str, context: str, summary: str = "",
+                           index: Optional[Union[BM25Index, VectorStore]] = None,
+                           progress_callback: Optional[ProgressCallback] = None,
+                           min_score: float = FALLBACK_MIN_SCORE) -> Iterator[Dict[str, Any]]:
+    """Trả lời câu hỏi như answer_with_fallback, trả về kết quả từng phần
+
+    Đoạn văn bản liên quan được trả về ngay sau bước truy xuất, trước khi tạo
+    câu trả lời (bước chậm nhất), để người dùng thấy nguồn thông tin sớm.
+
+    Args:
+        question: Câu hỏi cần trả lời
+        context: Toàn bộ văn bản gốc
+        summary: Bản tóm tắt, chỉ dùng khi không tìm được câu trả lời trong văn bản gốc
+        index: Chỉ mục BM25 hoặc kho vector của văn bản gốc
+        progress_callback: Hàm nhận (số bước đã xong, tổng số bước)
+        min_score: Điểm tin cậy tối thiểu để chấp nhận câu trả lời từ văn bản gốc
+
+    Yields:
+        {"type": "partial", "text"}: đoạn văn bản liên quan nhất
+        {"type": "token", "text"}: câu trả lời
+        {"type": "done", "answer", "score", "source", "context", "time_to_first_output", "total_seconds"}
+        hoặc {"type": "error", "message"} khi câu hỏi không hợp lệ hoặc xảy ra lỗi
+    """
+    if not question or not question.strip():
+        yield {"type": "error", "message": "Câu hỏi không hợp lệ. Vui lòng nhập câu hỏi."}
+        return
+    if not context or not context.strip():
+        yield {"type": "error", "message": "Không có nội dung để trả lời câu hỏi."}
+        return
+
+    def events() -> Iterator[Dict[str, Any]]:
+        preprocessed_question = preprocess_text(question)
+        retriever = index or context_retriever(context)
+        relevant_context = find_relevant_context(
+            preprocessed_question, context,
+            progress_callback=lambda done, total: report_progress(progress_callback, done, total + 1),
+            index=retriever
+        )
+        yield {"type": "partial", "text": relevant_context}
+
+        result = {**generate_answer(preprocessed_question, relevant_context, retriever), "source": "text"}
+        if result.get("score", 0) < min_score and summary and summary.strip():
+            logger.info("Không tìm được câu trả lời trong văn bản gốc, thử lại với bản tóm tắt")
+            fallback = answer_question(question, summary)
+            if isinstance(fallback, dict):
+                result = {**fallback, "source": "summary"}
+        report_progress(progress_callback, 1, 1)
+
+        yield {"type": "token", "text": result["answer"]}
+        yield {"type": "done", **result, "context": relevant_context}
+
+    try:
+        yield from measure_stream(events(), "Trả lời câu hỏi")
+    except Exception as e:
+        logger.error(f"Lỗi khi trả lời câu hỏi: {str(e)}")
+        yield {"type": "error", "message": f"Đã xảy ra lỗi khi xử lý câu hỏi: {str(e)}"}
+
+def answer_from_corpus(question: str, top_k: Optional[int] = None,
+                       progress_callback: Optional[ProgressCallback] = None) -> Union[Dict[str, Any], str]:
+    """Trả lời câu hỏi trên toàn bộ kho tài liệu qua chỉ mục láng giềng gần đúng
+
+    Args:
+        question: Câu hỏi cần trả lời
+        top_k: Số đoạn liên quan được lấy từ kho, mặc định theo cấu hình
+        progress_callback: Hàm nhận (số bước đã xong, tổng số bước)
+
+    Returns:
+        Kết quả trả lời kèm điểm tin cậy và danh sách nguồn ("sources"), hoặc thông báo lỗi
+    """
+    if not question or not question.strip():
+        return "Câu hỏi không hợp lệ. Vui lòng nhập câu hỏi."
+
+    try:
+        corpus = get_corpus()
+        if not len(corpus):
+            return "Kho tài liệu đang trống. Vui lòng xử lý tài liệu trước."
+
+        hits = corpus.search(preprocess_text(question), top_k=top_k or MODEL_CONFIG["qa"]["corpus"].get("top_k", 3))
+        if not hits:
+            return "Không tìm thấy tài liệu liên quan trong kho."
+
+        # Trả lời trên đoạn liên quan nhất, các đoạn còn lại được liệt kê làm nguồn tham khảo
+        result = answer_question(question, hits[0]["text"], progress_callback=progress_callback)
+        if not isinstance(result, dict):
+            return result
+
+        sources = [{"name": hit["name"], "chunk": hit["chunk"], "score": hit["score"]} for hit in hits]
+        return {**result, "source": "corpus", "sources": sources}
+
+    except Exception as e:
+        logger.error(f"Lỗi khi trả lời câu hỏi trên kho tài liệu: {str(e)}")
+        return f"Đã xảy ra lỗi khi xử lý câu hỏi: {str(e)}"
@@ -1,10 +1,25 @@
 """Module chức năng tóm tắt văn bản sử dụng mô hình AI"""
 """Module xử lý tóm tắt văn bản"""
 
+import atexit
 import logging
-import time
+import multiprocessing
 import re
-from typing import Optional, Dict, Any, List
+import time
+import os
+import textwrap
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Dict, Any, Generator, Iterable, Iterator, Optional, List, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+from src.config import MODEL_CONFIG
+from src.utils.progress import ProgressCallback, measure_stream, report_progress
+from src.utils.document import get_document
+from src.utils.segmentation import get_sentences, sentence_spans
 
 # Thiết lập logging
 logger = logging.getLogger(__name__)
@@ -140,14 +155,15 @@ def summarize(text: str, length: str = "medium") -> str:
     except Exception as e:
         logger.error(f"Lỗi khi tóm tắt văn bản: {str(e)}")
         return f"Đã xảy ra lỗi khi tóm tắt: {str(e)}"
-import logging
-import time
-import os
-import textwrap
-from typing import Dict, Any, Optional, List, Union
 
-# Thiết lập logging
-logger = logging.getLogger(__name__)
+# Mẫu tách từ theo khoảng trắng, tương đương str.split()
+_WORD_PATTERN = re.compile(r"\S+")
+
+# Số từ chồng lấp giữa các đoạn liên tiếp
+CHUNK_OVERLAP = 100
+
+# Số cấp tối đa của cây map-reduce, tránh lặp vô hạn với backend không rút gọn được
+MAX_TREE_DEPTH = 10
 
 # Định nghĩa các cấp độ tóm tắt
 LENGTH_CONFIG: Dict[str, Dict[str, Any]] = {
@@ -184,8 +200,20 @@ def simulate_ai_summarization(text: str, config: Dict[str, Any]) -> str:
     # Đảm bảo có độ trễ tự nhiên để mô phỏng thực tế
     time.sleep(1.5)
 
+    return extract_key_sentences(text, config)
+
+def extract_key_sentences(text: str, config: Dict[str, Any]) -> str:
+    """Tóm tắt trích xuất đơn giản: câu đầu, một số câu ở giữa và câu cuối
+
+    Args:
+        text: Văn bản cần tóm tắt
+        config: Cấu hình tóm tắt
+
+    Returns:
+        Bản tóm tắt
+    """
     # Chiến lược tóm tắt đơn giản: lấy các câu đầu tiên dựa trên độ dài yêu cầu
-    sentences = [s.strip() + "." for s in text.replace(".", ".<stop>").split("<stop>") if s.strip()]
+    sentences = get_sentences(text)
 
     # Tính số câu dựa trên cấu hình độ dài
     if config["description"] == "ngắn gọn, tập trung vào điểm chính nhất":
@@ -223,6 +251,530 @@ def simulate_ai_summarization(text: str, config: Dict[str, Any]) -> str:
 
     return summary
 
+def build_tfidf_matrix(text: str, ends: np.ndarray) -> sparse.csr_matrix:
+    """Xây dựng ma trận TF-IDF thưa (câu × từ) đã chuẩn hóa L2
+
+    Dùng lại các mảng vị trí và id thuật ngữ của mô hình tài liệu (get_document),
+    mỗi từ được gán vào câu chứa nó bằng np.searchsorted trên vị trí kết thúc câu.
+
+    Args:
+        text: Văn bản gốc
+        ends: Vị trí kết thúc của các câu
+
+    Returns:
+        Ma trận TF-IDF dạng CSR (câu rỗng có hàng toàn 0)
+    """
+    n_sentences = len(ends)
+    document = get_document(text)
+    # Bỏ các từ chỉ gồm dấu câu (id -1)
+    has_term = document.term_ids >= 0
+    term_ids = document.term_ids[has_term]
+    if not term_ids.size:
+        return sparse.csr_matrix((n_sentences, 0), dtype=np.float32)
+
+    sentence_ids = np.searchsorted(ends, document.starts[has_term], side="right")
+    n_terms = len(document.terms)
+
+    # Các cặp (câu, từ) trùng lặp được cộng dồn thành tần suất
+    tf = sparse.csr_matrix(
+        (np.ones(len(term_ids), dtype=np.float32), (sentence_ids, term_ids)),
+        shape=(n_sentences, n_terms)
+    )
+    tf.sum_duplicates()
+
+    # IDF có làm trơn: log((1 + n) / (1 + df)) + 1
+    df = np.bincount(tf.indices, minlength=n_terms)
+    idf = (np.log((1 + n_sentences) / (1 + df)) + 1).astype(np.float32)
+    tfidf = tf.multiply(idf).tocsr()
+
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(tfidf).tocsr()
+
+def unique_rows(matrix: sparse.csr_matrix) -> np.ndarray:
+    """Tìm các hàng khác 0 không trùng lặp của ma trận thưa, giữ lần xuất hiện đầu tiên
+
+    Mỗi phần tử (cột, giá trị) được băm 64-bit (splitmix64) rồi cộng theo hàng
+    bằng np.add.reduceat, các hàng trùng nhau có cùng mã băm nên np.unique tìm
+    được mà không cần vòng lặp Python theo từng hàng.
+
+    Args:
+        matrix: Ma trận CSR (ví dụ TF-IDF câu × từ)
+
+    Returns:
+        Chỉ số các hàng giữ lại, tăng dần
+    """
+    rows = np.flatnonzero(np.diff(matrix.indptr) > 0)
+    if not rows.size:
+        return rows
+    matrix.sort_indices()
+
+    values = np.ascontiguousarray(matrix.data, dtype=np.float32).view(np.uint32).astype(np.uint64)
+    hashes = (matrix.indices.astype(np.uint64) << np.uint64(32)) | values
+    hashes ^= hashes >> np.uint64(30)
+    hashes *= np.uint64(0xBF58476D1CE4E5B9)
+    hashes ^= hashes >> np.uint64(27)
+    hashes *= np.uint64(0x94D049BB133111EB)
+    hashes ^= hashes >> np.uint64(31)
+
+    # Hàng rỗng không có phần tử nên mỗi khoảng reduceat đúng bằng một hàng khác 0
+    row_hashes = np.add.reduceat(hashes, matrix.indptr[rows])
+    _, first = np.unique(row_hashes, return_index=True)
+    return rows[np.sort(first)]
+
+def textrank_scores(matrix: sparse.csr_matrix, damping: float = 0.85,
+                    max_iter: int = 100, tol: float = 1e-6) -> np.ndarray:
+    """Tính điểm TextRank của các câu bằng phép lặp lũy thừa
+
+    Đồ thị câu có trọng số là độ tương đồng cosine S = X·Xᵀ (bỏ đường chéo).
+    S không được dựng tường minh: mỗi phép nhân S·w được tính bằng
+    X·(Xᵀ·w) - diag(S)·w, nên chi phí tỷ lệ với số phần tử khác 0 của X.
+
+    Args:
+        matrix: Ma trận TF-IDF đã chuẩn hóa L2 (câu × từ)
+        damping: Hệ số giảm chấn của PageRank
+        max_iter: Số vòng lặp tối đa
+        tol: Ngưỡng hội tụ (chuẩn L1 của độ thay đổi)
+
+    Returns:
+        Mảng điểm của từng câu, tổng bằng 1
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+
+    matrix_t = matrix.T.tocsr()
+    self_similarity = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+
+    def similarity_dot(vector: np.ndarray) -> np.ndarray:
+        return matrix.dot(matrix_t.dot(vector)) - self_similarity * vector
+
+    # Tổng trọng số cạnh đi ra của mỗi câu; câu cô lập phân phối đều điểm của nó
+    out_weight = similarity_dot(np.ones(n))
+    dangling = out_weight <= 1e-12
+    out_weight[dangling] = 1
+
+    scores = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        spread = scores / out_weight
+        spread[dangling] = 0
+        updated = (1 - damping) / n + damping * (similarity_dot(spread) + scores[dangling].sum() / n)
+        updated /= updated.sum()
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+def textrank_summarize(text: str, config: Dict[str, Any]) -> str:
+    """Tóm tắt trích xuất bằng TF-IDF và TextRank
+
+    Chọn các câu có điểm cao nhất cho tới khi hết ngân sách max_length từ của
+    LENGTH_CONFIG, rồi ghép lại theo thứ tự xuất hiện trong văn bản.
+
+    Args:
+        text: Văn bản cần tóm tắt
+        config: Cấu hình độ dài từ LENGTH_CONFIG
+
+    Returns:
+        Bản tóm tắt
+    """
+    spans = sentence_spans(text)
+    if not len(spans):
+        return ""
+
+    ends = spans[:, 1]
+    word_starts = get_document(text).starts
+    word_counts = np.bincount(np.searchsorted(ends, word_starts, side="right"), minlength=len(ends))
+    matrix = build_tfidf_matrix(text, ends)
+
+    # Bỏ các câu không có từ nào và các câu lặp lại (ví dụ từ phần chồng lấp giữa các đoạn)
+    keep = unique_rows(matrix)
+    if not keep.size:
+        return ""
+    scores = textrank_scores(matrix[keep])
+
+    # Lấy các câu theo thứ hạng, dừng khi vượt ngân sách từ
+    ranked = keep[np.argsort(-scores, kind="stable")]
+    within_budget = int((np.cumsum(word_counts[ranked]) <= config["max_length"]).sum())
+    selected = np.sort(ranked[:max(1, within_budget)])
+
+    summary = " ".join(text[start:end] for start, end in spans[selected].tolist())
+
+    # Câu đơn lẻ dài hơn ngân sách vẫn bị cắt bớt
+    words = summary.split()
+    if len(words) > config["max_length"]:
+        summary = " ".join(words[:config["max_length"]]) + "..."
+    return summary
+
+class SummarizationBackend:
+    """Giao diện chung cho các engine tóm tắt
+
+    Các backend nhận một lô đoạn văn bản và trả về bản tóm tắt tương ứng theo
+    đúng thứ tự, để engine có hỗ trợ có thể xử lý cả lô trong một lần gọi.
+    """
+
+    name = "base"
+
+    # Cách chạy song song các đoạn: "thread" cho backend chờ I/O hoặc tính
+    # toán bằng NumPy/SciPy (nhả GIL), "process" cho backend tính toán thuần
+    # Python nặng, "batch" cho backend tự xử lý cả lô trong một lượt suy luận
+    concurrency = "thread"
+
+    def summarize(self, text: str, config: Dict[str, Any]) -> str:
+        """Tóm tắt một đoạn văn bản
+
+        Args:
+            text: Văn bản cần tóm tắt
+            config: Cấu hình độ dài từ LENGTH_CONFIG
+
+        Returns:
+            Bản tóm tắt
+        """
+        raise NotImplementedError
+
+    def summarize_batch(self, texts: List[str], config: Dict[str, Any]) -> List[str]:
+        """Tóm tắt một lô đoạn văn bản
+
+        Args:
+            texts: Danh sách đoạn văn bản
+            config: Cấu hình độ dài từ LENGTH_CONFIG
+
+        Returns:
+            Danh sách bản tóm tắt theo đúng thứ tự đầu vào
+        """
+        return [self.summarize(text, config) for text in texts]
+
+    def stream(self, text: str, config: Dict[str, Any]) -> Iterator[str]:
+        """Tóm tắt một đoạn văn bản, trả về từng phần ngay khi được sinh ra
+
+        Backend sinh văn bản (mô hình ngôn ngữ) trả về từng token; mặc định
+        trả về cả bản tóm tắt một lần.
+
+        Args:
+            text: Văn bản cần tóm tắt
+            config: Cấu hình độ dài từ LENGTH_CONFIG
+
+        Yields:
+            Các phần nối tiếp nhau của bản tóm tắt
+        """
+        yield self.summarize(text, config)
+
+class SimulatedBackend(SummarizationBackend):
+    """Backend mô phỏng cho môi trường demo, có độ trễ giả lập"""
+
+    name = "simulate"
+
+    def summarize(self, text: str, config: Dict[str, Any]) -> str:
+        return simulate_ai_summarization(text, config)
+
+class ExtractiveBackend(SummarizationBackend):
+    """Backend trích xuất câu quan trọng, chạy ngay trên CPU không cần mô hình"""
+
+    name = "extractive"
+
+    def summarize(self, text: str, config: Dict[str, Any]) -> str:
+        return extract_key_sentences(text, config)
+
+class TextRankBackend(SummarizationBackend):
+    """Backend trích xuất xếp hạng câu bằng TF-IDF thưa và TextRank (NumPy/SciPy)"""
+
+    name = "textrank"
+
+    def summarize(self, text: str, config: Dict[str, Any]) -> str:
+        return textrank_summarize(text, config)
+
+class TransformersBackend(SummarizationBackend):
+    """Backend dùng mô hình seq2seq của Hugging Face Transformers chạy cục bộ
+
+    Mô hình được tải một lần khi khởi tạo và sinh tóm tắt theo lô bằng
+    model.generate. Tự động dùng CPU khi không có GPU.
+    """
+
+    name = "transformers"
+    concurrency = "batch"
+
+    # Tỷ lệ xấp xỉ giữa số token và số từ
+    TOKENS_PER_WORD = 1.3
+
+    def __init__(self, model_name: str, use_gpu: bool = False, batch_size: int = 8, max_input_length: int = 1024):
+        """Tải mô hình tóm tắt
+
+        Args:
+            model_name: Tên hoặc đường dẫn mô hình
+            use_gpu: Dùng GPU nếu có
+            batch_size: Số đoạn văn bản trong mỗi lượt suy luận
+            max_input_length: Số token đầu vào tối đa của mỗi đoạn
+        """
+        try:
+            import torch
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "Backend 'transformers' cần cài đặt thêm: pip install transformers torch"
+            ) from e
+
+        self.torch = torch
+        self.device = "cuda" if use_gpu and torch.cuda.is_available() else "cpu"
+        logger.info(f"Đang tải mô hình tóm tắt {model_name} ({self.device})")
+
+        self.batch_size = batch_size
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(self.device)
+        self.model.eval()
+        self.max_input_length = min(max_input_length, self.tokenizer.model_max_length)
+        # Độ dài bản tóm tắt theo LENGTH_CONFIG, chỉ bị giới hạn thêm khi cấu hình sinh của
+        # mô hình (generation_config) đặt max_length, ví dụ 142 token với bart-large-cnn
+        generation_config = getattr(self.model, "generation_config", None)
+        explicit = generation_config.to_diff_dict() if generation_config is not None else {}
+        self.max_output_length: Optional[int] = explicit.get("max_length")
+
+    def summarize(self, text: str, config: Dict[str, Any]) -> str:
+        return self.summarize_batch([text], config)[0]
+
+    def _generate_kwargs(self, batch: List[str], config: Dict[str, Any]) -> Dict[str, Any]:
+        """Tham số của model.generate cho một lô đoạn văn bản"""
+        # Giới hạn độ dài theo token, không yêu cầu dài hơn đoạn ngắn nhất trong lô
+        max_length = int(config["max_length"] * self.TOKENS_PER_WORD)
+        if self.max_output_length:
+            max_length = min(max_length, self.max_output_length)
+        shortest = min(len(text.split()) for text in batch)
+        min_length = min(int(config["min_length"] * self.TOKENS_PER_WORD), max(1, shortest // 2), max_length)
+
+        inputs = self.tokenizer(
+            batch,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_input_length
+        ).to(self.device)
+        return {**inputs, "max_length": max_length, "min_length": min_length, "do_sample": False}
+
+    def summarize_batch(self, texts: List[str], config: Dict[str, Any]) -> List[str]:
+        summaries: List[str] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            with self.torch.no_grad():
+                output_ids = self.model.generate(**self._generate_kwargs(batch, config))
+
+            summaries.extend(
+                summary.strip()
+                for summary in self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+            )
+        return summaries
+
+    def stream(self, text: str, config: Dict[str, Any]) -> Iterator[str]:
+        from transformers import TextIteratorStreamer
+
+        # model.generate chạy trong luồng riêng, streamer nhận từng token đã giải mã
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        kwargs = {**self._generate_kwargs([text], config), "streamer": streamer}
+
+        def generate():
+            with self.torch.no_grad():
+                self.model.generate(**kwargs)
+
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        try:
+            for piece in streamer:
+                if piece:
+                    yield piece
+        finally:
+            thread.join()
+
+# Các backend tóm tắt có thể chọn qua MODEL_CONFIG["summarization"]["backend"]
+SUMMARIZATION_BACKENDS = {
+    SimulatedBackend.name: SimulatedBackend,
+    ExtractiveBackend.name: ExtractiveBackend,
+    TextRankBackend.name: TextRankBackend,
+    TransformersBackend.name: TransformersBackend,
+}
+
+# Backend đã khởi tạo, giữ trong module nên tồn tại qua các lần rerun của Streamlit
+_backends: Dict[str, SummarizationBackend] = {}
+_backends_lock = threading.Lock()
+
+# Pool thread/process dùng chung cho bước tóm tắt song song, tạo khi cần
+_executors: Dict[Tuple[str, int], Executor] = {}
+_executors_lock = threading.Lock()
+
+def get_backend(name: Optional[str] = None) -> SummarizationBackend:
+    """Lấy backend tóm tắt, mỗi backend chỉ được khởi tạo một lần trong tiến trình
+
+    Args:
+        name: Tên backend, mặc định theo MODEL_CONFIG["summarization"]["backend"]
+
+    Returns:
+        Đối tượng backend
+    """
+    settings = MODEL_CONFIG["summarization"]
+    name = name or settings.get("backend", ExtractiveBackend.name)
+    if name not in SUMMARIZATION_BACKENDS:
+        raise ValueError(f"Không hỗ trợ backend tóm tắt '{name}'. Các lựa chọn: {', '.join(SUMMARIZATION_BACKENDS)}")
+
+    with _backends_lock:
+        if name not in _backends:
+            if name == TransformersBackend.name:
+                _backends[name] = TransformersBackend(
+                    settings["model_name"],
+                    use_gpu=settings.get("use_gpu", False),
+                    batch_size=settings.get("batch_size", 8),
+                    max_input_length=settings.get("max_length", 1024)
+                )
+            else:
+                _backends[name] = SUMMARIZATION_BACKENDS[name]()
+        return _backends[name]
+
+def _get_executor(kind: str, max_workers: int) -> Executor:
+    """Lấy pool dùng chung để không phải khởi tạo lại ở mỗi lần tóm tắt
+
+    Args:
+        kind: "thread" hoặc "process"
+        max_workers: Số luồng/tiến trình tối đa
+
+    Returns:
+        Executor tương ứng
+    """
+    if kind == "process" and multiprocessing.parent_process() is not None:
+        # Đã chạy trong tiến trình con (src.worker, pool của src.batch): không tạo thêm tầng tiến trình
+        kind = "thread"
+    with _executors_lock:
+        key = (kind, max_workers)
+        if key not in _executors:
+            executor_class = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+            _executors[key] = executor_class(max_workers=max_workers)
+        return _executors[key]
+
+@atexit.register
+def _shutdown_executors():
+    """Dừng các pool dùng chung khi tiến trình kết thúc, bỏ các đoạn chưa bắt đầu"""
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
+
+def _summarize_in_worker(backend_name: str, text: str, config: Dict[str, Any]) -> str:
+    """Tóm tắt một đoạn trong tiến trình con, backend được khởi tạo lại theo tên
+
+    Args:
+        backend_name: Tên backend
+        text: Đoạn văn bản
+        config: Cấu hình độ dài
+
+    Returns:
+        Bản tóm tắt
+    """
+    return get_backend(backend_name).summarize(text, config)
+
+def iter_summarize_chunks(chunks: List[str], config: Dict[str, Any], backend: Optional[SummarizationBackend] = None,
+                          progress_callback: Optional[ProgressCallback] = None,
+                          total_steps: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Tóm tắt danh sách đoạn văn bản (bước map), trả về từng bản tóm tắt ngay khi xong
+
+    Backend xử lý theo lô được gọi tuần tự từng lô, các backend còn lại được
+    chạy song song từng đoạn trên pool thread hoặc process với số luồng giới
+    hạn bởi MODEL_CONFIG["summarization"]["max_concurrency"].
+
+    Args:
+        chunks: Danh sách đoạn văn bản
+        config: Cấu hình độ dài từ LENGTH_CONFIG
+        backend: Backend tóm tắt, mặc định theo cấu hình
+        progress_callback: Hàm nhận (số đoạn đã tóm tắt, tổng số bước)
+        total_steps: Tổng số bước báo cho callback, mặc định bằng số đoạn
+
+    Yields:
+        (vị trí đoạn, bản tóm tắt) theo thứ tự hoàn thành
+    """
+    backend = backend or get_backend()
+    settings = MODEL_CONFIG["summarization"]
+    max_workers = max(1, settings.get("max_concurrency", 1))
+    total_steps = total_steps or len(chunks)
+
+    if backend.concurrency == "batch" or max_workers == 1 or len(chunks) <= 1:
+        batch_size = max(1, settings.get("batch_size", 8))
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            logger.info(f"Đang tóm tắt đoạn {start + 1}-{start + len(batch)}/{len(chunks)} bằng backend {backend.name}")
+            summaries = backend.summarize_batch(batch, config)
+            report_progress(progress_callback, start + len(batch), total_steps)
+            yield from enumerate(summaries, start=start)
+        return
+
+    logger.info(f"Đang tóm tắt song song {len(chunks)} đoạn bằng backend {backend.name} "
+                f"({backend.concurrency}, tối đa {max_workers})")
+    executor = _get_executor(backend.concurrency, max_workers)
+    if backend.concurrency == "process":
+        futures = {executor.submit(_summarize_in_worker, backend.name, chunk, config): i for i, chunk in enumerate(chunks)}
+    else:
+        futures = {executor.submit(backend.summarize, chunk, config): i for i, chunk in enumerate(chunks)}
+
+    try:
+        for done, future in enumerate(as_completed(futures), start=1):
+            report_progress(progress_callback, done, total_steps)
+            yield futures[future], future.result()
+    finally:
+        # Người dùng dừng đọc giữa chừng: bỏ các đoạn chưa bắt đầu
+        for future in futures:
+            future.cancel()
+
+def summarize_chunks(chunks: List[str], config: Dict[str, Any], backend: Optional[SummarizationBackend] = None,
+                     progress_callback: Optional[ProgressCallback] = None, total_steps: Optional[int] = None) -> List[str]:
+    """Tóm tắt danh sách đoạn văn bản (bước map)
+
+    Như iter_summarize_chunks nhưng chờ tất cả các đoạn. Kết quả luôn giữ
+    đúng thứ tự các đoạn.
+
+    Args:
+        chunks: Danh sách đoạn văn bản
+        config: Cấu hình độ dài từ LENGTH_CONFIG
+        backend: Backend tóm tắt, mặc định theo cấu hình
+        progress_callback: Hàm nhận (số đoạn đã tóm tắt, tổng số bước)
+        total_steps: Tổng số bước báo cho callback, mặc định bằng số đoạn
+
+    Returns:
+        Danh sách bản tóm tắt theo đúng thứ tự
+    """
+    # Đặt kết quả vào đúng vị trí để bước reduce giữ thứ tự đoạn
+    results: List[Optional[str]] = [None] * len(chunks)
+    for i, summary in iter_summarize_chunks(chunks, config, backend, progress_callback, total_steps):
+        results[i] = summary
+    return results
+
+def iter_chunks(source: Union[str, Iterable[str]], chunk_size: int = 1000, overlap: int = 100) -> Iterator[str]:
+    """Sinh lần lượt các đoạn văn bản có chồng lấp mà không tách toàn bộ văn bản
+
+    Với chuỗi, các đoạn được cắt trực tiếp từ văn bản gốc theo vị trí từ của
+    tài liệu đã tách từ (dùng chung với thống kê và hỏi đáp). Với luồng các
+    trang (ví dụ từ iter_pdf_pages), chỉ giữ tối đa chunk_size từ trong bộ nhớ
+    tại một thời điểm.
+
+    Args:
+        source: Văn bản hoặc một iterable các phần văn bản nối tiếp nhau
+        chunk_size: Kích thước mỗi đoạn (số từ)
+        overlap: Số từ chồng lấp giữa các đoạn
+
+    Yields:
+        Các đoạn văn bản theo thứ tự
+    """
+    if isinstance(source, str):
+        yield from get_document(source).iter_chunks(chunk_size, overlap)
+        return
+
+    window: List[str] = []
+    fresh = 0  # Số từ mới chưa nằm trong đoạn nào đã sinh
+
+    for piece in source:
+        for match in _WORD_PATTERN.finditer(piece):
+            window.append(match.group())
+            fresh += 1
+            if len(window) >= chunk_size:
+                yield " ".join(window)
+                window = window[len(window) - overlap:] if overlap else []
+                fresh = 0
+
+    if fresh:
+        yield " ".join(window)
+
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
     """Chia văn bản thành các đoạn nhỏ hơn để xử lý
 
@@ -234,19 +786,9 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[st
     Returns:
         Danh sách các đoạn văn bản
     """
-    words = text.split()
-    chunks = []
-
-    if len(words) <= chunk_size:
+    chunks = list(iter_chunks(text, chunk_size, overlap))
+    if len(chunks) <= 1:
         return [text]
-
-    i = 0
-    while i < len(words):
-        chunk_end = min(i + chunk_size, len(words))
-        chunk = ' '.join(words[i:chunk_end])
-        chunks.append(chunk)
-        i += chunk_size - overlap
-
     return chunks
 
 def clean_text_for_summary(text: str) -> str:
@@ -266,56 +808,237 @@ def clean_text_for_summary(text: str) -> str:
     text = text.replace(".", ". ")
     text = text.replace("  ", " ")
 
-    # Cắt bớt nếu quá dài
-    if len(text) > 50000:
-        logger.warning(f"Văn bản quá dài ({len(text)} ký tự), cắt bớt xuống 50000 ký tự")
-        text = text[:50000] + "..."
+    return text.strip()
 
-    return text
+def _group_summaries(summaries: List[str], max_words: int) -> List[str]:
+    """Gộp các bản tóm tắt liên tiếp thành nhóm không vượt quá max_words từ
 
-def summarize(text: str, length: str = "medium") -> str:
+    Mỗi nhóm có ít nhất hai bản tóm tắt (nếu còn) để mỗi cấp reduce luôn
+    giảm số lượng đầu vào.
+
+    Args:
+        summaries: Các bản tóm tắt của cấp hiện tại
+        max_words: Số từ tối đa của một nhóm
+
+    Returns:
+        Văn bản của từng nhóm
+    """
+    groups: List[str] = []
+    current: List[str] = []
+    current_words = 0
+
+    for summary in summaries:
+        words = len(summary.split())
+        if len(current) >= 2 and current_words + words > max_words:
+            groups.append(" ".join(current))
+            current, current_words = [], 0
+        current.append(summary)
+        current_words += words
+
+    if current:
+        groups.append(" ".join(current))
+    return groups
+
+def _stream_step(backend: SummarizationBackend, text: str,
+                 config: Dict[str, Any]) -> Generator[Dict[str, Any], None, str]:
+    """Tóm tắt một đoạn, trả về sự kiện "token" cho từng phần được sinh ra
+
+    Returns:
+        Bản tóm tắt đầy đủ (giá trị của yield from)
+    """
+    pieces: List[str] = []
+    for piece in backend.stream(text, config):
+        pieces.append(piece)
+        yield {"type": "token", "text": piece}
+    return "".join(pieces).strip()
+
+def iter_summarize_tree(source: Union[str, Iterable[str]], length: str = "medium",
+                        progress_callback: Optional[ProgressCallback] = None,
+                        stream: bool = False) -> Iterator[Dict[str, Any]]:
+    """Tóm tắt map-reduce nhiều cấp trên toàn bộ văn bản, trả về kết quả từng phần
+
+    Cấp 0 tóm tắt từng đoạn của văn bản theo từng cửa sổ để giới hạn bộ nhớ.
+    Các cấp tiếp theo gộp các bản tóm tắt liên tiếp thành nhóm và tóm tắt lại
+    cho tới khi chỉ còn một bản không dài hơn max_length của LENGTH_CONFIG.
+
+    Với stream=True, bước tóm tắt chỉ có một đầu vào (văn bản một đoạn hoặc
+    cấp reduce cuối) được chạy qua backend.stream để trả về từng token. Nếu
+    backend chưa rút gọn đủ ở bước đó, cấp sau sinh lại bản tóm tắt từ đầu;
+    sự kiện "done" luôn chứa bản tóm tắt cuối cùng.
+
+    Args:
+        source: Văn bản hoặc một iterable các phần văn bản (ví dụ các trang PDF)
+        length: Độ dài tóm tắt ("short", "medium", "long")
+        progress_callback: Hàm nhận (số đoạn đã tóm tắt, tổng số bước)
+        stream: Trả về sự kiện "token" cho bản tóm tắt cuối
+
+    Yields:
+        {"type": "partial", "index", "text"}: bản tóm tắt của từng đoạn ở cấp 0, theo thứ tự đoạn
+        {"type": "token", "text"}: phần tiếp theo của bản tóm tắt cuối (chỉ khi stream=True)
+        {"type": "done", "summary", "chunks", "depth", "levels"}: kết quả như summarize_tree
+    """
+    config = LENGTH_CONFIG.get(length.lower(), LENGTH_CONFIG["medium"])
+    settings = MODEL_CONFIG["summarization"]
+    backend = get_backend()
+    chunk_size = settings.get("chunk_words", 1000)
+    # Số đoạn được giữ trong bộ nhớ cùng lúc ở cấp 0. Với đầu vào từng phần (ví dụ
+    # các trang đang được đọc từ PDF) cửa sổ nhỏ hơn để các đoạn đầu được tóm tắt
+    # ngay, không phải chờ đọc đủ nhiều trang
+    window_size = max(1, settings.get("max_concurrency", 1))
+    if isinstance(source, str):
+        window_size *= max(1, settings.get("batch_size", 1))
+
+    # Ước lượng tổng số đoạn để báo tiến trình khi đầu vào là chuỗi
+    if isinstance(source, str):
+        estimated_chunks = max(1, len(get_document(source).chunk_ranges(chunk_size, CHUNK_OVERLAP)))
+    else:
+        estimated_chunks = None
+
+    levels: List[Dict[str, Any]] = []
+    summaries: List[str] = []
+    chunk_count = 0
+    started = time.perf_counter()
+
+    # Cấp 0: tóm tắt các đoạn gốc theo từng cửa sổ
+    chunks = (clean_text_for_summary(chunk) for chunk in iter_chunks(source, chunk_size, CHUNK_OVERLAP))
+    while True:
+        window = list(islice(chunks, window_size))
+        if not window:
+            break
+        done_before = chunk_count
+        total = (estimated_chunks or done_before + len(window)) + 1
+
+        if stream and estimated_chunks == 1 and len(window) == 1:
+            # Văn bản chỉ có một đoạn: bản tóm tắt của đoạn là bản cuối
+            summaries.append((yield from _stream_step(backend, window[0], config)))
+            report_progress(progress_callback, 1, total)
+        else:
+            # Các đoạn xong không theo thứ tự, chỉ trả về khi các đoạn trước đã xong
+            finished: Dict[int, str] = {}
+            for i, summary in iter_summarize_chunks(
+                window, config, backend,
+                progress_callback=lambda done, _: report_progress(progress_callback, done_before + done, max(total, done_before + done + 1))
+            ):
+                finished[i] = summary
+                while len(summaries) - done_before in finished:
+                    summary = finished.pop(len(summaries) - done_before)
+                    yield {"type": "partial", "index": len(summaries), "text": summary}
+                    summaries.append(summary)
+        chunk_count += len(window)
+
+    if not summaries:
+        yield {"type": "done", "summary": "", "chunks": 0, "depth": 0, "levels": []}
+        return
+
+    levels.append({"level": 0, "inputs": chunk_count, "outputs": len(summaries), "seconds": time.perf_counter() - started})
+
+    # Các cấp reduce: gộp và tóm tắt lại cho tới khi đạt độ dài mục tiêu
+    while len(summaries) > 1 or len(summaries[0].split()) > config["max_length"]:
+        if len(levels) >= MAX_TREE_DEPTH:
+            logger.warning(f"Đạt giới hạn {MAX_TREE_DEPTH} cấp tóm tắt, dừng lại")
+            break
+
+        started = time.perf_counter()
+        groups = _group_summaries(summaries, chunk_size)
+        if stream and len(groups) == 1:
+            reduced = [(yield from _stream_step(backend, groups[0], config))]
+        else:
+            reduced = summarize_chunks(groups, config, backend)
+        levels.append({
+            "level": len(levels),
+            "inputs": len(summaries),
+            "outputs": len(reduced),
+            "seconds": time.perf_counter() - started
+        })
+
+        # Không rút gọn được nữa (ví dụ backend giữ nguyên văn bản)
+        if len(reduced) == len(summaries) and sum(len(r.split()) for r in reduced) >= sum(len(s.split()) for s in summaries):
+            summaries = reduced
+            break
+        summaries = reduced
+
+    for level in levels:
+        logger.info(f"Cấp {level['level']}: {level['inputs']} → {level['outputs']} bản tóm tắt trong {level['seconds']:.2f}s")
+
+    report_progress(progress_callback, chunk_count + 1, chunk_count + 1)
+    yield {
+        "type": "done",
+        "summary": " ".join(summaries),
+        "chunks": chunk_count,
+        "depth": len(levels),
+        "levels": levels
+    }
+
+def summarize_tree(source: Union[str, Iterable[str]], length: str = "medium",
+                   progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Tóm tắt map-reduce nhiều cấp trên toàn bộ văn bản, không cắt bớt
+
+    Xem iter_summarize_tree.
+
+    Args:
+        source: Văn bản hoặc một iterable các phần văn bản (ví dụ các trang PDF)
+        length: Độ dài tóm tắt ("short", "medium", "long")
+        progress_callback: Hàm nhận (số đoạn đã tóm tắt, tổng số bước)
+
+    Returns:
+        Dict gồm "summary", "chunks" (số đoạn ở cấp 0), "depth" (số cấp) và
+        "levels" (số đầu vào/đầu ra và thời gian của từng cấp)
+    """
+    for event in iter_summarize_tree(source, length, progress_callback):
+        if event["type"] == "done":
+            return {key: value for key, value in event.items() if key != "type"}
+
+def summarize(text: Union[str, Iterable[str]], length: str = "medium",
+              progress_callback: Optional[ProgressCallback] = None) -> str:
     """Tóm tắt văn bản với độ dài đã chọn
 
     Args:
-        text: Văn bản cần tóm tắt
+        text: Văn bản cần tóm tắt, hoặc một iterable các phần văn bản (ví dụ
+            các trang PDF) để bắt đầu tóm tắt khi phần sau còn đang được đọc
         length: Độ dài tóm tắt ("short", "medium", "long")
+        progress_callback: Hàm nhận (số đoạn đã tóm tắt, tổng số bước)
 
     Returns:
         Bản tóm tắt của văn bản
     """
-    if not text or not text.strip():
+    if isinstance(text, str) and not text.strip():
         return "Không có văn bản để tóm tắt."
 
-    # Lấy cấu hình cho độ dài đã chọn
-    config = LENGTH_CONFIG.get(length.lower(), LENGTH_CONFIG["medium"])
-
     try:
-        # Làm sạch văn bản
-        cleaned_text = clean_text_for_summary(text)
+        result = summarize_tree(text, length, progress_callback)
+        if not result["summary"]:
+            return "Không có văn bản để tóm tắt."
+        return result["summary"]
 
-        # Xử lý văn bản dài
-        if len(cleaned_text.split()) > 1000:
-            logger.info(f"Văn bản dài ({len(cleaned_text.split())} từ), đang chia thành các đoạn")
-            chunks = chunk_text(cleaned_text)
+    except Exception as e:
+        logger.error(f"Lỗi khi tóm tắt văn bản: {str(e)}")
+        return f"Đã xảy ra lỗi khi tóm tắt: {str(e)}"
 
-            # Tóm tắt từng đoạn
-            summaries = []
-            for i, chunk in enumerate(chunks):
-                logger.info(f"Đang tóm tắt đoạn {i+1}/{len(chunks)}")
-                result = simulate_ai_summarization(chunk, config)
-                summaries.append(result)
+def summarize_stream(text: Union[str, Iterable[str]], length: str = "medium",
+                     progress_callback: Optional[ProgressCallback] = None) -> Iterator[Dict[str, Any]]:
+    """Tóm tắt văn bản, trả về kết quả từng phần thay vì chờ cả bản tóm tắt
 
-            # Tóm tắt lại các bản tóm tắt nếu cần
-            combined_summary = " ".join(summaries)
-            if len(combined_summary.split()) > 500:
-                logger.info("Đang tóm tắt lại tổng hợp các bản tóm tắt")
-                final_summary = simulate_ai_summarization(combined_summary, config)
-                return final_summary
-            return combined_summary
-        else:
-            # Tóm tắt trực tiếp cho văn bản ngắn
-            return simulate_ai_summarization(cleaned_text, config)
+    Args:
+        text: Văn bản cần tóm tắt, hoặc một iterable các phần văn bản
+        length: Độ dài tóm tắt ("short", "medium", "long")
+        progress_callback: Hàm nhận (số đoạn đã tóm tắt, tổng số bước)
+
+    Yields:
+        Các sự kiện của iter_summarize_tree ("partial", "token"); sự kiện cuối là
+        {"type": "done", "summary", ..., "time_to_first_output", "total_seconds"}
+        hoặc {"type": "error", "message"} khi xảy ra lỗi
+    """
+    if isinstance(text, str) and not text.strip():
+        yield {"type": "error", "message": "Không có văn bản để tóm tắt."}
+        return
+
+    try:
+        for event in measure_stream(iter_summarize_tree(text, length, progress_callback, stream=True), "Tóm tắt"):
+            if event["type"] == "done" and not event["summary"]:
+                yield {"type": "error", "message": "Không có văn bản để tóm tắt."}
+                return
+            yield event
 
     except Exception as e:
         logger.error(f"Lỗi khi tóm tắt văn bản: {str(e)}")
-        return f"Đã xảy ra lỗi khi tóm tắt: {str(e)}"
\ No newline at end of file
+        yield {"type": "error", "message": f"Đã xảy ra lỗi khi tóm tắt: {str(e)}"}
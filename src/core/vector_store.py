@@ -0,0 +1,294 @@
+"""Module lưu trữ vector nhúng và tìm kiếm ngữ nghĩa cho hỏi đáp"""
+
+import functools
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.utils.progress import ProgressCallback, report_progress
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Mẫu token dùng cho bộ nhúng băm
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Số token được nhớ đặc trưng, giới hạn bộ nhớ của bộ nhúng trong các tiến trình chạy lâu
+TOKEN_CACHE_SIZE = 65536
+
+@functools.lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _token_features(token: str, dim: int, ngram: int) -> Tuple[Tuple[int, float], ...]:
+    """Vị trí và dấu của các đặc trưng của một token: chính token và các n-gram ký tự của nó
+
+    Dùng crc32 để ổn định giữa các tiến trình. Kết quả được nhớ theo LRU nên
+    token phổ biến chỉ được băm một lần.
+    """
+    padded = f"<{token}>"
+    ngrams = [padded[i:i + ngram] for i in range(max(1, len(padded) - ngram + 1))]
+    features = []
+    for feature in [token] + ngrams:
+        code = zlib.crc32(feature.encode("utf-8"))
+        features.append((code % dim, 1.0 if code & 0x80000000 else -1.0))
+    return tuple(features)
+
+class Embedder:
+    """Giao diện chung cho các bộ nhúng văn bản
+
+    Bộ nhúng trả về ma trận float32 đã chuẩn hóa L2, mỗi hàng ứng với một văn
+    bản, để độ tương đồng cosine chỉ là một phép nhân ma trận - vector.
+    """
+
+    # Định danh của bộ nhúng, dùng trong khóa lưu trữ để không lẫn vector giữa các mô hình
+    name = "base"
+    dim = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Nhúng danh sách văn bản
+
+        Args:
+            texts: Danh sách văn bản
+
+        Returns:
+            Ma trận float32 kích thước (len(texts), dim) đã chuẩn hóa L2
+        """
+        raise NotImplementedError
+
+class HashingEmbedder(Embedder):
+    """Bộ nhúng tất định bằng băm đặc trưng từ và n-gram ký tự
+
+    Không cần tải mô hình và cho kết quả giống nhau giữa các lần chạy, phù hợp
+    để chạy thử hoặc khi không cài sentence-transformers. Các n-gram ký tự giúp
+    khớp được các biến thể của cùng một từ.
+    """
+
+    def __init__(self, dim: int = 384, ngram: int = 3):
+        """Khởi tạo bộ nhúng
+
+        Args:
+            dim: Số chiều của vector
+            ngram: Độ dài n-gram ký tự
+        """
+        self.dim = dim
+        self.ngram = ngram
+        self.name = f"hashing-{dim}-{ngram}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            for token in _TOKEN_PATTERN.findall(text.lower()):
+                for col, sign in _token_features(token, self.dim, self.ngram):
+                    rows.append(row)
+                    cols.append(col)
+                    values.append(sign)
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)),
+                  np.array(values, dtype=np.float32))
+        return _normalize(matrix)
+
+class SentenceTransformerEmbedder(Embedder):
+    """Bộ nhúng dùng mô hình sentence-transformers chạy cục bộ trên CPU"""
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        """Tải mô hình nhúng
+
+        Args:
+            model_name: Tên hoặc đường dẫn mô hình
+            batch_size: Số văn bản trong mỗi lượt nhúng
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "Bộ nhúng 'sentence-transformers' cần cài đặt thêm: pip install sentence-transformers"
+            ) from e
+
+        logger.info(f"Đang tải mô hình nhúng {model_name}")
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name.replace('/', '_')}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """Chuẩn hóa L2 từng hàng, giữ nguyên các hàng toàn 0"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+class VectorStore:
+    """Kho vector của các đoạn văn bản trong một ma trận float32 liên tục
+
+    Truy vấn top-k chỉ cần một phép nhân ma trận - vector và np.argpartition.
+    Có cùng giao diện search/chunks với chỉ mục BM25 nên dùng thay thế được
+    trong find_relevant_context.
+    """
+
+    MATRIX_FILE = "vectors.npy"
+    CHUNKS_FILE = "chunks.json"
+
+    def __init__(self, chunks: List[str], matrix: np.ndarray, embedder: Embedder):
+        """Khởi tạo kho vector
+
+        Args:
+            chunks: Các đoạn văn bản
+            matrix: Ma trận vector tương ứng, đã chuẩn hóa L2
+            embedder: Bộ nhúng dùng cho câu hỏi, phải trùng với bộ nhúng đã tạo ma trận
+        """
+        self.chunks = chunks
+        self.matrix = matrix
+        self.embedder = embedder
+
+    @classmethod
+    def build(cls, chunks: List[str], embedder: Embedder, batch_size: int = 256,
+              progress_callback: Optional[ProgressCallback] = None) -> "VectorStore":
+        """Nhúng các đoạn văn bản theo lô và tạo kho vector
+
+        Args:
+            chunks: Các đoạn văn bản
+            embedder: Bộ nhúng
+            batch_size: Số đoạn trong mỗi lượt nhúng
+            progress_callback: Hàm nhận (số đoạn đã nhúng, tổng số đoạn)
+
+        Returns:
+            Kho vector
+        """
+        matrix = np.empty((len(chunks), embedder.dim), dtype=np.float32)
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            matrix[start:start + len(batch)] = embedder.embed(batch)
+            report_progress(progress_callback, start + len(batch), len(chunks))
+        return cls(chunks, matrix, embedder)
+
+    def search(self, question: str, top_k: int = 1,
+               progress_callback: Optional[ProgressCallback] = None) -> List[Tuple[int, float]]:
+        """Tìm các đoạn gần nghĩa nhất với câu hỏi theo độ tương đồng cosine
+
+        Args:
+            question: Câu hỏi
+            top_k: Số đoạn cần lấy
+            progress_callback: Hàm nhận (số bước đã xong, tổng số bước)
+
+        Returns:
+            Danh sách (chỉ số đoạn, điểm) theo điểm giảm dần, chỉ gồm các đoạn có điểm > 0
+        """
+        if not self.chunks:
+            return []
+
+        query = self.embedder.embed([question])[0]
+        scores = self.matrix @ query
+        report_progress(progress_callback, 1, 1)
+
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def save(self, directory: Union[str, Path]):
+        """Lưu ma trận (np.save) và các đoạn văn bản vào thư mục
+
+        Ghi vào thư mục tạm rồi đổi tên để không để lại dữ liệu ghi dở.
+
+        Args:
+            directory: Thư mục lưu
+        """
+        directory = Path(directory)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=directory.parent, prefix=".tmp-"))
+        try:
+            np.save(tmp_dir / self.MATRIX_FILE, self.matrix)
+            with open(tmp_dir / self.CHUNKS_FILE, "w", encoding="utf-8") as f:
+                json.dump({"embedder": self.embedder.name, "chunks": self.chunks}, f, ensure_ascii=False)
+            if directory.exists():
+                shutil.rmtree(directory)
+            os.replace(tmp_dir, directory)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], embedder: Embedder) -> Optional["VectorStore"]:
+        """Mở kho vector đã lưu, ma trận được ánh xạ bộ nhớ (mmap) thay vì đọc toàn bộ
+
+        Args:
+            directory: Thư mục đã lưu
+            embedder: Bộ nhúng dùng cho câu hỏi
+
+        Returns:
+            Kho vector, hoặc None nếu chưa lưu hoặc được tạo bởi bộ nhúng khác
+        """
+        directory = Path(directory)
+        try:
+            with open(directory / cls.CHUNKS_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("embedder") != embedder.name:
+                return None
+            matrix = np.load(directory / cls.MATRIX_FILE, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Không đọc được kho vector {directory}: {str(e)}")
+            return None
+        try:
+            # Đánh dấu vừa được dùng cho prune_stores
+            os.utime(directory)
+        except OSError:
+            pass
+        return cls(meta["chunks"], matrix, embedder)
+
+def prune_stores(root: Union[str, Path], max_bytes: int, keep: Optional[Union[str, Path]] = None) -> int:
+    """Xóa các kho vector ít được dùng gần đây nhất dưới root cho tới khi tổng dung lượng không vượt max_bytes
+
+    Thời gian sửa của thư mục mỗi kho (cập nhật khi lưu và khi mở) là thời
+    điểm dùng gần nhất. Kho có thể bị tiến trình khác xóa cùng lúc nên các
+    thư mục đã biến mất được bỏ qua.
+
+    Args:
+        root: Thư mục chứa các kho vector (MODEL_CONFIG["qa"]["retriever"]["vectors_dir"])
+        max_bytes: Tổng dung lượng tối đa (byte)
+        keep: Kho không được xóa (ví dụ kho vừa lưu)
+
+    Returns:
+        Số kho đã xóa
+    """
+    root = Path(root)
+    keep = Path(keep) if keep is not None else None
+    stores = []
+    try:
+        directories = [path for path in root.iterdir() if path.is_dir() and not path.name.startswith(".tmp-")]
+    except FileNotFoundError:
+        return 0
+    for directory in directories:
+        try:
+            size = sum(path.stat().st_size for path in directory.iterdir())
+            stores.append((directory.stat().st_mtime, size, directory))
+        except FileNotFoundError:
+            continue
+
+    total = sum(size for _, size, _ in stores)
+    removed = 0
+    for _, size, directory in sorted(stores, key=lambda store: store[0]):
+        if total <= max_bytes:
+            break
+        if directory == keep:
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= size
+        removed += 1
+        logger.info(f"Loại bỏ kho vector: {directory.name}")
+    return removed
@@ -0,0 +1,240 @@
+"""Cache kết quả xử lý giữa các lần Streamlit chạy lại script
+
+Streamlit chạy lại app.py từ đầu sau mỗi thao tác trên giao diện. Các hàm ở
+đây bọc những bước tốn kém (trích xuất file, tóm tắt, thống kê, xây dựng chỉ
+mục hỏi đáp) bằng st.cache_data/st.cache_resource với khóa là mã băm tài liệu
+và tham số, nên một lần bấm không liên quan chỉ tốn một lần tra cache.
+
+Các tham số bắt đầu bằng dấu gạch dưới không được Streamlit băm: văn bản và
+file chỉ được truyền vào để tính khi cache chưa có, còn khóa là mã băm đã tính
+sẵn. Số mục và thời gian sống lấy từ CACHE_CONFIG để server chạy lâu không
+tăng bộ nhớ vô hạn.
+
+Khi kho tài liệu (src.utils.document_store) được bật, bản tóm tắt, thống kê,
+vị trí câu và chỉ mục BM25 còn được lưu trên đĩa theo mã băm tài liệu, nên
+vẫn dùng lại được sau khi khởi động lại ứng dụng.
+"""
+
+import hashlib
+import logging
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+import streamlit as st
+
+from src.config import CACHE_CONFIG, FILE_CONFIG, MODEL_CONFIG
+from src.core.qa import BM25Index, get_retriever
+from src.core.summarizer import summarize_stream
+from src.core.vector_store import VectorStore
+from src.utils.document_store import get_document_store, summary_params, summary_settings
+from src.utils.file_loader import PAGE_SEPARATOR, compute_file_hash, iter_file_pages, load_file
+from src.utils.progress import ProgressCallback
+from src.utils.segmentation import sentence_spans
+from src.utils.text_processor import analyze_text_stats
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Thời gian sống và số mục tối đa của từng loại cache
+_TTL = CACHE_CONFIG.get("ui_ttl_seconds", 3600)
+_MAX_DOCUMENTS = CACHE_CONFIG.get("ui_max_documents", 8)
+_MAX_ENTRIES = CACHE_CONFIG.get("ui_max_entries", 64)
+_MAX_INDEXES = CACHE_CONFIG.get("ui_max_indexes", 8)
+
+class _UncachedResult(Exception):
+    """Kết quả lỗi, được ném ra để Streamlit không lưu vào cache"""
+
+def document_hash(text: str) -> str:
+    """Tính mã băm SHA-256 của văn bản, dùng làm khóa cache
+
+    Args:
+        text: Văn bản
+
+    Returns:
+        Chuỗi hex của mã băm
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+@st.cache_data(ttl=_TTL, max_entries=_MAX_DOCUMENTS, show_spinner=False)
+def _load_file(file_hash: str, max_pages: int, _file: BinaryIO,
+               _progress_callback: Optional[ProgressCallback] = None) -> str:
+    text = load_file(_file, progress_callback=_progress_callback)
+    if text.startswith("Lỗi"):
+        raise _UncachedResult(text)
+    return text
+
+def cached_load_file(file: BinaryIO, progress_callback: Optional[ProgressCallback] = None) -> str:
+    """Trích xuất nội dung file, dùng lại kết quả nếu file đã được xử lý
+
+    Args:
+        file: File object được upload từ Streamlit
+        progress_callback: Hàm nhận (số trang đã xử lý, tổng số trang)
+
+    Returns:
+        Nội dung văn bản từ file hoặc thông báo lỗi
+    """
+    try:
+        return _load_file(compute_file_hash(file), FILE_CONFIG.get("max_pages") or 0, file, progress_callback)
+    except _UncachedResult as e:
+        return str(e)
+
+@st.cache_data(ttl=_TTL, max_entries=_MAX_ENTRIES, show_spinner=False)
+def _cached_summary(doc_hash: str, length: str, settings: str, _summary: Optional[str] = None) -> str:
+    """Bản tóm tắt theo tài liệu, độ dài và cấu hình, giữ trong cache có giới hạn
+
+    Gọi không có _summary để tra cache (rồi tới kho tài liệu); khi chưa có thì
+    ném _UncachedResult nên Streamlit không lưu gì. Gọi kèm _summary vừa tạo để
+    lưu nó vào cache.
+    """
+    if _summary is not None:
+        return _summary
+    store = get_document_store()
+    summary = store.get(doc_hash, "summary", summary_params(length, settings)) if store is not None else None
+    if summary is None:
+        raise _UncachedResult(doc_hash)
+    return summary
+
+def cached_summarize_stream(text: str, doc_hash: str, length: str = "medium",
+                            progress_callback: Optional[ProgressCallback] = None) -> Iterator[Dict[str, Any]]:
+    """Tóm tắt văn bản dạng luồng (summarize_stream), dùng lại bản tóm tắt đã tạo
+
+    Bản tóm tắt đã có với cùng tài liệu, độ dài và cấu hình (trong cache hoặc
+    kho tài liệu) được trả về ngay bằng một sự kiện "done"; bản mới được lưu
+    vào cache và kho khi hoàn thành.
+
+    Args:
+        text: Văn bản cần tóm tắt
+        doc_hash: Mã băm của văn bản (document_hash)
+        length: Độ dài tóm tắt ("short", "medium", "long")
+        progress_callback: Hàm nhận (số đoạn đã tóm tắt, tổng số bước)
+
+    Yields:
+        Các sự kiện như summarize_stream
+    """
+    # Cấu hình tóm tắt là một phần của khóa để đổi backend không trả về bản cũ
+    settings = summary_settings()
+    try:
+        summary = _cached_summary(doc_hash, length, settings)
+    except _UncachedResult:
+        pass
+    else:
+        yield {"type": "done", "summary": summary, "time_to_first_output": 0.0, "total_seconds": 0.0}
+        return
+
+    for event in summarize_stream(text, length, progress_callback):
+        if event["type"] == "done":
+            remember_summary(doc_hash, length, event["summary"], settings)
+        yield event
+
+def remember_summary(doc_hash: str, length: str, summary: str, settings: Optional[str] = None):
+    """Lưu bản tóm tắt vừa tạo vào cache và kho tài liệu để lần sau dùng lại
+
+    Args:
+        doc_hash: Mã băm của văn bản (document_hash)
+        length: Độ dài tóm tắt
+        summary: Bản tóm tắt
+        settings: Cấu hình tóm tắt (summary_settings), None để dùng cấu hình hiện tại
+    """
+    settings = settings or summary_settings()
+    _cached_summary(doc_hash, length, settings, summary)
+    store = get_document_store()
+    if store is not None:
+        store.put(doc_hash, "summary", summary, summary_params(length, settings))
+
+def summarize_file_stream(file: BinaryIO, length: str = "medium",
+                          progress_callback: Optional[ProgressCallback] = None) -> Iterator[Dict[str, Any]]:
+    """Đọc file theo từng trang và tóm tắt ngay trong lúc đọc (iter_file_pages → summarize_stream)
+
+    Các đoạn ở đầu tài liệu được tóm tắt trong khi các trang sau còn đang được
+    trích xuất. Bản tóm tắt chưa được lưu vì mã băm tài liệu chỉ có khi đọc hết
+    file; dùng remember_summary sau khi lưu tài liệu.
+
+    Args:
+        file: File object được upload từ Streamlit
+        length: Độ dài tóm tắt ("short", "medium", "long")
+        progress_callback: Hàm nhận (số trang đã xử lý, tổng số trang)
+
+    Yields:
+        Các sự kiện như summarize_stream; sự kiện "done" có thêm "text" là văn
+        bản của file như cached_load_file trả về
+    """
+    pages: List[str] = []
+    failure: List[str] = []
+
+    def read_pages() -> Iterator[str]:
+        try:
+            for page in iter_file_pages(file, progress_callback):
+                pages.append(page)
+                yield page
+        except Exception as e:
+            failure.append(f"Lỗi khi xử lý file: {str(e)}")
+            raise
+
+    for event in summarize_stream(read_pages(), length):
+        if event["type"] == "error" and failure:
+            event = {"type": "error", "message": failure[0]}
+        elif event["type"] == "done":
+            event = {**event, "text": PAGE_SEPARATOR.join(pages)}
+        yield event
+
+@st.cache_data(ttl=_TTL, max_entries=_MAX_ENTRIES, show_spinner=False)
+def cached_text_stats(doc_hash: str, _text: str) -> Dict[str, Any]:
+    """Thống kê văn bản (số từ, số câu, độ dễ đọc, từ khóa), tính một lần cho mỗi tài liệu
+
+    Args:
+        doc_hash: Mã băm của văn bản (document_hash)
+        _text: Văn bản cần phân tích
+
+    Returns:
+        Từ điển thống kê như analyze_text_stats
+    """
+    store = get_document_store()
+    stats = store.get(doc_hash, "stats") if store is not None else None
+    if stats is not None:
+        return stats
+
+    stats = analyze_text_stats(_text)
+    if store is not None:
+        # Thống kê đã gồm danh sách từ khóa; vị trí câu vừa được tính khi đếm câu nên lưu luôn
+        store.put(doc_hash, "stats", stats)
+        store.put_sentence_spans(doc_hash, sentence_spans(_text))
+    return stats
+
+@st.cache_resource(ttl=_TTL, max_entries=_MAX_INDEXES, show_spinner=False)
+def cached_retriever(doc_hash: str, chunk_size: int, method: str, embedder: str,
+                     _text: str) -> Union[BM25Index, VectorStore]:
+    """Bộ truy xuất hỏi đáp của tài liệu, dùng chung giữa các lần chạy lại và các phiên
+
+    Args:
+        doc_hash: Mã băm của văn bản (document_hash)
+        chunk_size: Kích thước mỗi đoạn (số từ)
+        method: Phương pháp truy xuất ("bm25" hoặc "dense")
+        embedder: Bộ nhúng dùng cho truy xuất ngữ nghĩa
+        _text: Văn bản gốc
+
+    Returns:
+        Chỉ mục BM25 hoặc kho vector
+    """
+    logger.info(f"Xây dựng bộ truy xuất {method} cho tài liệu {doc_hash[:12]}")
+    store = get_document_store()
+    directory = store.path(doc_hash, f"bm25-c{chunk_size}") if store is not None else None
+    return get_retriever(_text, chunk_size, directory)
+
+def get_cached_retriever(text: str, doc_hash: str) -> Union[BM25Index, VectorStore]:
+    """Lấy bộ truy xuất của tài liệu theo cấu hình MODEL_CONFIG["qa"] hiện tại
+
+    Args:
+        text: Văn bản gốc
+        doc_hash: Mã băm của văn bản (document_hash)
+
+    Returns:
+        Chỉ mục BM25 hoặc kho vector
+    """
+    settings = MODEL_CONFIG["qa"]
+    retriever = settings["retriever"]
+    return cached_retriever(
+        doc_hash,
+        settings["max_length"],
+        retriever.get("method", "bm25"),
+        retriever.get("embedder", "hashing"),
+        text
+    )
@@ -2,9 +2,10 @@
 
 import streamlit as st
 import base64
+import html
 import re
 from pathlib import Path
-from typing import Optional, Union, Dict, List, Any
+from typing import Callable, Iterator, Optional, Union, Dict, List, Any
 
 def display_logo(width: int = 200):
     """Hiển thị logo của ứng dụng với hiệu ứng gradient
@@ -328,6 +329,37 @@ def qa_result(question: str, answer: str, confidence: Optional[float] = None):
         </div>
         """, unsafe_allow_html=True)
 
+def search_result(name: str, snippet: str, highlights: List[tuple]):
+    """Hiển thị một kết quả tìm kiếm với các từ khớp được đánh dấu
+
+    Args:
+        name: Tên tài liệu (tên file hoặc URL)
+        snippet: Đoạn trích từ tài liệu
+        highlights: Vị trí (bắt đầu, kết thúc) các từ khớp trong snippet
+    """
+    parts, cursor = [], 0
+    for start, end in highlights:
+        parts.append(html.escape(snippet[cursor:start]))
+        parts.append(f"<mark>{html.escape(snippet[start:end])}</mark>")
+        cursor = end
+    parts.append(html.escape(snippet[cursor:]))
+
+    st.markdown(f"""
+    <div style="
+        background: #ffffff;
+        border-radius: 12px;
+        padding: 1rem 1.25rem;
+        margin-bottom: 0.75rem;
+        border-left: 4px solid #667eea;
+        box-shadow: 0 2px 6px rgba(0, 0, 0, 0.08);
+    ">
+        <div style="font-weight: 600; color: #1565c0; margin-bottom: 0.5rem; word-break: break-word;">
+            📄 {html.escape(name)}
+        </div>
+        <div style="color: #424242; line-height: 1.6;">{"".join(parts)}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
 def progress_steps(steps: List[Dict[str, str]], current_step: int):
     """Hiển thị tiến trình xử lý theo bước với animation
 
@@ -375,6 +407,62 @@ def progress_steps(steps: List[Dict[str, str]], current_step: int):
             </div>
             """, unsafe_allow_html=True)
 
+def progress_tracker(label: str) -> Callable[[int, int], None]:
+    """Tạo thanh tiến trình được cập nhật theo tiến độ thực tế của pipeline
+
+    Args:
+        label: Mô tả công việc đang thực hiện
+
+    Returns:
+        Callback nhận (số bước đã xong, tổng số bước) để truyền vào các hàm xử lý
+    """
+    progress_bar = st.progress(0, text=label)
+
+    def update(done: int, total: int):
+        percent = min(100, int(done * 100 / max(total, 1)))
+        progress_bar.progress(percent, text=f"**{label}** ({done}/{total})")
+
+    return update
+
+def stream_output(events: Iterator[Dict[str, Any]], draft_label: str, max_draft_parts: int = 3) -> Dict[str, Any]:
+    """Hiển thị dần kết quả dạng luồng (summarize_stream, answer_question_stream)
+
+    Các sự kiện "partial" được hiện như bản nháp, các sự kiện "token" được viết
+    dần bằng st.write_stream. Vùng hiển thị được xóa khi xong để trang hiển thị
+    kết quả cuối cùng theo cách thông thường.
+
+    Args:
+        events: Các sự kiện dạng {"type": ...}
+        draft_label: Tiêu đề của bản nháp
+        max_draft_parts: Số phần nháp gần nhất được hiển thị
+
+    Returns:
+        Sự kiện cuối cùng ("done" hoặc "error")
+    """
+    final: Dict[str, Any] = {"type": "error", "message": "Không có kết quả."}
+    area = st.empty()
+
+    with area.container():
+        draft = st.empty()
+        parts: List[str] = []
+
+        def tokens():
+            nonlocal final
+            for event in events:
+                if event["type"] == "partial":
+                    parts.append(event["text"])
+                    shown = "\n\n".join(parts[-max_draft_parts:])
+                    draft.info(f"**{draft_label}** ({len(parts)})\n\n{shown}")
+                elif event["type"] == "token":
+                    yield event["text"]
+                else:
+                    final = event
+
+        st.write_stream(tokens())
+
+    area.empty()
+    return final
+
 def custom_metric(label: str, value: str, delta: Optional[str] = None, delta_color: str = "normal"):
     """Hiển thị metric tùy chỉnh
 
@@ -77,6 +77,8 @@ import matplotlib
 import numpy as np
 from typing import List, Dict, Any, Optional
 
+from src.utils.segmentation import count_sentences
+
 # Đặt style cho matplotlib
 matplotlib.use("Agg")
 plt.style.use('seaborn-v0_8-pastel')
@@ -154,8 +156,8 @@ def plot_summary_comparison(original_text: str, summary_text: str):
     summary_words = len(summary_text.split())
     compression_ratio = 1 - (summary_words / original_words)
 
-    original_sentences = len([s for s in original_text.split(".") if s.strip()])
-    summary_sentences = len([s for s in summary_text.split(".") if s.strip()])
+    original_sentences = count_sentences(original_text)
+    summary_sentences = count_sentences(summary_text)
 
     # Tạo dữ liệu so sánh
     metrics = ['Số từ', 'Số câu']
@@ -0,0 +1,373 @@
+"""Module thu thập nhiều trang của cùng một website
+
+Bắt đầu từ một URL, crawler đi theo các liên kết cùng website theo chiều rộng
+tới giới hạn độ sâu và số trang, với nhiều trang được tải đồng thời trên một
+phiên aiohttp dùng chung. URL được chuẩn hóa để không tải lại cùng một trang,
+nội dung gần trùng (simhash) bị bỏ qua và robots.txt được tuân theo.
+
+Các trang được trả về ngay khi tải xong, nên có thể đưa thẳng vào tóm tắt:
+
+    summarize(page["text"] for page in iter_crawl(url))
+"""
+
+import asyncio
+import hashlib
+import logging
+import queue
+import threading
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+import numpy as np
+
+from src.config import SCRAPER_CONFIG
+from src.utils.progress import ProgressCallback, report_progress
+from src.utils.web_scraper import ScrapeError, create_session, download, fetch_page
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Tham số truy vấn chỉ dùng để theo dõi, bị bỏ khi chuẩn hóa URL
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+
+# Phần mở rộng của các file không phải trang HTML, không cần tải
+SKIP_EXTENSIONS = {
+    ".css", ".js", ".json", ".xml", ".ico", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip", ".rar", ".gz",
+    ".mp3", ".mp4", ".avi", ".mov"
+}
+
+# Số URL tối đa được ghi nhận so với số trang cần thu thập, giới hạn bộ nhớ hàng đợi
+MAX_FRONTIER_FACTOR = 10
+
+# Độ dài shingle (số từ) khi tính simhash
+SHINGLE_SIZE = 3
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Chuẩn hóa URL để các cách viết khác nhau của cùng một trang trùng nhau
+
+    Bỏ fragment, tham số theo dõi (utm_*, fbclid...) và cổng mặc định, chuyển
+    scheme/host về chữ thường và sắp xếp tham số truy vấn.
+
+    Args:
+        url: URL hoặc đường dẫn tương đối
+        base: URL của trang chứa liên kết, dùng cho đường dẫn tương đối
+
+    Returns:
+        URL đã chuẩn hóa, None nếu không phải URL http(s) hợp lệ
+    """
+    try:
+        parts = urlsplit(urljoin(base, url.strip()) if base else url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if scheme not in ("http", "https") or not host:
+        return None
+
+    default_port = 80 if scheme == "http" else 443
+    netloc = host if port in (None, default_port) else f"{host}:{port}"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+def _site(url: str) -> str:
+    """Tên website của URL (host không có tiền tố www.)"""
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+def simhash(text: str) -> int:
+    """Tính simhash 64 bit của văn bản theo các shingle 3 từ
+
+    Hai văn bản gần giống nhau có simhash khác nhau ở ít bit.
+
+    Args:
+        text: Văn bản
+
+    Returns:
+        Dấu vân tay 64 bit
+    """
+    words = text.lower().split()
+    shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))]
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+         for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int(np.packbits(votes > 0, bitorder="little").view(np.uint64)[0])
+
+def hamming_distance(a: int, b: int) -> int:
+    """Số bit khác nhau giữa hai simhash"""
+    return bin(a ^ b).count("1")
+
+async def _load_robots(session: aiohttp.ClientSession, url: str) -> Optional[RobotFileParser]:
+    """Tải robots.txt của website
+
+    Args:
+        session: Phiên aiohttp
+        url: Một URL bất kỳ của website
+
+    Returns:
+        Bộ đọc robots.txt, None nếu website không có robots.txt (được phép tải tất cả)
+    """
+    parts = urlsplit(url)
+    robots_url = urlunsplit((parts.scheme, parts.netloc, "/robots.txt", "", ""))
+    parser = RobotFileParser(robots_url)
+    try:
+        response = await download(session, robots_url)
+    except ScrapeError as e:
+        if e.status in (401, 403):
+            parser.disallow_all = True
+            return parser
+        return None
+    parser.parse(response["body"].decode("utf-8", errors="replace").splitlines())
+    return parser
+
+async def iter_crawl_async(start_url: str, max_pages: Optional[int] = None, max_depth: Optional[int] = None,
+                           session: Optional[aiohttp.ClientSession] = None,
+                           executor: Optional[Executor] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Thu thập các trang cùng website, trả về từng trang ngay khi tải xong
+
+    Args:
+        start_url: URL trang đầu tiên
+        max_pages: Số trang tối đa, None để dùng SCRAPER_CONFIG["crawl_max_pages"]
+        max_depth: Độ sâu liên kết tối đa, None để dùng SCRAPER_CONFIG["crawl_max_depth"]
+        session: Phiên aiohttp dùng chung, None để tạo phiên mới cho lần thu thập này
+        executor: Nhóm luồng chạy phần trích xuất trang (fetch_page)
+
+    Yields:
+        Dict gồm url, depth (số bước liên kết từ trang đầu) và text của từng trang
+    """
+    concurrency = SCRAPER_CONFIG.get("crawl_concurrency", 8)
+    if session is None:
+        async with create_session(per_host_limit=concurrency) as own_session:
+            async for page in iter_crawl_async(start_url, max_pages, max_depth, own_session, executor):
+                yield page
+        return
+
+    max_pages = max_pages or SCRAPER_CONFIG.get("crawl_max_pages", 50)
+    max_depth = SCRAPER_CONFIG.get("crawl_max_depth", 2) if max_depth is None else max_depth
+    max_distance = SCRAPER_CONFIG.get("near_duplicate_distance", 3)
+
+    start = normalize_url(start_url)
+    if start is None:
+        raise ScrapeError(f"URL không hợp lệ {start_url}")
+    site = _site(start)
+
+    robots = await _load_robots(session, start) if SCRAPER_CONFIG.get("respect_robots", True) else None
+    crawl_delay = robots.crawl_delay("*") if robots is not None else None
+    loop = asyncio.get_running_loop()
+    throttle = asyncio.Lock()
+    next_request = 0.0
+
+    frontier: "asyncio.Queue[Tuple[str, int]]" = asyncio.Queue()
+    frontier.put_nowait((start, 0))
+    seen = {start}
+    deferred: List[Tuple[str, int]] = []
+    results: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    fingerprints: List[int] = []
+    reserved = 0  # Số trang đã thu thập cộng số trang đang tải
+
+    def enqueue_links(links: List[str], base: str, depth: int):
+        for link in links:
+            if len(seen) >= max_pages * MAX_FRONTIER_FACTOR:
+                return
+            url = normalize_url(link, base)
+            if url is None or url in seen or _site(url) != site:
+                continue
+            if any(urlsplit(url).path.lower().endswith(extension) for extension in SKIP_EXTENSIONS):
+                continue
+            seen.add(url)
+            frontier.put_nowait((url, depth))
+
+    async def process(url: str, depth: int) -> Optional[Dict[str, Any]]:
+        nonlocal next_request
+        if robots is not None and not robots.can_fetch("*", url):
+            logger.info(f"robots.txt không cho phép tải {url}")
+            return None
+
+        if crawl_delay:
+            async with throttle:
+                wait = next_request - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                next_request = loop.time() + crawl_delay
+
+        try:
+            page = await fetch_page(session, url, executor)
+        except ScrapeError as e:
+            logger.warning(f"Bỏ qua {url}: {str(e)}")
+            return None
+
+        # Trang chuyển hướng sang website khác hoặc sang trang đã có
+        final_url = normalize_url(page["url"]) or url
+        if final_url != url:
+            if _site(final_url) != site or final_url in seen:
+                return None
+            seen.add(final_url)
+
+        if depth < max_depth:
+            enqueue_links(page["links"], page["url"], depth + 1)
+
+        text = page["text"].strip()
+        if not text:
+            return None
+        fingerprint = simhash(text)
+        if any(hamming_distance(fingerprint, other) <= max_distance for other in fingerprints):
+            logger.info(f"Bỏ qua {final_url}: nội dung gần trùng với trang đã thu thập")
+            return None
+        fingerprints.append(fingerprint)
+        return {"url": final_url, "depth": depth, "text": text}
+
+    async def worker():
+        nonlocal reserved
+        while True:
+            url, depth = await frontier.get()
+            try:
+                # Đã đủ trang (tính cả trang đang tải): để dành URL phòng khi trang đang tải bị lỗi
+                if reserved >= max_pages:
+                    deferred.append((url, depth))
+                    continue
+                reserved += 1
+                try:
+                    page = await process(url, depth)
+                except Exception as e:
+                    logger.error(f"Lỗi khi xử lý {url}: {str(e)}")
+                    page = None
+                if page is None:
+                    reserved -= 1
+                    if deferred:
+                        frontier.put_nowait(deferred.pop(0))
+                else:
+                    results.put_nowait(page)
+            finally:
+                frontier.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    finished = asyncio.create_task(frontier.join())
+    try:
+        while True:
+            next_page = asyncio.create_task(results.get())
+            done, _ = await asyncio.wait({next_page, finished}, return_when=asyncio.FIRST_COMPLETED)
+            if next_page in done:
+                yield next_page.result()
+                continue
+            next_page.cancel()
+            break
+        while not results.empty():
+            yield results.get_nowait()
+    finally:
+        finished.cancel()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(finished, *workers, return_exceptions=True)
+
+def iter_crawl(start_url: str, max_pages: Optional[int] = None,
+               max_depth: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Thu thập các trang cùng website từ code đồng bộ, trả về từng trang ngay khi tải xong
+
+    Việc thu thập chạy trong một luồng riêng với event loop của nó.
+
+    Args:
+        start_url: URL trang đầu tiên
+        max_pages: Số trang tối đa, None để dùng SCRAPER_CONFIG["crawl_max_pages"]
+        max_depth: Độ sâu liên kết tối đa, None để dùng SCRAPER_CONFIG["crawl_max_depth"]
+
+    Yields:
+        Dict gồm url, depth và text của từng trang
+    """
+    output: "queue.Queue[Any]" = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    async def pump():
+        try:
+            async for page in iter_crawl_async(start_url, max_pages, max_depth):
+                output.put(page)
+                if stop.is_set():
+                    break
+        except Exception as e:
+            output.put(e)
+        finally:
+            output.put(done)
+
+    thread = threading.Thread(target=asyncio.run, args=(pump(),), daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = output.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def crawl_site(start_url: str, max_pages: Optional[int] = None, max_depth: Optional[int] = None,
+               progress_callback: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+    """Thu thập các trang cùng website
+
+    Args:
+        start_url: URL trang đầu tiên
+        max_pages: Số trang tối đa, None để dùng SCRAPER_CONFIG["crawl_max_pages"]
+        max_depth: Độ sâu liên kết tối đa, None để dùng SCRAPER_CONFIG["crawl_max_depth"]
+        progress_callback: Hàm nhận (số trang đã thu thập, số trang tối đa)
+
+    Returns:
+        Danh sách các trang (url, depth, text) theo thứ tự tải xong
+    """
+    total = max_pages or SCRAPER_CONFIG.get("crawl_max_pages", 50)
+    pages = []
+    for page in iter_crawl(start_url, max_pages, max_depth):
+        pages.append(page)
+        report_progress(progress_callback, len(pages), total)
+    logger.info(f"Đã thu thập {len(pages)} trang từ {start_url}")
+    return pages
+
+def join_pages(pages: List[Dict[str, Any]]) -> str:
+    """Ghép văn bản các trang theo thứ tự cố định (độ sâu rồi URL, trang đầu tiên trước)
+
+    Các trang được tải song song nên thứ tự tải xong thay đổi giữa các lần
+    thu thập; sắp xếp lại để cùng một website cho cùng văn bản và cùng mã băm
+    tài liệu.
+
+    Args:
+        pages: Các trang (url, depth, text)
+
+    Returns:
+        Văn bản các trang, cách nhau bởi dòng trống
+    """
+    return "\n\n".join(page["text"] for page in sorted(pages, key=lambda page: (page["depth"], page["url"])))
+
+def crawl_text(url: str, max_pages: Optional[int] = None, max_depth: Optional[int] = None,
+               progress_callback: Optional[ProgressCallback] = None) -> str:
+    """Thu thập nhiều trang cùng website và ghép văn bản các trang
+
+    Args:
+        url: URL trang đầu tiên
+        max_pages: Số trang tối đa, None để dùng SCRAPER_CONFIG["crawl_max_pages"]
+        max_depth: Độ sâu liên kết tối đa, None để dùng SCRAPER_CONFIG["crawl_max_depth"]
+        progress_callback: Hàm nhận (số trang đã thu thập, số trang tối đa)
+
+    Returns:
+        Văn bản các trang, cách nhau bởi dòng trống, hoặc thông báo lỗi
+    """
+    try:
+        pages = crawl_site(url, max_pages, max_depth, progress_callback=progress_callback)
+    except Exception as e:
+        logger.error(f"Lỗi khi thu thập website: {str(e)}")
+        return f"Lỗi khi truy cập URL: {str(e)}"
+    if not pages:
+        return "Lỗi: Không thu thập được trang nào từ website."
+    return join_pages(pages)
@@ -0,0 +1,159 @@
+"""Module cache trên đĩa với cơ chế loại bỏ LRU theo dung lượng"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+class DiskLRUCache:
+    """Cache lưu giá trị dạng văn bản thành file trên đĩa
+
+    Mỗi entry là một file riêng trong thư mục con theo phiên bản, thời gian
+    sửa đổi của file được dùng làm thời điểm truy cập gần nhất để loại bỏ LRU
+    khi tổng dung lượng vượt giới hạn. Khi phiên bản thay đổi, toàn bộ entry
+    của các phiên bản cũ bị xóa.
+
+    Nhiều tiến trình có thể dùng chung một thư mục cache: entry có thể bị tiến
+    trình khác xóa bất cứ lúc nào, và dung lượng được tính lại từ đĩa mỗi lần
+    loại bỏ.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int, version: str = "1", suffix: str = ".txt"):
+        """Khởi tạo cache
+
+        Args:
+            directory: Thư mục gốc của cache
+            max_bytes: Tổng dung lượng tối đa (byte)
+            version: Phiên bản định dạng dữ liệu, đổi giá trị để vô hiệu hóa cache cũ
+            suffix: Phần mở rộng của file entry
+        """
+        self.root = Path(directory)
+        self.directory = self.root / f"v{version}"
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._remove_old_versions()
+        self._size = sum(stat.st_size for stat, _ in self._entry_stats())
+
+    def _entries(self):
+        return self.directory.glob(f"*{self.suffix}")
+
+    def _entry_stats(self) -> List[Tuple[os.stat_result, Path]]:
+        """Thông tin các entry hiện có, bỏ qua entry vừa bị tiến trình khác xóa"""
+        stats = []
+        for path in self._entries():
+            try:
+                stats.append((path.stat(), path))
+            except FileNotFoundError:
+                continue
+        return stats
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _remove_old_versions(self):
+        """Xóa dữ liệu của các phiên bản cache khác"""
+        for path in self.root.iterdir():
+            if path.is_dir() and path != self.directory:
+                logger.info(f"Xóa cache phiên bản cũ: {path}")
+                shutil.rmtree(path, ignore_errors=True)
+
+    def get(self, key: str) -> Optional[str]:
+        """Đọc giá trị từ cache
+
+        Args:
+            key: Khóa của entry
+
+        Returns:
+            Giá trị đã lưu hoặc None nếu không có
+        """
+        path = self._path(key)
+        try:
+            value = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            # Đánh dấu vừa được truy cập cho cơ chế LRU
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: str):
+        """Ghi giá trị vào cache và loại bỏ entry cũ nếu vượt dung lượng
+
+        Args:
+            key: Khóa của entry
+            value: Giá trị cần lưu
+
+        Raises:
+            OSError: Không ghi được file entry (ví dụ đĩa đầy)
+        """
+        path = self._path(key)
+        data = value.encode("utf-8")
+        if len(data) > self.max_bytes:
+            logger.warning(f"Entry {key} ({len(data)} byte) vượt dung lượng cache, bỏ qua")
+            return
+
+        # Ghi ra file tạm rồi đổi tên để không bao giờ đọc phải entry ghi dở
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+
+            with self._lock:
+                try:
+                    old_size = path.stat().st_size
+                except FileNotFoundError:
+                    old_size = 0
+                os.replace(tmp_path, path)
+                self._size += len(data) - old_size
+                if self._size > self.max_bytes:
+                    self._evict()
+        except OSError:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _evict(self):
+        """Xóa các entry ít được truy cập gần đây nhất cho tới khi đủ dung lượng"""
+        entries = sorted(self._entry_stats(), key=lambda entry: entry[0].st_mtime)
+        # Tiến trình khác cũng ghi và xóa entry, nên bộ đếm trong tiến trình được tính lại từ đĩa
+        self._size = sum(stat.st_size for stat, _ in entries)
+        for stat, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= stat.st_size
+            logger.info(f"Loại bỏ entry cache: {path.name}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Thống kê hoạt động của cache
+
+        Returns:
+            Dict gồm số lần hit/miss, tỷ lệ hit, số entry và dung lượng
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": sum(1 for _ in self._entries()),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes
+            }
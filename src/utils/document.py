@@ -0,0 +1,202 @@
+"""Module mô hình tài liệu đã tách từ, dùng chung cho thống kê, từ khóa, chia đoạn và hỏi đáp
+
+Thay vì mỗi hàm tự gọi text.split() và tạo hàng triệu chuỗi tạm, văn bản được
+tách từ một lần thành các mảng vị trí (uint32) và mảng id từ vựng chữ thường.
+"""
+
+import re
+import string
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Các ký tự khoảng trắng theo định nghĩa của str.split()
+_WHITESPACE_CODES = np.array([code for code in range(0x110000) if chr(code).isspace()], dtype=np.uint32)
+
+# Mẫu tìm khoảng trắng để cắt khối đúng ranh giới từ
+_WHITESPACE_PATTERN = re.compile(r"\s")
+
+# Kích thước khối văn bản (ký tự) được tách từ mỗi lần, giới hạn bộ nhớ tạm
+BLOCK_SIZE = 1 << 20
+
+# Dấu câu bị bỏ ở hai đầu từ khi chuẩn hóa thành thuật ngữ tìm kiếm
+_TERM_STRIP = string.punctuation + "“”‘’«»…–—"
+
+# Số tài liệu gần nhất được giữ trong bộ nhớ
+DOCUMENT_CACHE_SIZE = 8
+
+def normalize_term(word: str) -> str:
+    """Chuẩn hóa một từ thành thuật ngữ tìm kiếm: chữ thường, bỏ dấu câu ở hai đầu
+
+    Args:
+        word: Từ cần chuẩn hóa
+
+    Returns:
+        Thuật ngữ, chuỗi rỗng nếu từ chỉ gồm dấu câu
+    """
+    return word.lower().strip(_TERM_STRIP)
+
+class Document:
+    """Văn bản đã tách từ theo khoảng trắng (tương đương str.split())
+
+    Mỗi từ được biểu diễn bằng vị trí bắt đầu/kết thúc trong văn bản gốc và id
+    của dạng chữ thường trong từ vựng, đều là mảng NumPy uint32. Với 1 triệu từ,
+    ba mảng này chiếm khoảng 12MB so với gần 100MB của danh sách chuỗi.
+    """
+
+    def __init__(self, text: str):
+        """Tách từ văn bản theo từng khối
+
+        Args:
+            text: Văn bản gốc
+        """
+        self.text = text
+        self.vocabulary: List[str] = []
+        self._vocabulary_index: Dict[str, int] = {}
+        self._frequencies: Optional[np.ndarray] = None
+        self._term_ids: Optional[np.ndarray] = None
+        self.terms: List[str] = []
+        self._term_index: Dict[str, int] = {}
+
+        starts, ends, ids = [], [], []
+        for offset, block in self._blocks(text):
+            block_starts, block_ends = self._token_bounds(block)
+            starts.append(block_starts + offset)
+            ends.append(block_ends + offset)
+            ids.append(self._encode(block.lower().split()))
+
+        self.starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.uint32)
+        self.ends = np.concatenate(ends) if ends else np.empty(0, dtype=np.uint32)
+        self.ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.uint32)
+
+    @staticmethod
+    def _blocks(text: str) -> Iterator[Tuple[int, str]]:
+        """Chia văn bản thành các khối khoảng BLOCK_SIZE ký tự, cắt tại khoảng trắng"""
+        position = 0
+        while position < len(text):
+            end = position + BLOCK_SIZE
+            if end < len(text):
+                match = _WHITESPACE_PATTERN.search(text, end)
+                end = match.start() if match else len(text)
+            else:
+                end = len(text)
+            yield position, text[position:end]
+            position = end
+
+    @staticmethod
+    def _token_bounds(block: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Tìm vị trí bắt đầu và kết thúc của các từ trong khối bằng phép toán mảng"""
+        codes = np.frombuffer(block.encode("utf-32-le"), dtype=np.uint32)
+        is_word = (~np.isin(codes, _WHITESPACE_CODES)).view(np.int8)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], is_word, [0]))))
+        return edges[0::2].astype(np.uint32), edges[1::2].astype(np.uint32)
+
+    def _encode(self, tokens: List[str]) -> np.ndarray:
+        """Gán id từ vựng cho các từ, từ mới được thêm vào cuối từ vựng"""
+        index = self._vocabulary_index
+        for token in dict.fromkeys(tokens):
+            if token not in index:
+                index[token] = len(self.vocabulary)
+                self.vocabulary.append(token)
+        return np.fromiter(map(index.__getitem__, tokens), dtype=np.uint32, count=len(tokens))
+
+    @property
+    def word_count(self) -> int:
+        return len(self.starts)
+
+    @property
+    def token_lengths(self) -> np.ndarray:
+        """Số ký tự của từng từ"""
+        return self.ends - self.starts
+
+    def token(self, i: int) -> str:
+        """Lấy từ thứ i (giữ nguyên chữ hoa/thường)"""
+        return self.text[self.starts[i]:self.ends[i]]
+
+    def frequencies(self) -> np.ndarray:
+        """Số lần xuất hiện của từng id từ vựng"""
+        if self._frequencies is None:
+            self._frequencies = np.bincount(self.ids, minlength=len(self.vocabulary))
+        return self._frequencies
+
+    @property
+    def term_ids(self) -> np.ndarray:
+        """Id thuật ngữ của từng từ: dạng chữ thường đã bỏ dấu câu ở hai đầu
+
+        Từ chỉ gồm dấu câu có id -1. Dùng cho chỉ mục tìm kiếm để "cá." và "cá"
+        được coi là cùng một thuật ngữ.
+        """
+        self._build_terms()
+        return self._term_ids
+
+    def _build_terms(self):
+        """Dựng từ điển thuật ngữ từ từ vựng, mỗi từ vựng chỉ được chuẩn hóa một lần"""
+        if self._term_ids is None:
+            mapping = np.empty(len(self.vocabulary), dtype=np.int64)
+            for vocabulary_id, word in enumerate(self.vocabulary):
+                term = normalize_term(word)
+                if not term:
+                    mapping[vocabulary_id] = -1
+                    continue
+                if term not in self._term_index:
+                    self._term_index[term] = len(self.terms)
+                    self.terms.append(term)
+                mapping[vocabulary_id] = self._term_index[term]
+            self._term_ids = mapping[self.ids]
+
+    def term_id(self, word: str) -> Optional[int]:
+        """Id thuật ngữ của một từ bất kỳ (ví dụ từ trong câu hỏi), None nếu không có trong tài liệu"""
+        self._build_terms()
+        return self._term_index.get(normalize_term(word))
+
+    def chunk_ranges(self, chunk_size: int = 1000, overlap: int = 100) -> List[Tuple[int, int]]:
+        """Khoảng chỉ số từ của các đoạn có chồng lấp
+
+        Args:
+            chunk_size: Kích thước mỗi đoạn (số từ)
+            overlap: Số từ chồng lấp giữa các đoạn
+
+        Returns:
+            Danh sách (từ đầu, từ cuối + 1) của từng đoạn
+        """
+        ranges = []
+        start = 0
+        while start < self.word_count:
+            end = min(start + chunk_size, self.word_count)
+            ranges.append((start, end))
+            if end == self.word_count:
+                break
+            start += chunk_size - overlap
+        return ranges
+
+    def span_text(self, start: int, end: int) -> str:
+        """Văn bản gốc từ từ thứ start tới trước từ thứ end"""
+        if start >= end:
+            return ""
+        return self.text[self.starts[start]:self.ends[end - 1]]
+
+    def iter_chunks(self, chunk_size: int = 1000, overlap: int = 100) -> Iterator[str]:
+        """Sinh lần lượt văn bản của các đoạn có chồng lấp
+
+        Args:
+            chunk_size: Kích thước mỗi đoạn (số từ)
+            overlap: Số từ chồng lấp giữa các đoạn
+
+        Yields:
+            Văn bản gốc của từng đoạn
+        """
+        for start, end in self.chunk_ranges(chunk_size, overlap):
+            yield self.span_text(start, end)
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def get_document(text: str) -> Document:
+    """Lấy mô hình tài liệu của văn bản, chỉ tách từ lần đầu với mỗi văn bản
+
+    Args:
+        text: Văn bản gốc
+
+    Returns:
+        Tài liệu đã tách từ
+    """
+    return Document(text)
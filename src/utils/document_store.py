@@ -0,0 +1,308 @@
+"""Module kho tài liệu đã phân tích, lưu bền giữa các phiên
+
+Mỗi tài liệu được định danh bằng SHA-256 của văn bản. Thông tin tài liệu và
+các kết quả nhỏ (bản tóm tắt theo độ dài, thống kê kèm từ khóa) nằm trong
+SQLite; văn bản, vị trí các câu và chỉ mục hỏi đáp là file riêng trong thư
+mục của tài liệu. Mỗi kết quả chỉ được đọc khi cần, nên mở lại một tài liệu
+đã phân tích không phải chạy lại quá trình xử lý.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.config import MODEL_CONFIG, STORE_CONFIG
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Tên các file nội dung trong thư mục của tài liệu
+TEXT_FILE = "text.txt"
+SPANS_FILE = "sentences.npy"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    char_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    opened_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_opened_at ON documents (opened_at);
+CREATE TABLE IF NOT EXISTS artifacts (
+    doc_hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '',
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (doc_hash, kind, params)
+);
+"""
+
+# Kho dùng chung trong tiến trình, mở khi dùng lần đầu
+_document_store: Optional["DocumentStore"] = None
+_document_store_lock = threading.Lock()
+
+def summary_settings() -> str:
+    """Chuỗi mô tả cấu hình tóm tắt hiện tại, là một phần của khóa bản tóm tắt"""
+    return repr(sorted(MODEL_CONFIG["summarization"].items()))
+
+def summary_params(length: str, settings: Optional[str] = None) -> str:
+    """Tham số của bản tóm tắt trong kho tài liệu: độ dài và dấu vân tay của cấu hình
+
+    Args:
+        length: Độ dài tóm tắt
+        settings: Cấu hình tóm tắt (summary_settings), None để dùng cấu hình hiện tại
+
+    Returns:
+        Chuỗi dạng "<độ dài>:<mã băm cấu hình>"
+    """
+    digest = hashlib.sha1((settings or summary_settings()).encode("utf-8")).hexdigest()[:12]
+    return f"{length}:{digest}"
+
+def _write_atomic(path: Path, data: Union[str, np.ndarray]):
+    """Ghi file qua file tạm rồi đổi tên để không để lại dữ liệu ghi dở"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, np.ndarray):
+                np.save(f, data)
+            else:
+                f.write(data.encode("utf-8"))
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+class DocumentStore:
+    """Kho tài liệu (SQLite và file nội dung) với các kết quả đã tính sẵn"""
+
+    def __init__(self, db_path: Union[str, Path], content_dir: Union[str, Path]):
+        """Mở kho, tạo bảng nếu chưa có
+
+        Args:
+            db_path: Đường dẫn file SQLite
+            content_dir: Thư mục chứa file nội dung của các tài liệu
+        """
+        self.db_path = Path(db_path)
+        self.content_dir = Path(content_dir)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.content_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            # WAL cho phép đọc trong khi tiến trình khác đang ghi
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Tính mã định danh (SHA-256) của văn bản"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def path(self, doc_hash: str, name: str = "") -> Path:
+        """Đường dẫn trong thư mục nội dung của tài liệu
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+            name: Tên file hoặc thư mục con, rỗng để lấy thư mục của tài liệu
+
+        Returns:
+            Đường dẫn (có thể chưa tồn tại)
+        """
+        directory = self.content_dir / doc_hash[:2] / doc_hash
+        return directory / name if name else directory
+
+    def add(self, text: str, name: str, doc_hash: Optional[str] = None) -> str:
+        """Lưu tài liệu, hoặc cập nhật tên và thời điểm mở nếu đã có
+
+        Args:
+            text: Văn bản của tài liệu
+            name: Tên hiển thị (tên file hoặc URL)
+            doc_hash: Mã băm đã tính sẵn của văn bản
+
+        Returns:
+            Mã băm của tài liệu
+        """
+        doc_hash = doc_hash or self.hash_text(text)
+        text_path = self.path(doc_hash, TEXT_FILE)
+        if not text_path.exists():
+            _write_atomic(text_path, text)
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO documents (doc_hash, name, char_count, created_at, opened_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (doc_hash, name, len(text), now, now)
+            )
+            self._conn.execute("UPDATE documents SET name = ?, opened_at = ? WHERE doc_hash = ?",
+                               (name, now, doc_hash))
+        return doc_hash
+
+    def __contains__(self, doc_hash: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return row is not None
+
+    def info(self, doc_hash: str) -> Optional[Dict[str, Any]]:
+        """Thông tin của tài liệu
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+
+        Returns:
+            Dict gồm doc_hash, name, char_count, created_at, opened_at hoặc None nếu chưa lưu
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Các tài liệu mở gần đây nhất
+
+        Args:
+            limit: Số tài liệu tối đa
+
+        Returns:
+            Danh sách thông tin tài liệu như info, mới nhất trước
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM documents ORDER BY opened_at DESC LIMIT ?",
+                                      (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def text(self, doc_hash: str) -> Optional[str]:
+        """Đọc văn bản của tài liệu
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+
+        Returns:
+            Văn bản hoặc None nếu chưa lưu
+        """
+        try:
+            return self.path(doc_hash, TEXT_FILE).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def get(self, doc_hash: str, kind: str, params: str = "") -> Optional[Any]:
+        """Đọc một kết quả đã lưu
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+            kind: Loại kết quả ("summary", "stats", ...)
+            params: Tham số tạo ra kết quả (ví dụ độ dài tóm tắt)
+
+        Returns:
+            Giá trị đã lưu hoặc None nếu chưa có
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM artifacts WHERE doc_hash = ? AND kind = ? AND params = ?",
+                (doc_hash, kind, params)
+            ).fetchone()
+        return json.loads(row["value"]) if row is not None else None
+
+    def latest(self, doc_hash: str, kind: str) -> Optional[Tuple[str, Any]]:
+        """Đọc kết quả được lưu gần nhất của một loại, với bất kỳ tham số nào
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+            kind: Loại kết quả
+
+        Returns:
+            (tham số, giá trị) hoặc None nếu chưa có
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT params, value FROM artifacts WHERE doc_hash = ? AND kind = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (doc_hash, kind)
+            ).fetchone()
+        return (row["params"], json.loads(row["value"])) if row is not None else None
+
+    def put(self, doc_hash: str, kind: str, value: Any, params: str = ""):
+        """Lưu một kết quả (giá trị phải chuyển được sang JSON)
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+            kind: Loại kết quả
+            value: Giá trị
+            params: Tham số tạo ra kết quả
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (doc_hash, kind, params, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (doc_hash, kind, params, json.dumps(value, ensure_ascii=False), time.time())
+            )
+
+    def sentence_spans(self, doc_hash: str) -> Optional[np.ndarray]:
+        """Đọc vị trí các câu đã lưu (ánh xạ bộ nhớ)
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+
+        Returns:
+            Mảng (số câu, 2) như segmentation.sentence_spans hoặc None nếu chưa lưu
+        """
+        try:
+            return np.load(self.path(doc_hash, SPANS_FILE), mmap_mode="r")
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Không đọc được vị trí câu của tài liệu {doc_hash[:12]}: {str(e)}")
+            return None
+
+    def put_sentence_spans(self, doc_hash: str, spans: np.ndarray):
+        """Lưu vị trí các câu của tài liệu
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+            spans: Mảng (số câu, 2) như segmentation.sentence_spans
+        """
+        path = self.path(doc_hash, SPANS_FILE)
+        if not path.exists():
+            _write_atomic(path, np.ascontiguousarray(spans, dtype=np.int64))
+
+    def remove(self, doc_hash: str):
+        """Xóa tài liệu cùng toàn bộ kết quả và file nội dung
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM artifacts WHERE doc_hash = ?", (doc_hash,))
+            self._conn.execute("DELETE FROM documents WHERE doc_hash = ?", (doc_hash,))
+        shutil.rmtree(self.path(doc_hash), ignore_errors=True)
+
+    def close(self):
+        """Đóng kết nối SQLite"""
+        with self._lock:
+            self._conn.close()
+
+def get_document_store() -> Optional[DocumentStore]:
+    """Lấy kho tài liệu dùng chung trong tiến trình
+
+    Returns:
+        Kho tài liệu hoặc None nếu kho bị tắt
+    """
+    global _document_store
+    if not STORE_CONFIG.get("enabled", True):
+        return None
+    with _document_store_lock:
+        if _document_store is None:
+            _document_store = DocumentStore(STORE_CONFIG["db_path"], STORE_CONFIG["content_dir"])
+        return _document_store
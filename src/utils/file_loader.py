@@ -2,13 +2,30 @@
 
 import fitz
 import docx
+import hashlib
 import logging
 import os
-from typing import BinaryIO, Optional, Union
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from src.config import CACHE_CONFIG, FILE_CONFIG
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.progress import ProgressCallback, report_progress
 
 # Thiết lập logging
 logger = logging.getLogger(__name__)
 
+# Chuỗi phân cách giữa các trang khi ghép văn bản PDF
+PAGE_SEPARATOR = "\n\n"
+
+# Phiên bản bộ trích xuất, tăng giá trị khi thay đổi cách trích xuất để vô hiệu hóa cache cũ
+EXTRACTOR_VERSION = "1"
+
+# Cache văn bản đã trích xuất, khởi tạo khi dùng lần đầu
+_extraction_cache: Optional[DiskLRUCache] = None
+
 def detect_file_type(file: BinaryIO) -> str:
     """Tự động phát hiện loại file dựa trên định dạng hoặc extension
 
@@ -57,11 +74,54 @@ def detect_file_type(file: BinaryIO) -> str:
 
     return "Unknown"
 
-def load_file(file: BinaryIO) -> str:
+def compute_file_hash(file: BinaryIO) -> str:
+    """Tính SHA-256 của nội dung file mà không thay đổi vị trí con trỏ
+
+    Args:
+        file: File object
+
+    Returns:
+        Chuỗi hex của mã băm
+    """
+    current_position = file.tell()
+    digest = hashlib.sha256()
+    try:
+        if hasattr(file, 'getbuffer'):
+            digest.update(file.getbuffer())
+        else:
+            file.seek(0)
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+    finally:
+        file.seek(current_position)
+    return digest.hexdigest()
+
+def get_extraction_cache() -> Optional[DiskLRUCache]:
+    """Lấy cache văn bản trích xuất dùng chung trong tiến trình
+
+    Returns:
+        Đối tượng cache hoặc None nếu cache bị tắt
+    """
+    global _extraction_cache
+    if not CACHE_CONFIG.get("extraction_enabled", True):
+        return None
+    if _extraction_cache is None:
+        _extraction_cache = DiskLRUCache(
+            CACHE_CONFIG["extraction_dir"],
+            max_bytes=CACHE_CONFIG["extraction_max_mb"] * 1024 * 1024,
+            version=EXTRACTOR_VERSION
+        )
+    return _extraction_cache
+
+def load_file(file: BinaryIO, progress_callback: Optional[ProgressCallback] = None) -> str:
     """Tải và trích xuất nội dung từ file
 
+    Kết quả được cache theo SHA-256 của nội dung file, nên file đã xử lý
+    trước đó không cần mở lại bằng PyMuPDF/python-docx.
+
     Args:
         file: File object được upload từ Streamlit
+        progress_callback: Hàm nhận (số trang đã xử lý, tổng số trang)
 
     Returns:
         Nội dung văn bản từ file hoặc thông báo lỗi
@@ -71,61 +131,374 @@ def load_file(file: BinaryIO) -> str:
         file_type = detect_file_type(file)
         logger.info(f"Đã phát hiện loại file: {file_type}")
 
+        if file_type not in ("PDF", "Word"):
+            return f"Lỗi: Không hỗ trợ định dạng file này. Vui lòng tải lên file PDF hoặc Word (.docx)."
+
+        cache, cache_key, cached_text = _cached_extraction(file)
+        if cached_text is not None:
+            report_progress(progress_callback, 1, 1)
+            return cached_text
+
         if file_type == "PDF":
-            return extract_text_from_pdf(file)
-        elif file_type == "Word":
-            return extract_text_from_word(file)
+            text = extract_text_from_pdf(file, progress_callback=progress_callback)
         else:
-            return f"Lỗi: Không hỗ trợ định dạng file này. Vui lòng tải lên file PDF hoặc Word (.docx)."
+            text = extract_text_from_word(file, progress_callback=progress_callback)
+
+        if cache is not None:
+            _save_extraction(cache, cache_key, text)
+
+        return text
 
     except Exception as e:
         logger.error(f"Lỗi khi đọc file: {str(e)}")
         return f"Lỗi khi xử lý file: {str(e)}"
 
-def extract_text_from_pdf(file: BinaryIO) -> str:
-    """Trích xuất văn bản từ file PDF
+def _cached_extraction(file: BinaryIO) -> Tuple[Optional[DiskLRUCache], str, Optional[str]]:
+    """Tra cứu cache trích xuất, khóa gồm mã băm nội dung và giới hạn số trang đang áp dụng
 
     Args:
-        file: File PDF
+        file: File object
 
     Returns:
-        Nội dung văn bản đã trích xuất
+        (cache hoặc None nếu cache bị tắt, khóa cache, văn bản đã lưu hoặc None)
+    """
+    cache = get_extraction_cache()
+    if cache is None:
+        return None, "", None
+    cache_key = f"{compute_file_hash(file)}-p{FILE_CONFIG.get('max_pages') or 0}"
+    cached_text = cache.get(cache_key)
+    status = "HIT" if cached_text is not None else "MISS"
+    logger.info(f"Cache trích xuất {status} {cache_key[:12]} (hit={cache.hits}, miss={cache.misses})")
+    return cache, cache_key, cached_text
+
+def _save_extraction(cache: DiskLRUCache, cache_key: str, text: str):
+    """Lưu văn bản đã trích xuất vào cache, lỗi cache chỉ được ghi log để không làm hỏng kết quả
+
+    Args:
+        cache: Cache trích xuất
+        cache_key: Khóa cache (_cached_extraction)
+        text: Văn bản đã trích xuất
     """
-    text = ""
     try:
-        # Lưu vị trí hiện tại
-        current_position = file.tell()
-        file.seek(0)  # Đặt lại vị trí đầu file
+        cache.put(cache_key, text)
+    except OSError as e:
+        logger.warning(f"Không lưu được cache trích xuất {cache_key[:12]}: {str(e)}")
+
+def iter_file_pages(file: BinaryIO, progress_callback: Optional[ProgressCallback] = None) -> Iterator[str]:
+    """Trích xuất nội dung file theo từng trang, để bước sau bắt đầu trước khi đọc xong file
+
+    Ví dụ: summarize_stream(iter_file_pages(file)) tóm tắt các trang đầu của
+    PDF trong lúc các trang sau đang được đọc. Ghép các phần bằng
+    PAGE_SEPARATOR cho cùng văn bản như load_file, văn bản này được lưu vào
+    cache trích xuất khi đọc hết file.
+
+    Args:
+        file: File PDF hoặc Word
+        progress_callback: Hàm nhận (số trang đã xử lý, tổng số trang)
+
+    Yields:
+        Văn bản của từng trang PDF có nội dung; file Word và văn bản đã có
+        trong cache được trả về một lần
+
+    Raises:
+        ValueError: Khi file không phải PDF hoặc Word
+    """
+    file_type = detect_file_type(file)
+    if file_type not in ("PDF", "Word"):
+        raise ValueError("Không hỗ trợ định dạng file này. Vui lòng tải lên file PDF hoặc Word (.docx).")
+
+    cache, cache_key, cached_text = _cached_extraction(file)
+    if cached_text is not None:
+        report_progress(progress_callback, 1, 1)
+        yield cached_text
+        return
+
+    if file_type == "Word":
+        pages = [extract_text_from_word(file, progress_callback=progress_callback)]
+        yield pages[0]
+    else:
+        pages = []
+        for record in iter_pdf_pages(file, progress_callback):
+            if record["text"]:
+                pages.append(record["text"])
+                yield record["text"]
+
+    if cache is not None:
+        _save_extraction(cache, cache_key, PAGE_SEPARATOR.join(pages))
+
+def _local_path(file: BinaryIO) -> Optional[str]:
+    """Trả về đường dẫn trên đĩa nếu file được mở trực tiếp từ hệ thống file
+
+    Args:
+        file: File object
+
+    Returns:
+        Đường dẫn file hoặc None với file trong bộ nhớ
+    """
+    path = getattr(file, 'name', '')
+    if isinstance(path, str) and hasattr(file, 'fileno') and os.path.isfile(path):
+        return path
+    return None
+
+def _page_limit(page_count: int) -> int:
+    """Áp dụng giới hạn FILE_CONFIG["max_pages"] cho số trang cần xử lý
+
+    Args:
+        page_count: Tổng số trang của tài liệu
+
+    Returns:
+        Số trang sẽ được trích xuất
+    """
+    max_pages = FILE_CONFIG.get("max_pages")
+    if max_pages and page_count > max_pages:
+        logger.warning(f"Tài liệu có {page_count} trang, chỉ xử lý {max_pages} trang đầu")
+        return max_pages
+    return page_count
+
+def _open_pdf(file: BinaryIO) -> fitz.Document:
+    """Mở tài liệu PDF, tránh sao chép toàn bộ nội dung file vào bộ nhớ khi có thể
+
+    Args:
+        file: File PDF
+
+    Returns:
+        Đối tượng tài liệu của PyMuPDF
+    """
+    # File thật trên đĩa: để MuPDF tự đọc từng phần khi cần
+    path = _local_path(file)
+    if path:
+        return fitz.open(path, filetype="pdf")
+
+    # File trong bộ nhớ (UploadedFile của Streamlit, BytesIO): dùng buffer sẵn có, không copy
+    if hasattr(file, 'getbuffer'):
+        return fitz.open(stream=file.getbuffer(), filetype="pdf")
+
+    file.seek(0)
+    return fitz.open(stream=file.read(), filetype="pdf")
+
+def iter_pdf_pages(file: BinaryIO, progress_callback: Optional[ProgressCallback] = None) -> Iterator[Dict[str, Any]]:
+    """Trích xuất văn bản PDF theo từng trang dưới dạng generator
+
+    Mỗi trang chỉ được đọc khi bên sử dụng yêu cầu, nên bộ nhớ tối đa chỉ
+    tương đương vài trang thay vì toàn bộ tài liệu.
+
+    Args:
+        file: File PDF
+        progress_callback: Hàm nhận (số trang đã xử lý, tổng số trang)
+
+    Yields:
+        Dict gồm "page" (số trang, bắt đầu từ 1), "page_count", "text" và
+        "start"/"end" là vị trí ký tự của trang trong văn bản mà
+        extract_text_from_pdf trả về (trang rỗng có start == end)
+    """
+    # Lưu vị trí hiện tại
+    current_position = file.tell()
+    offset = 0
 
-        # Mở và xử lý file PDF
-        with fitz.open(stream=file.read(), filetype="pdf") as doc:
+    try:
+        with _open_pdf(file) as doc:
             # Số trang trong file
-            page_count = len(doc)
+            page_count = _page_limit(len(doc))
             logger.info(f"Đang xử lý file PDF: {page_count} trang")
 
-            # Trích xuất văn bản từ mỗi trang
-            for i, page in enumerate(doc):
-                page_text = page.get_text("text")
-                text += page_text + "\n\n"
+            for i in range(page_count):
+                page_text = doc.load_page(i).get_text("text").strip()
+
+                start = offset
+                if page_text:
+                    # Các trang có nội dung được nối bằng PAGE_SEPARATOR
+                    if offset > 0:
+                        start += len(PAGE_SEPARATOR)
+                    offset = start + len(page_text)
+
+                yield {
+                    "page": i + 1,
+                    "page_count": page_count,
+                    "text": page_text,
+                    "start": start,
+                    "end": start + len(page_text)
+                }
+                report_progress(progress_callback, i + 1, page_count)
 
                 # Log tiến trình
                 if i % 10 == 0 and i > 0:
                     logger.info(f"Đã xử lý {i}/{page_count} trang")
 
+    except Exception as e:
+        logger.error(f"Lỗi khi trích xuất văn bản từ PDF: {str(e)}")
+        raise
+
+    finally:
         # Đặt lại vị trí con trỏ file
         file.seek(current_position)
 
-        return text.strip()
+def get_page_count(file: BinaryIO) -> int:
+    """Đếm số trang sẽ được xử lý của file PDF mà không trích xuất văn bản
+
+    Args:
+        file: File object
+
+    Returns:
+        Số trang (đã áp dụng giới hạn max_pages), 0 với file không phải PDF
+    """
+    if detect_file_type(file) != "PDF":
+        return 0
+
+    current_position = file.tell()
+    try:
+        with _open_pdf(file) as doc:
+            max_pages = FILE_CONFIG.get("max_pages")
+            return min(len(doc), max_pages) if max_pages else len(doc)
+    finally:
+        file.seek(current_position)
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """Trích xuất văn bản các trang [start, end) trong tiến trình con
+
+    Args:
+        path: Đường dẫn file PDF dùng chung giữa các tiến trình
+        start: Chỉ số trang bắt đầu
+        end: Chỉ số trang kết thúc (không bao gồm)
+
+    Returns:
+        Danh sách văn bản của từng trang theo thứ tự
+    """
+    with fitz.open(path, filetype="pdf") as doc:
+        return [doc.load_page(i).get_text("text").strip() for i in range(start, end)]
+
+def _split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Chia dãy trang thành các khoảng liên tiếp có kích thước gần bằng nhau
+
+    Args:
+        page_count: Số trang cần chia
+        parts: Số khoảng mong muốn
+
+    Returns:
+        Danh sách các khoảng (start, end)
+    """
+    parts = max(1, min(parts, page_count))
+    size, remainder = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < remainder else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+@contextmanager
+def _shared_pdf_path(file: BinaryIO) -> Iterator[str]:
+    """Cung cấp đường dẫn file PDF mà các tiến trình con có thể tự mở
+
+    File trên đĩa được dùng trực tiếp, file trong bộ nhớ được ghi ra file tạm
+    và xóa sau khi xử lý xong.
+
+    Args:
+        file: File PDF
+
+    Yields:
+        Đường dẫn tới file PDF
+    """
+    path = _local_path(file)
+    if path:
+        yield path
+        return
+
+    current_position = file.tell()
+    file.seek(0)
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            if hasattr(file, 'getbuffer'):
+                tmp.write(file.getbuffer())
+            else:
+                while True:
+                    block = file.read(1024 * 1024)
+                    if not block:
+                        break
+                    tmp.write(block)
+        yield tmp.name
+    finally:
+        file.seek(current_position)
+        os.unlink(tmp.name)
+
+def extract_text_from_pdf_parallel(file: BinaryIO, workers: Optional[int] = None,
+                                   progress_callback: Optional[ProgressCallback] = None) -> str:
+    """Trích xuất văn bản từ file PDF bằng nhiều tiến trình song song
+
+    Mỗi tiến trình tự mở file PDF dùng chung và xử lý một khoảng trang liên
+    tiếp, kết quả được ghép lại theo đúng thứ tự trang.
+
+    Args:
+        file: File PDF
+        workers: Số tiến trình, mặc định lấy từ FILE_CONFIG["extraction_workers"]
+            hoặc số CPU
+        progress_callback: Hàm nhận (số trang đã xử lý, tổng số trang)
+
+    Returns:
+        Nội dung văn bản đã trích xuất
+    """
+    workers = workers or FILE_CONFIG.get("extraction_workers") or os.cpu_count() or 1
+
+    try:
+        current_position = file.tell()
+        with _open_pdf(file) as doc:
+            page_count = len(doc)
+        file.seek(current_position)
+
+        # Tài liệu nhỏ: chi phí khởi tạo tiến trình lớn hơn lợi ích
+        if workers <= 1 or page_count < FILE_CONFIG.get("parallel_min_pages", 0):
+            return extract_text_from_pdf(file, parallel=False, progress_callback=progress_callback)
+
+        page_count = _page_limit(page_count)
+        logger.info(f"Đang xử lý file PDF: {page_count} trang với {workers} tiến trình")
+
+        # Chia nhỏ hơn số tiến trình để cân bằng tải giữa các trang nặng/nhẹ
+        ranges = _split_page_ranges(page_count, workers * 4)
+        starts, ends = zip(*ranges)
+        pages: List[str] = []
+
+        with _shared_pdf_path(file) as path:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                done = 0
+                for page_texts in executor.map(_extract_page_range, [path] * len(ranges), starts, ends):
+                    pages.extend(text for text in page_texts if text)
+                    done += len(page_texts)
+                    report_progress(progress_callback, done, page_count)
+
+        return PAGE_SEPARATOR.join(pages)
 
     except Exception as e:
-        logger.error(f"Lỗi khi trích xuất văn bản từ PDF: {str(e)}")
+        logger.error(f"Lỗi khi trích xuất song song văn bản từ PDF: {str(e)}")
         raise
 
-def extract_text_from_word(file: BinaryIO) -> str:
+def extract_text_from_pdf(file: BinaryIO, parallel: Optional[bool] = None,
+                          progress_callback: Optional[ProgressCallback] = None) -> str:
+    """Trích xuất văn bản từ file PDF
+
+    Args:
+        file: File PDF
+        parallel: Dùng nhiều tiến trình, mặc định theo FILE_CONFIG["parallel_extraction"]
+        progress_callback: Hàm nhận (số trang đã xử lý, tổng số trang)
+
+    Returns:
+        Nội dung văn bản đã trích xuất
+    """
+    if parallel is None:
+        parallel = FILE_CONFIG.get("parallel_extraction", False)
+    if parallel:
+        return extract_text_from_pdf_parallel(file, progress_callback=progress_callback)
+
+    # Ghép một lần bằng join thay vì cộng chuỗi trong vòng lặp
+    pages = [record["text"] for record in iter_pdf_pages(file, progress_callback) if record["text"]]
+    return PAGE_SEPARATOR.join(pages)
+
+def extract_text_from_word(file: BinaryIO, progress_callback: Optional[ProgressCallback] = None) -> str:
     """Trích xuất văn bản từ file Word (.docx)
 
     Args:
         file: File Word
+        progress_callback: Hàm nhận (số bước đã xong, tổng số bước)
 
     Returns:
         Nội dung văn bản đã trích xuất
@@ -136,6 +509,7 @@ def extract_text_from_word(file: BinaryIO) -> str:
 
         # Trích xuất văn bản từ các đoạn
         paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
+        report_progress(progress_callback, 1, 2)
 
         # Trích xuất văn bản từ các bảng
         tables_text = []
@@ -145,6 +519,8 @@ def extract_text_from_word(file: BinaryIO) -> str:
                 if row_text:
                     tables_text.append(row_text)
 
+        report_progress(progress_callback, 2, 2)
+
         # Kết hợp tất cả văn bản
         all_text = "\n\n".join(paragraphs)
         if tables_text:
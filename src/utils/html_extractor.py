@@ -0,0 +1,363 @@
+"""Module trích xuất văn bản từ HTML cho scraper
+
+Thay vì dựng cây BeautifulSoup rồi xóa các thẻ không cần thiết, HTML được
+duyệt một lượt theo luồng sự kiện (thẻ mở, thẻ đóng, văn bản): các nhánh
+script/style/nav/footer... bị bỏ qua ngay khi gặp và văn bản được gom theo
+khối (đoạn văn, tiêu đề, ô bảng...). Trình phân tích của lxml (C) được dùng
+khi có cài đặt, nếu không thì dùng html.parser của thư viện chuẩn.
+
+Chế độ "readability" chấm điểm các khối theo độ dài, số dấu phẩy, mật độ
+liên kết và tên class/id để chỉ giữ phần nội dung chính của trang, giảm các
+phần menu, quảng cáo, bình luận trước khi đưa vào tóm tắt.
+"""
+
+import logging
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Các chế độ trích xuất: "readability" (nội dung chính), "fast" (toàn bộ văn bản), "soup" (BeautifulSoup)
+EXTRACTION_MODES = ("readability", "fast", "soup")
+
+# Các thẻ bị bỏ qua cùng toàn bộ nội dung bên trong
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "header", "aside"}
+
+# Các thẻ khối, văn bản được tách thành khối mới tại đầu và cuối các thẻ này
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "caption", "dd", "div", "dl", "dt", "figcaption",
+    "figure", "form", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "main", "ol", "p", "pre",
+    "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul"
+}
+
+# Các thẻ không có thẻ đóng
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+# Tên class/id gợi ý nội dung chính hoặc phần phụ của trang
+POSITIVE_NAMES = re.compile(r"article|body|content|entry|main|page|post|story|text|blog|chi-?tiet|noi-?dung", re.I)
+NEGATIVE_NAMES = re.compile(
+    r"comment|sidebar|footer|menu|nav|banner|breadcrumb|share|social|related|promo|sponsor|advert|"
+    r"\bads?\b|widget|popup|cookie|subscribe|masthead|meta|tag", re.I
+)
+
+# Điểm cơ bản theo loại thẻ chứa đoạn văn
+TAG_SCORES = {
+    "div": 5, "article": 8, "main": 8, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+    "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3, "form": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5
+}
+
+# Độ dài tối thiểu (ký tự) để một khối được tính là đoạn văn khi chấm điểm
+MIN_PARAGRAPH_LENGTH = 25
+
+# Khối có tỷ lệ ký tự thuộc liên kết vượt ngưỡng này bị coi là danh sách liên kết
+MAX_LINK_DENSITY = 0.5
+
+# Mẫu tìm khai báo bảng mã trong thẻ meta
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w-]+)""", re.I)
+
+class _TextCollector:
+    """Nhận sự kiện phân tích HTML và gom văn bản thành các khối
+
+    Có giao diện "target" của lxml (start/end/data/close) nên được gọi trực
+    tiếp từ trình phân tích C mà không dựng cây. Mỗi phần tử mở được ghi lại
+    (thẻ, phần tử cha, điểm theo class/id) để chấm điểm nội dung chính.
+    """
+
+    def __init__(self):
+        # Thông tin phần tử: thẻ, chỉ số phần tử cha, điểm theo class/id
+        self.tags: List[str] = []
+        self.parents: List[int] = []
+        self.weights: List[int] = []
+        # Các khối văn bản: nội dung, phần tử chứa, số ký tự thuộc liên kết
+        self.blocks: List[str] = []
+        self.owners: List[int] = []
+        self.link_lengths: List[int] = []
+        # Địa chỉ của các liên kết, kể cả trong các nhánh bị bỏ qua như nav
+        self.links: List[str] = []
+
+        self._stack: List[int] = []
+        self._buffer: List[str] = []
+        self._link_length = 0
+        self._link_depth = 0
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+
+    def _flush(self):
+        """Kết thúc khối hiện tại"""
+        if self._buffer:
+            text = " ".join("".join(self._buffer).split())
+            if text:
+                self.blocks.append(text)
+                self.owners.append(self._stack[-1] if self._stack else -1)
+                self.link_lengths.append(min(self._link_length, len(text)))
+            self._buffer = []
+        self._link_length = 0
+
+    def start(self, tag: str, attrib: Dict[str, str]):
+        if tag == "a" and attrib.get("href"):
+            self.links.append(attrib["href"])
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self._skip_tag, self._skip_depth = tag, 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag == "br":
+            self._buffer.append(" ")
+        if tag in VOID_TAGS:
+            return
+        if tag == "a":
+            self._link_depth += 1
+
+        names = f"{attrib.get('class') or ''} {attrib.get('id') or ''}"
+        weight = 0
+        if names.strip():
+            weight = (25 if POSITIVE_NAMES.search(names) else 0) - (25 if NEGATIVE_NAMES.search(names) else 0)
+        self.tags.append(tag)
+        self.parents.append(self._stack[-1] if self._stack else -1)
+        self.weights.append(weight)
+        self._stack.append(len(self.tags) - 1)
+
+    def end(self, tag: str):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip_tag = None
+            return
+        if tag in VOID_TAGS:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+        # HTML lỗi có thể thiếu thẻ đóng: đóng các phần tử cho tới phần tử khớp, bỏ qua thẻ đóng lạc
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self.tags[self._stack[depth]] == tag:
+                for element in self._stack[depth:]:
+                    if self.tags[element] == "a":
+                        self._link_depth = max(0, self._link_depth - 1)
+                del self._stack[depth:]
+                break
+
+    def data(self, text: str):
+        if self._skip_tag is None:
+            self._buffer.append(text)
+            if self._link_depth:
+                self._link_length += len(text.strip())
+
+    def close(self) -> "_TextCollector":
+        self._flush()
+        return self
+
+class _StdlibParser(HTMLParser):
+    """Chuyển sự kiện của html.parser sang _TextCollector khi không có lxml"""
+
+    def __init__(self, target: _TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+        if tag not in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+def _detect_encoding(html: bytes, encoding: Optional[str]) -> str:
+    """Bảng mã theo header, nếu không có thì theo thẻ meta, mặc định UTF-8"""
+    if encoding:
+        return encoding
+    match = _META_CHARSET.search(html[:4096])
+    return match.group(1).decode("ascii") if match else "utf-8"
+
+def _decode(html: bytes, encoding: str) -> str:
+    """Giải mã HTML, bảng mã không hợp lệ thì dùng UTF-8"""
+    try:
+        return html.decode(encoding, errors="replace")
+    except LookupError:
+        return html.decode("utf-8", errors="replace")
+
+def _collect(html: bytes, encoding: Optional[str] = None) -> _TextCollector:
+    """Duyệt HTML một lượt và gom văn bản theo khối
+
+    Args:
+        html: Nội dung HTML
+        encoding: Bảng mã theo header Content-Type, None để tự phát hiện
+
+    Returns:
+        Bộ gom đã chứa các khối và phần tử
+    """
+    encoding = _detect_encoding(html, encoding)
+    target = _TextCollector()
+    if etree is not None:
+        try:
+            parser = etree.HTMLParser(target=target, encoding=encoding, remove_comments=True)
+            parser.feed(html)
+            return parser.close()
+        except (etree.LxmlError, LookupError, ValueError) as e:
+            logger.warning(f"lxml không phân tích được trang, dùng html.parser: {str(e)}")
+            target = _TextCollector()
+
+    parser = _StdlibParser(target)
+    parser.feed(_decode(html, encoding))
+    parser.close()
+    return target.close()
+
+def extract_text_fast(html: bytes, encoding: Optional[str] = None) -> str:
+    """Trích xuất toàn bộ văn bản hiển thị, bỏ các nhánh script/style/nav/footer...
+
+    Args:
+        html: Nội dung HTML
+        encoding: Bảng mã theo header Content-Type, None để tự phát hiện
+
+    Returns:
+        Văn bản, các khối cách nhau bởi dòng trống
+    """
+    return "\n\n".join(_collect(html, encoding).blocks)
+
+def extract_main_content(html: bytes, encoding: Optional[str] = None) -> str:
+    """Trích xuất phần nội dung chính của trang theo cách chấm điểm kiểu Readability
+
+    Mỗi đoạn văn đủ dài cộng điểm (1 + số dấu phẩy + độ dài/100, tối đa 3) cho
+    phần tử cha và một nửa cho phần tử ông. Điểm của phần tử được cộng thêm
+    theo loại thẻ và tên class/id, rồi nhân với (1 - mật độ liên kết). Kết quả
+    gồm các khối trong phần tử điểm cao nhất và các phần tử anh em đủ điểm.
+
+    Args:
+        html: Nội dung HTML
+        encoding: Bảng mã theo header Content-Type, None để tự phát hiện
+
+    Returns:
+        Văn bản nội dung chính, hoặc toàn bộ văn bản nếu không xác định được
+    """
+    return _main_content(_collect(html, encoding))
+
+def _main_content(collected: _TextCollector) -> str:
+    """Chọn các khối thuộc nội dung chính từ kết quả duyệt HTML"""
+    parents = collected.parents
+
+    def ancestors(element: int):
+        while element >= 0:
+            yield element
+            element = parents[element]
+
+    # Tổng số ký tự và ký tự liên kết trong mỗi phần tử
+    text_lengths: Dict[int, int] = {}
+    link_lengths: Dict[int, int] = {}
+    for text, owner, link_length in zip(collected.blocks, collected.owners, collected.link_lengths):
+        for element in ancestors(owner):
+            text_lengths[element] = text_lengths.get(element, 0) + len(text)
+            link_lengths[element] = link_lengths.get(element, 0) + link_length
+
+    # Chấm điểm phần tử cha và ông của từng đoạn văn
+    scores: Dict[int, float] = {}
+    for text, owner in zip(collected.blocks, collected.owners):
+        if len(text) < MIN_PARAGRAPH_LENGTH or owner < 0:
+            continue
+        points = 1 + text.count(",") + min(len(text) / 100, 3)
+        for level, element in enumerate((parents[owner], parents[parents[owner]] if parents[owner] >= 0 else -1)):
+            if element < 0:
+                break
+            if element not in scores:
+                scores[element] = TAG_SCORES.get(collected.tags[element], 0) + collected.weights[element]
+            scores[element] += points / (level + 1)
+
+    for element in scores:
+        scores[element] *= 1 - link_lengths.get(element, 0) / max(1, text_lengths.get(element, 0))
+
+    if not scores:
+        return "\n\n".join(collected.blocks)
+
+    # Phần tử tốt nhất và các phần tử anh em có điểm đủ cao
+    top = max(scores, key=scores.get)
+    threshold = max(10.0, scores[top] * 0.2)
+    selected = {top} | {
+        element for element, score in scores.items()
+        if parents[element] == parents[top] and score >= threshold
+    }
+
+    blocks = [
+        text for text, owner, link_length in zip(collected.blocks, collected.owners, collected.link_lengths)
+        if link_length / len(text) <= MAX_LINK_DENSITY and any(element in selected for element in ancestors(owner))
+    ]
+    if not blocks:
+        return "\n\n".join(collected.blocks)
+    return "\n\n".join(blocks)
+
+def extract_text_soup(html: bytes, encoding: Optional[str] = None) -> str:
+    """Trích xuất văn bản bằng BeautifulSoup (cách làm cũ, chậm hơn)
+
+    Args:
+        html: Nội dung HTML
+        encoding: Bảng mã theo header Content-Type, None để tự phát hiện
+
+    Returns:
+        Văn bản trên một dòng
+    """
+    soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+
+    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
+        tag.decompose()
+
+    text = soup.get_text(separator=" ")
+    lines = [line.strip() for line in text.splitlines()]
+    return " ".join([line for line in lines if line])
+
+def extract_page(html: bytes, encoding: Optional[str] = None, mode: str = "readability") -> Dict[str, Any]:
+    """Trích xuất văn bản và các liên kết của trang trong một lượt duyệt
+
+    Args:
+        html: Nội dung HTML
+        encoding: Bảng mã theo header Content-Type, None để tự phát hiện
+        mode: "readability", "fast" hoặc "soup"
+
+    Returns:
+        Dict gồm text (văn bản như extract_text) và links (các href theo thứ tự xuất hiện)
+    """
+    collected = _collect(html, encoding)
+    if mode == "soup":
+        text = extract_text_soup(html, encoding)
+    elif mode == "fast":
+        text = "\n\n".join(collected.blocks)
+    else:
+        text = _main_content(collected)
+    return {"text": text, "links": collected.links}
+
+def extract_text(html: bytes, encoding: Optional[str] = None, mode: str = "readability") -> str:
+    """Trích xuất văn bản từ HTML theo chế độ đã chọn
+
+    Args:
+        html: Nội dung HTML
+        encoding: Bảng mã theo header Content-Type, None để tự phát hiện
+        mode: "readability", "fast" hoặc "soup"
+
+    Returns:
+        Văn bản đã làm sạch
+    """
+    if mode == "soup":
+        return extract_text_soup(html, encoding)
+    if mode == "fast":
+        return extract_text_fast(html, encoding)
+    if mode != "readability":
+        logger.warning(f"Không hỗ trợ chế độ trích xuất '{mode}', dùng 'readability'")
+    return extract_main_content(html, encoding)
@@ -0,0 +1,227 @@
+"""Module cache phản hồi HTTP cho scraper
+
+Mỗi URL được lưu thành một entry JSON trong DiskLRUCache gồm văn bản và liên
+kết đã trích xuất cùng các header ETag/Last-Modified. Entry còn hạn (theo
+Cache-Control/Expires hoặc thời gian mặc định) được dùng mà không cần mạng;
+entry hết hạn được kiểm tra lại bằng request có điều kiện (If-None-Match,
+If-Modified-Since), máy chủ trả về 304 thì không phải tải và trích xuất lại.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+from src.config import CACHE_CONFIG
+from src.utils.disk_cache import DiskLRUCache
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Phiên bản định dạng entry, tăng giá trị khi thay đổi cách trích xuất để vô hiệu hóa cache cũ
+HTTP_CACHE_VERSION = "1"
+
+# Mẫu đọc max-age trong header Cache-Control
+_MAX_AGE = re.compile(r"max-age\s*=\s*(\d+)", re.I)
+
+# Cache dùng chung trong tiến trình, khởi tạo khi dùng lần đầu
+_http_cache: Optional["HTTPCache"] = None
+_http_cache_lock = threading.Lock()
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    """Đọc header dạng ngày HTTP thành timestamp"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class HTTPCache:
+    """Cache trang web đã trích xuất, có kiểm tra lại theo ETag/Last-Modified"""
+
+    def __init__(self, directory, max_bytes: int, default_ttl: float = 3600):
+        """Khởi tạo cache
+
+        Args:
+            directory: Thư mục lưu cache
+            max_bytes: Tổng dung lượng tối đa (byte), vượt quá thì loại bỏ LRU
+            default_ttl: Thời gian còn hạn (giây) khi máy chủ không gửi Cache-Control/Expires
+        """
+        self.store = DiskLRUCache(directory, max_bytes=max_bytes, version=HTTP_CACHE_VERSION, suffix=".json")
+        self.default_ttl = default_ttl
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.stale_served = 0
+        self.fetched = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str, mode: str) -> str:
+        return hashlib.sha256(f"{mode}:{url}".encode("utf-8")).hexdigest()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _expires_at(self, headers: Mapping[str, str], now: float) -> Optional[float]:
+        """Thời điểm hết hạn theo header, None nếu không được lưu (no-store)"""
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            return now
+        match = _MAX_AGE.search(cache_control)
+        if match:
+            return now + int(match.group(1))
+        expires = _parse_http_date(headers.get("Expires"))
+        if expires is not None:
+            return expires
+        return now + self.default_ttl
+
+    def lookup(self, url: str, mode: str) -> Optional[Dict[str, Any]]:
+        """Đọc entry của URL
+
+        Args:
+            url: URL
+            mode: Chế độ trích xuất văn bản
+
+        Returns:
+            Entry (url, text, links, etag, last_modified, expires_at) hoặc None nếu chưa có
+        """
+        value = self.store.get(self._key(url, mode))
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            logger.warning(f"Entry cache HTTP hỏng cho {url}, bỏ qua")
+            return None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Entry còn hạn, dùng được mà không cần kiểm tra lại"""
+        return time.time() < entry.get("expires_at", 0)
+
+    @staticmethod
+    def validators(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Header cho request có điều kiện từ entry đã lưu
+
+        Args:
+            entry: Entry hết hạn
+
+        Returns:
+            Dict header If-None-Match/If-Modified-Since (rỗng nếu entry không có ETag/Last-Modified)
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def save(self, url: str, mode: str, page: Dict[str, Any], headers: Mapping[str, str]) -> Dict[str, Any]:
+        """Lưu trang vừa tải
+
+        Args:
+            url: URL đã yêu cầu
+            mode: Chế độ trích xuất văn bản
+            page: Dict gồm url (sau chuyển hướng), text và links
+            headers: Header của phản hồi
+
+        Returns:
+            Entry đã lưu (hoặc trang nếu máy chủ không cho lưu)
+        """
+        self._count("fetched")
+        now = time.time()
+        expires_at = self._expires_at(headers, now)
+        if expires_at is None:
+            return page
+
+        entry = dict(
+            page,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            fetched_at=now,
+            expires_at=expires_at
+        )
+        self._store(url, mode, entry)
+        return entry
+
+    def refresh(self, url: str, mode: str, entry: Dict[str, Any], headers: Mapping[str, str]) -> Dict[str, Any]:
+        """Gia hạn entry sau khi máy chủ trả về 304 Not Modified
+
+        Args:
+            url: URL đã yêu cầu
+            mode: Chế độ trích xuất văn bản
+            entry: Entry đã lưu
+            headers: Header của phản hồi 304
+
+        Returns:
+            Entry đã gia hạn
+        """
+        self._count("revalidated")
+        now = time.time()
+        entry = dict(
+            entry,
+            etag=headers.get("ETag") or entry.get("etag"),
+            last_modified=headers.get("Last-Modified") or entry.get("last_modified"),
+            expires_at=self._expires_at(headers, now) or now
+        )
+        self._store(url, mode, entry)
+        return entry
+
+    def _store(self, url: str, mode: str, entry: Dict[str, Any]):
+        """Ghi entry vào cache trên đĩa, lỗi cache chỉ được ghi log để không làm hỏng lần tải trang"""
+        try:
+            self.store.put(self._key(url, mode), json.dumps(entry, ensure_ascii=False))
+        except OSError as e:
+            logger.warning(f"Không lưu được cache HTTP cho {url}: {str(e)}")
+
+    def record_fresh_hit(self):
+        """Ghi nhận một lần dùng entry còn hạn"""
+        self._count("fresh_hits")
+
+    def record_stale_served(self):
+        """Ghi nhận một lần dùng entry hết hạn do không tải được trang"""
+        self._count("stale_served")
+
+    def stats(self) -> Dict[str, Any]:
+        """Thống kê hoạt động của cache
+
+        Returns:
+            Dict gồm số lần dùng entry còn hạn, kiểm tra lại (304), tải mới,
+            tỷ lệ không cần tải lại và thống kê của cache trên đĩa
+        """
+        with self._lock:
+            served = self.fresh_hits + self.revalidated + self.stale_served
+            requests = served + self.fetched
+            return {
+                "fresh_hits": self.fresh_hits,
+                "revalidated": self.revalidated,
+                "stale_served": self.stale_served,
+                "fetched": self.fetched,
+                "hit_rate": served / requests if requests else 0.0,
+                "disk": self.store.stats()
+            }
+
+def get_http_cache() -> Optional[HTTPCache]:
+    """Lấy cache HTTP dùng chung trong tiến trình
+
+    Returns:
+        Đối tượng cache hoặc None nếu cache bị tắt
+    """
+    global _http_cache
+    if not CACHE_CONFIG.get("http_enabled", True):
+        return None
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HTTPCache(
+                CACHE_CONFIG["http_dir"],
+                max_bytes=CACHE_CONFIG.get("http_max_mb", 256) * 1024 * 1024,
+                default_ttl=CACHE_CONFIG.get("http_default_ttl", 3600)
+            )
+        return _http_cache
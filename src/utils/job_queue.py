@@ -0,0 +1,312 @@
+"""Module hàng đợi công việc chạy nền, lưu trong SQLite
+
+Giao diện gửi các việc tốn thời gian (trích xuất file, tải website, tóm tắt)
+vào hàng đợi; các tiến trình worker (python -m src.worker) nhận việc, cập nhật
+tiến độ và ghi kết quả vào kho tài liệu. Trạng thái công việc nằm trong
+SQLite nên không mất khi tải lại trang hay khởi động lại ứng dụng.
+
+Công việc được chia công bằng giữa những người dùng (owner): worker luôn nhận
+việc của người đang có ít việc chạy nhất, nếu bằng nhau thì người được phục
+vụ lâu nhất trước. Công việc của worker bị dừng đột ngột (không còn nhịp tim)
+được đưa lại vào hàng đợi.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from src.config import JOB_CONFIG
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Trạng thái công việc
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_owner ON jobs (status, owner);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+# Hàng đợi dùng chung trong tiến trình, mở khi dùng lần đầu
+_job_queue: Optional["JobQueue"] = None
+_job_queue_lock = threading.Lock()
+
+class JobCancelled(Exception):
+    """Người dùng đã hủy công việc đang chạy"""
+
+def _decode_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+class JobQueue:
+    """Hàng đợi công việc trong SQLite, dùng chung giữa giao diện và các worker"""
+
+    def __init__(self, db_path: Union[str, Path], stale_after: float = 60, max_attempts: int = 2):
+        """Mở hàng đợi, tạo bảng nếu chưa có
+
+        Args:
+            db_path: Đường dẫn file SQLite
+            stale_after: Số giây không có nhịp tim thì coi worker của công việc đã dừng
+            max_attempts: Số lần chạy tối đa của một công việc (tính cả lần bị dừng giữa chừng)
+        """
+        self.db_path = Path(db_path)
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Tự quản lý giao dịch (BEGIN IMMEDIATE) để nhận việc một cách nguyên tử giữa các tiến trình
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def _write(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def submit(self, kind: str, payload: Dict[str, Any], owner: str) -> int:
+        """Thêm công việc vào hàng đợi
+
+        Args:
+            kind: Loại công việc (xem src.worker.HANDLERS)
+            payload: Tham số của công việc (chuyển được sang JSON)
+            owner: Người gửi, dùng để chia worker công bằng
+
+        Returns:
+            Mã công việc
+        """
+        cursor = self._write(
+            "INSERT INTO jobs (kind, owner, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, owner, json.dumps(payload, ensure_ascii=False), QUEUED, time.time())
+        )
+        logger.info(f"Đã thêm công việc {cursor.lastrowid} ({kind}) của {owner[:8]}")
+        return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Đọc trạng thái công việc
+
+        Args:
+            job_id: Mã công việc
+
+        Returns:
+            Dict gồm các cột của công việc (payload, result đã giải mã JSON) hoặc None nếu không có
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _decode_job(row) if row is not None else None
+
+    def list_jobs(self, owner: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Các công việc gần nhất của một người dùng
+
+        Args:
+            owner: Người gửi
+            limit: Số công việc tối đa
+
+        Returns:
+            Danh sách công việc như get, mới nhất trước
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs WHERE owner = ? ORDER BY id DESC LIMIT ?",
+                                      (owner, limit)).fetchall()
+        return [_decode_job(row) for row in rows]
+
+    def position(self, job_id: int) -> int:
+        """Số công việc đang chờ được tạo trước công việc này"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ? AND id < ?",
+                                      (QUEUED, job_id)).fetchone()[0]
+
+    def _requeue_stale(self, now: float):
+        """Đưa công việc của worker đã dừng trở lại hàng đợi, hoặc báo lỗi nếu đã chạy đủ số lần"""
+        deadline = now - self.stale_after
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+            "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+            (FAILED, "Worker dừng đột ngột khi đang xử lý", now, RUNNING, deadline, self.max_attempts)
+        )
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ?",
+            (QUEUED, RUNNING, deadline)
+        )
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Nhận công việc tiếp theo theo thứ tự công bằng giữa các người dùng
+
+        Người dùng có ít công việc đang chạy nhất được ưu tiên, sau đó là người
+        được phục vụ lâu nhất, cuối cùng là công việc được gửi trước.
+
+        Args:
+            worker_id: Mã của worker nhận việc
+
+        Returns:
+            Công việc như get hoặc None nếu hàng đợi trống
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(now)
+                row = self._conn.execute(
+                    "SELECT id FROM jobs AS queued WHERE status = ? ORDER BY "
+                    "(SELECT COUNT(*) FROM jobs WHERE owner = queued.owner AND status = ?), "
+                    "(SELECT COALESCE(MAX(started_at), 0) FROM jobs WHERE owner = queued.owner), "
+                    "id LIMIT 1",
+                    (QUEUED, RUNNING)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, worker_id, now, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def update_progress(self, job_id: int, done: int, total: int) -> bool:
+        """Cập nhật tiến độ và nhịp tim của công việc đang chạy
+
+        Args:
+            job_id: Mã công việc
+            done: Số bước đã xong
+            total: Tổng số bước
+
+        Returns:
+            True nếu người dùng đã yêu cầu hủy công việc
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress_done = ?, progress_total = ?, heartbeat_at = ? WHERE id = ?",
+                (done, total, time.time(), job_id)
+            )
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def heartbeat(self, worker_id: str, job_id: Optional[int] = None):
+        """Ghi nhịp tim của worker (và công việc đang chạy nếu có)
+
+        Args:
+            worker_id: Mã của worker
+            job_id: Công việc worker đang chạy
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO workers (worker_id, heartbeat_at) VALUES (?, ?)",
+                               (worker_id, now))
+            if job_id is not None:
+                self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (now, job_id))
+
+    def unregister_worker(self, worker_id: str):
+        """Xóa worker khỏi danh sách khi worker dừng"""
+        self._write("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def active_workers(self) -> int:
+        """Số worker còn nhịp tim gần đây"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?",
+                                      (time.time() - self.stale_after,)).fetchone()[0]
+
+    def complete(self, job_id: int, result: Any = None):
+        """Đánh dấu công việc hoàn thành
+
+        Args:
+            job_id: Mã công việc
+            result: Kết quả (chuyển được sang JSON)
+        """
+        self._write(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id, RUNNING)
+        )
+
+    def fail(self, job_id: int, error: str, status: str = FAILED):
+        """Đánh dấu công việc lỗi hoặc đã hủy
+
+        Args:
+            job_id: Mã công việc
+            error: Thông báo lỗi
+            status: FAILED hoặc CANCELLED
+        """
+        self._write(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (status, error, time.time(), job_id, RUNNING)
+        )
+
+    def cancel(self, job_id: int):
+        """Hủy công việc: việc đang chờ bị hủy ngay, việc đang chạy dừng ở lần cập nhật tiến độ tiếp theo
+
+        Args:
+            job_id: Mã công việc
+        """
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                               (CANCELLED, time.time(), job_id, QUEUED))
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                               (job_id, RUNNING))
+
+    def close(self):
+        """Đóng kết nối SQLite"""
+        with self._lock:
+            self._conn.close()
+
+def worker_name() -> str:
+    """Mã worker mặc định theo máy và tiến trình"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def get_job_queue() -> Optional[JobQueue]:
+    """Lấy hàng đợi dùng chung trong tiến trình
+
+    Returns:
+        Hàng đợi hoặc None nếu chạy nền bị tắt
+    """
+    global _job_queue
+    if not JOB_CONFIG.get("enabled", True):
+        return None
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                JOB_CONFIG["db_path"],
+                stale_after=JOB_CONFIG.get("stale_after", 60),
+                max_attempts=JOB_CONFIG.get("max_attempts", 2)
+            )
+        return _job_queue
@@ -0,0 +1,47 @@
+"""Module định nghĩa callback báo cáo tiến trình xử lý"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Callback nhận (số bước đã xong, tổng số bước)
+ProgressCallback = Callable[[int, int], None]
+
+def report_progress(callback: Optional[ProgressCallback], done: int, total: int):
+    """Gọi callback tiến trình nếu có
+
+    Args:
+        callback: Hàm callback hoặc None
+        done: Số bước đã hoàn thành
+        total: Tổng số bước
+    """
+    if callback is not None:
+        callback(done, max(total, 1))
+
+def measure_stream(events: Iterable[Dict[str, Any]], name: str) -> Iterator[Dict[str, Any]]:
+    """Đo thời gian của một luồng sự kiện kết quả (summarize_stream, answer_question_stream)
+
+    Thời gian tới kết quả đầu tiên (sự kiện "partial" hoặc "token" đầu tiên) được
+    đo riêng với tổng thời gian và thêm vào sự kiện "done".
+
+    Args:
+        events: Các sự kiện dạng {"type": ...}
+        name: Tên thao tác ghi trong log
+
+    Yields:
+        Các sự kiện như đầu vào, sự kiện "done" có thêm time_to_first_output và total_seconds
+    """
+    started = time.perf_counter()
+    first_output = None
+    for event in events:
+        if first_output is None and event["type"] in ("partial", "token"):
+            first_output = time.perf_counter() - started
+        if event["type"] == "done":
+            total = time.perf_counter() - started
+            first_output = total if first_output is None else first_output
+            logger.info(f"{name}: kết quả đầu tiên sau {first_output:.2f}s, hoàn thành sau {total:.2f}s")
+            event = {**event, "time_to_first_output": first_output, "total_seconds": total}
+        yield event
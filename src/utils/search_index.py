@@ -0,0 +1,366 @@
+"""Module tìm kiếm toàn văn trên mọi tài liệu đã phân tích
+
+Văn bản được chia thành các đoạn ngắn và lập chỉ mục bằng SQLite FTS5. Trước
+khi lập chỉ mục, mỗi ký tự được bỏ dấu thành đúng một ký tự ("Đường" →
+"Duong"), nên tìm "duong" hay "đường" đều khớp, và vị trí trong văn bản đã bỏ
+dấu trùng với vị trí trong văn bản gốc. Nhờ vậy đoạn trích trả về được lấy từ
+văn bản gốc, có đánh dấu các từ khớp.
+
+Cú pháp truy vấn: các từ cách nhau bởi khoảng trắng (phải có đủ), cụm từ
+chính xác trong dấu nháy kép ("hà nội"), tìm theo tiền tố với dấu * ở cuối
+từ (nghiên*).
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.config import SEARCH_CONFIG
+from src.utils.document import get_document
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Ký tự đánh dấu từ khớp trong kết quả highlight() của FTS5, không xuất hiện trong văn bản thường
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+# Một phần của truy vấn: cụm từ trong dấu nháy kép hoặc một từ (có thể kèm * ở cuối)
+_QUERY_PART = re.compile(r'"([^"]*)"?|(\S+)')
+_WORD = re.compile(r"\w+")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_documents (
+    doc_id INTEGER PRIMARY KEY,
+    doc_hash TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS passage_texts (
+    passage_id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS passage_texts_doc ON passage_texts (doc_id);
+CREATE TABLE IF NOT EXISTS search_terms (
+    term TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+    body,
+    tokenize = 'unicode61 remove_diacritics 0'
+);
+"""
+
+# Chỉ mục dùng chung trong tiến trình, mở khi dùng lần đầu
+_search_index: Optional["SearchIndex"] = None
+_search_index_lock = threading.Lock()
+
+def _build_fold_table() -> Dict[int, str]:
+    """Bảng bỏ dấu cho str.translate, mỗi ký tự Latin có dấu thành đúng một ký tự"""
+    table = {ord("đ"): "d", ord("Đ"): "D"}
+    for code in range(0x00C0, 0x2000):
+        char = chr(code)
+        decomposed = unicodedata.normalize("NFD", char)
+        if len(decomposed) > 1 and all(unicodedata.category(c) == "Mn" for c in decomposed[1:]):
+            table[code] = decomposed[0]
+    return table
+
+_FOLD_TABLE = _build_fold_table()
+
+def fold_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt (và các chữ Latin có dấu khác), giữ nguyên độ dài chuỗi
+
+    Args:
+        text: Văn bản gốc
+
+    Returns:
+        Văn bản đã bỏ dấu, ký tự thứ i tương ứng với ký tự thứ i của text
+    """
+    return text.translate(_FOLD_TABLE)
+
+def build_match_query(query: str, expand_prefix: Optional[Callable[[str], List[str]]] = None) -> str:
+    """Chuyển truy vấn của người dùng thành biểu thức MATCH của FTS5
+
+    Mọi từ đều được đặt trong dấu nháy nên ký tự đặc biệt của FTS5 trong truy
+    vấn không gây lỗi cú pháp.
+
+    Args:
+        query: Truy vấn, ví dụ 'nghiên* "hà nội" kinh tế'
+        expand_prefix: Hàm trả về các từ trong chỉ mục bắt đầu bằng tiền tố; nếu có, từ tiền tố
+            được thay bằng phép OR của các từ này thay vì dùng truy vấn tiền tố của FTS5
+
+    Returns:
+        Biểu thức MATCH, rỗng nếu truy vấn không có từ nào (hoặc có tiền tố không khớp từ nào)
+    """
+    parts = []
+    for match in _QUERY_PART.finditer(fold_diacritics(query)):
+        phrase, word = match.groups()
+        if phrase is not None:
+            words = _WORD.findall(phrase)
+            if words:
+                parts.append('"' + " ".join(words) + '"')
+            continue
+        words = _WORD.findall(word)
+        if not words:
+            continue
+        # Từ ghép như "covid-19" được tìm như cụm từ, dấu * áp dụng cho từ cuối
+        term = '"' + " ".join(words) + '"'
+        if not word.endswith("*"):
+            parts.append(term)
+        elif expand_prefix is not None and len(words) == 1:
+            expansions = expand_prefix(words[0].lower())
+            if not expansions:
+                return ""
+            parts.append("(" + " OR ".join(f'"{expansion}"' for expansion in expansions) + ")")
+        else:
+            parts.append(term + " *")
+    return " AND ".join(parts)
+
+def _marked_spans(marked: str) -> List[Tuple[int, int]]:
+    """Vị trí các từ được đánh dấu trong kết quả highlight(), tính theo chuỗi không có dấu đánh dấu"""
+    spans, offset, start = [], 0, None
+    for i, char in enumerate(marked):
+        if char == _MARK_START:
+            start = i - offset
+            offset += 1
+        elif char == _MARK_END:
+            spans.append((start, i - offset))
+            offset += 1
+    return spans
+
+def _make_snippet(text: str, spans: List[Tuple[int, int]], words: int) -> Dict[str, Any]:
+    """Cắt đoạn trích quanh từ khớp đầu tiên
+
+    Args:
+        text: Văn bản gốc của đoạn
+        spans: Vị trí các từ khớp trong text
+        words: Số từ tối đa của đoạn trích
+
+    Returns:
+        Dict gồm snippet (chuỗi) và highlights (vị trí các từ khớp trong snippet)
+    """
+    tokens = [match.span() for match in re.finditer(r"\S+", text)]
+    if not tokens:
+        return {"snippet": "", "highlights": []}
+    first = spans[0][0] if spans else 0
+    center = next((i for i, (_, end) in enumerate(tokens) if end > first), 0)
+    start_token = max(0, min(center - words // 3, len(tokens) - words))
+    end_token = min(len(tokens), start_token + words)
+
+    window = tokens[start_token:end_token]
+    prefix = "… " if start_token > 0 else ""
+    suffix = " …" if end_token < len(tokens) else ""
+    snippet = prefix + " ".join(text[token_start:token_end] for token_start, token_end in window) + suffix
+
+    # Khoảng trắng giữa các từ được gộp thành một dấu cách, nên tính lại vị trí từ khớp trên đoạn trích
+    offsets, position = [], len(prefix)
+    for token_start, token_end in window:
+        offsets.append(position - token_start)
+        position += token_end - token_start + 1
+
+    def locate(char: int) -> Optional[int]:
+        for (token_start, token_end), offset in zip(window, offsets):
+            if token_start <= char < token_end:
+                return char + offset
+        return None
+
+    highlights = []
+    for span_start, span_end in spans:
+        start, end = locate(span_start), locate(span_end - 1)
+        if start is not None and end is not None:
+            highlights.append((start, end + 1))
+    return {"snippet": snippet, "highlights": highlights}
+
+class SearchIndex:
+    """Chỉ mục toàn văn (SQLite FTS5) trên các đoạn của mọi tài liệu"""
+
+    def __init__(self, db_path: Union[str, Path], passage_words: int = 200, max_ranked: int = 5000,
+                 max_prefix_terms: int = 64):
+        """Mở chỉ mục, tạo bảng nếu chưa có
+
+        Args:
+            db_path: Đường dẫn file SQLite
+            passage_words: Số từ mỗi đoạn được lập chỉ mục
+            max_ranked: Số đoạn khớp mới nhất được xếp hạng mỗi truy vấn
+            max_prefix_terms: Số từ tối đa được tìm thay cho một từ tiền tố
+        """
+        self.db_path = Path(db_path)
+        self.passage_words = passage_words
+        self.max_ranked = max_ranked
+        self.max_prefix_terms = max_prefix_terms
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def __contains__(self, doc_hash: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM search_documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM search_documents").fetchone()[0]
+
+    def add_document(self, doc_hash: str, name: str, text: str) -> int:
+        """Lập chỉ mục một tài liệu, bỏ qua nếu đã có
+
+        Args:
+            doc_hash: Mã băm (SHA-256) của văn bản
+            name: Tên hiển thị (tên file hoặc URL)
+            text: Văn bản của tài liệu
+
+        Returns:
+            Số đoạn đã lập chỉ mục (0 nếu tài liệu đã có)
+        """
+        if doc_hash in self:
+            return 0
+        document = get_document(text)
+        passages = [document.span_text(start, end)
+                    for start, end in document.chunk_ranges(self.passage_words, 0)]
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO search_documents (doc_hash, name, added_at) VALUES (?, ?, ?)",
+                (doc_hash, name, time.time())
+            )
+            if cursor.rowcount == 0:
+                return 0
+            doc_id = cursor.lastrowid
+            first_id = self._conn.execute("SELECT COALESCE(MAX(passage_id), 0) + 1 FROM passage_texts").fetchone()[0]
+            ids = range(first_id, first_id + len(passages))
+            self._conn.executemany("INSERT INTO passage_texts (passage_id, doc_id, text) VALUES (?, ?, ?)",
+                                   [(i, doc_id, passage) for i, passage in zip(ids, passages)])
+            self._conn.executemany("INSERT INTO passages (rowid, body) VALUES (?, ?)",
+                                   [(i, fold_diacritics(passage)) for i, passage in zip(ids, passages)])
+            # Từ vựng dùng để mở rộng truy vấn tiền tố
+            terms = set(_WORD.findall(fold_diacritics(text).lower()))
+            self._conn.executemany("INSERT OR IGNORE INTO search_terms (term) VALUES (?)",
+                                   [(term,) for term in terms])
+        logger.debug(f"Đã lập chỉ mục tìm kiếm cho {name}: {len(passages)} đoạn")
+        return len(passages)
+
+    def remove_document(self, doc_hash: str):
+        """Xóa tài liệu khỏi chỉ mục
+
+        Args:
+            doc_hash: Mã băm của tài liệu
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT doc_id FROM search_documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("DELETE FROM passages WHERE rowid IN "
+                               "(SELECT passage_id FROM passage_texts WHERE doc_id = ?)", (row[0],))
+            self._conn.execute("DELETE FROM passage_texts WHERE doc_id = ?", (row[0],))
+            self._conn.execute("DELETE FROM search_documents WHERE doc_id = ?", (row[0],))
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """Các từ trong chỉ mục bắt đầu bằng tiền tố, theo thứ tự từ điển
+
+        Truy vấn tiền tố của FTS5 phải gộp toàn bộ danh sách đoạn của mọi từ
+        khớp, kể cả khi chỉ cần vài đoạn mới nhất; phép OR trên các từ cụ thể
+        thì đọc dần từng đoạn như truy vấn thường.
+        """
+        rows = self._conn.execute(
+            "SELECT term FROM search_terms WHERE term >= ? AND term < ? ORDER BY term LIMIT ?",
+            (prefix, prefix + "\U0010ffff", self.max_prefix_terms)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, query: str, limit: int = 10, snippet_words: int = 30) -> List[Dict[str, Any]]:
+        """Tìm các tài liệu chứa truy vấn, mỗi tài liệu lấy đoạn khớp tốt nhất
+
+        Args:
+            query: Truy vấn (từ, "cụm từ", tiền tố*)
+            limit: Số tài liệu tối đa
+            snippet_words: Số từ tối đa của mỗi đoạn trích
+
+        Returns:
+            Danh sách dict gồm doc_hash, name, score (BM25, càng lớn càng liên quan),
+            snippet và highlights (vị trí các từ khớp trong snippet), theo điểm giảm dần
+        """
+        with self._lock:
+            match_query = build_match_query(query, self._expand_prefix)
+            if not match_query:
+                return []
+
+            # Chỉ tính điểm BM25 cho các đoạn khớp mới nhất (theo rowid, không cần sắp xếp), nên độ trễ
+            # không tăng theo số đoạn chứa từ rất phổ biến; với từ ít gặp mọi đoạn khớp đều được xếp hạng.
+            # Mỗi tài liệu chỉ giữ đoạn có điểm cao nhất, chọn ngay trong truy vấn qua JOIN với passage_texts
+            try:
+                rows = self._conn.execute(
+                    "SELECT passage_texts.doc_id, ranked.rowid, MIN(ranked.rank) FROM ("
+                    "SELECT rowid, bm25(passages) AS rank FROM passages WHERE passages MATCH ? "
+                    "ORDER BY rowid DESC LIMIT ?) AS ranked "
+                    "JOIN passage_texts ON passage_texts.passage_id = ranked.rowid "
+                    "GROUP BY passage_texts.doc_id ORDER BY 3, 2 DESC LIMIT ?",
+                    (match_query, self.max_ranked, limit)
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Truy vấn tìm kiếm không hợp lệ '{query}': {str(e)}")
+                return []
+            best: Dict[int, Tuple[int, float]] = {doc_id: (passage_id, rank) for doc_id, passage_id, rank in rows}
+            if not best:
+                return []
+
+            # highlight() chỉ được tính cho các đoạn sẽ hiển thị
+            passage_ids = [passage_id for passage_id, _ in best.values()]
+            placeholders = ",".join("?" * len(passage_ids))
+            marked = dict(self._conn.execute(
+                f"SELECT rowid, highlight(passages, 0, ?, ?) FROM passages "
+                f"WHERE passages MATCH ? AND rowid IN ({placeholders})",
+                (_MARK_START, _MARK_END, match_query, *passage_ids)
+            ).fetchall())
+
+            results = []
+            for doc_id, (passage_id, rank) in best.items():
+                doc_hash, name = self._conn.execute(
+                    "SELECT doc_hash, name FROM search_documents WHERE doc_id = ?", (doc_id,)
+                ).fetchone()
+                text = self._conn.execute(
+                    "SELECT text FROM passage_texts WHERE passage_id = ?", (passage_id,)
+                ).fetchone()[0]
+                result = {"doc_hash": doc_hash, "name": name, "score": -rank}
+                result.update(_make_snippet(text, _marked_spans(marked.get(passage_id, "")), snippet_words))
+                results.append(result)
+        return results
+
+    def optimize(self):
+        """Gộp các segment của chỉ mục FTS5 thành một để truy vấn nhanh hơn"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO passages (passages) VALUES ('optimize')")
+
+    def close(self):
+        """Đóng kết nối SQLite"""
+        with self._lock:
+            self._conn.close()
+
+def get_search_index() -> Optional[SearchIndex]:
+    """Lấy chỉ mục tìm kiếm dùng chung trong tiến trình
+
+    Returns:
+        Chỉ mục hoặc None nếu tìm kiếm bị tắt
+    """
+    global _search_index
+    if not SEARCH_CONFIG.get("enabled", True):
+        return None
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = SearchIndex(
+                SEARCH_CONFIG["db_path"],
+                passage_words=SEARCH_CONFIG.get("passage_words", 200),
+                max_ranked=SEARCH_CONFIG.get("max_ranked_passages", 5000),
+                max_prefix_terms=SEARCH_CONFIG.get("max_prefix_terms", 64)
+            )
+        return _search_index
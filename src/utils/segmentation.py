@@ -0,0 +1,100 @@
+"""Module tách câu dùng chung cho tóm tắt, hỏi đáp, thống kê và biểu đồ
+
+Văn bản chỉ được quét một lần để xác định vị trí các câu; kết quả được cache
+theo văn bản nên các module khác nhau dùng lại cùng một kết quả thay vì tự
+tách câu theo cách riêng.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterator, List
+
+import numpy as np
+
+# Một câu bắt đầu từ ký tự khác khoảng trắng và kết thúc ở dấu câu (kèm dấu
+# ngoặc/nháy đóng) đứng trước khoảng trắng, ở dòng trống ngăn cách đoạn văn,
+# hoặc ở cuối văn bản. Dấu chấm giữa số như "3.5" không kết thúc câu.
+# Mẫu được viết dạng "unrolled" (chỉ một lần quét, không lùi) và không bao giờ
+# kết thúc bằng khoảng trắng, nên vị trí trả về đã loại khoảng trắng bao quanh.
+_SENTENCE_PATTERN = re.compile(
+    r"\S(?:"
+    r"[^.!?…\n]*[^\s.!?…]"                        # các từ trên cùng dòng
+    r"|[.!?…]+(?![\"'”’)\]]*(?:\s|$))"            # dấu câu không kết thúc câu
+    r"|[^\S\n]*\n(?=[^\S\n]*\S)"                  # xuống dòng đơn (không phải dòng trống)
+    r"|[^\S\n]+(?=\S)"                            # khoảng trắng giữa các từ
+    r")*(?:[.!?…]+[\"'”’)\]]*)?"                  # dấu câu kết thúc
+)
+
+# Số văn bản gần nhất được giữ kết quả tách câu
+SEGMENTATION_CACHE_SIZE = 32
+
+# Vị trí câu đã tính từ trước (ví dụ đọc từ kho tài liệu), dùng thay cho việc quét lại văn bản
+_preloaded_spans: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_preloaded_lock = threading.Lock()
+
+def preload_sentence_spans(text: str, spans: np.ndarray):
+    """Cung cấp vị trí câu đã tính sẵn cho văn bản, lần tách câu tiếp theo không phải quét lại
+
+    Args:
+        text: Văn bản
+        spans: Mảng (số câu, 2) đã tính bởi sentence_spans
+    """
+    with _preloaded_lock:
+        _preloaded_spans[text] = spans
+        while len(_preloaded_spans) > SEGMENTATION_CACHE_SIZE:
+            _preloaded_spans.popitem(last=False)
+
+@lru_cache(maxsize=SEGMENTATION_CACHE_SIZE)
+def sentence_spans(text: str) -> np.ndarray:
+    """Xác định vị trí các câu trong văn bản
+
+    Args:
+        text: Văn bản cần tách câu
+
+    Returns:
+        Mảng chỉ đọc kích thước (số câu, 2) gồm vị trí bắt đầu và kết thúc của
+        từng câu trong text (không tính khoảng trắng bao quanh)
+    """
+    with _preloaded_lock:
+        spans = _preloaded_spans.pop(text, None)
+    if spans is None:
+        spans = np.array([match.span() for match in _SENTENCE_PATTERN.finditer(text)], dtype=np.int64)
+    spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+    spans.setflags(write=False)
+    return spans
+
+def count_sentences(text: str) -> int:
+    """Đếm số câu trong văn bản
+
+    Args:
+        text: Văn bản
+
+    Returns:
+        Số câu
+    """
+    return len(sentence_spans(text))
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Sinh lần lượt các câu của văn bản, chỉ cắt chuỗi khi cần
+
+    Args:
+        text: Văn bản
+
+    Yields:
+        Các câu theo thứ tự
+    """
+    for start, end in sentence_spans(text).tolist():
+        yield text[start:end]
+
+def get_sentences(text: str) -> List[str]:
+    """Lấy danh sách các câu của văn bản
+
+    Args:
+        text: Văn bản
+
+    Returns:
+        Danh sách các câu
+    """
+    return list(iter_sentences(text))
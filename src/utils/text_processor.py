@@ -3,9 +3,14 @@
 import re
 import string
 import logging
-from typing import List, Dict, Tuple, Set, Optional
+from typing import Any, List, Dict, Tuple, Set, Optional
 from collections import Counter
 
+import numpy as np
+
+from src.utils.document import get_document
+from src.utils.segmentation import count_sentences, get_sentences
+
 # Thiết lập logging
 logger = logging.getLogger(__name__)
 
@@ -35,10 +40,7 @@ def split_into_sentences(text: str) -> List[str]:
     Returns:
         Danh sách các câu
     """
-    # Mẫu regex cơ bản để tách câu
-    sentence_endings = r'(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s'
-    sentences = re.split(sentence_endings, text)
-    return [s.strip() for s in sentences if s.strip()]
+    return get_sentences(text)
 
 def extract_keywords(text: str, num_keywords: int = 10) -> List[str]:
     """Trích xuất từ khóa từ văn bản
@@ -84,13 +86,9 @@ def calculate_readability(text: str) -> Dict[str, float]:
     Returns:
         Từ điển chứa các chỉ số đánh giá
     """
-    # Tách câu và từ
-    sentences = split_into_sentences(text)
-    words = text.split()
-
-    # Đếm số câu, từ, ký tự
-    num_sentences = len(sentences)
-    num_words = len(words)
+    # Số từ lấy từ tài liệu đã tách từ, số câu lấy từ kết quả tách câu dùng chung
+    num_sentences = count_sentences(text)
+    num_words = get_document(text).word_count
     num_chars = len(text)
 
     if num_sentences == 0 or num_words == 0:
@@ -126,14 +124,31 @@ def find_similar_sentences(text: str, query: str, top_n: int = 3) -> List[str]:
     """
     # Tách văn bản thành các câu
     sentences = split_into_sentences(text)
-"""Module xử lý và phân tích văn bản"""
+    if not sentences:
+        return []
 
-import re
-import logging
-from typing import Dict, Any, List, Tuple
+    # Tách query thành từ và loại bỏ stopwords
+    query_words = set(query.lower().split())
+    stopwords = {'và', 'là', 'của', 'có', 'trong', 'cho', 'không', 'được', 'các'}
+    query_words = {w for w in query_words if w not in stopwords and len(w) > 1}
 
-# Thiết lập logging
-logger = logging.getLogger(__name__)
+    # Tính điểm tương đồng cho mỗi câu
+    scores = []
+    for sentence in sentences:
+        sentence_words = set(sentence.lower().split())
+        # Số từ chung
+        common_words = query_words.intersection(sentence_words)
+        # Điểm = số từ chung / độ dài query
+        score = len(common_words) / max(1, len(query_words))
+        scores.append((sentence, score))
+
+    # Sắp xếp theo điểm giảm dần và lấy top N
+    scores.sort(key=lambda x: x[1], reverse=True)
+    similar_sentences = [s[0] for s in scores[:top_n]]
+
+    return similar_sentences
+
+"""Module xử lý và phân tích văn bản"""
 
 def analyze_text_stats(text: str) -> Dict[str, Any]:
     """Phân tích thống kê cơ bản của văn bản
@@ -162,8 +177,7 @@ def analyze_text_stats(text: str) -> Dict[str, Any]:
     word_count = len(words)
 
     # Tính số câu
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
-    sentence_count = len(sentences)
+    sentence_count = count_sentences(text)
 
     # Tính số đoạn
     paragraphs = [p for p in text.split('\n\n') if p.strip()]
@@ -194,27 +208,26 @@ def extract_keywords(text: str, max_keywords: int = 10) -> List[str]:
     Returns:
         Danh sách các từ khóa
     """
-    # Xử lý văn bản
-    words = text.lower().split()
+    # Tần suất theo từ vựng chữ thường của tài liệu (id theo thứ tự xuất hiện đầu tiên)
+    document = get_document(text)
+    vocabulary = document.vocabulary
+    counts = document.frequencies()
 
     # Loại bỏ stopwords
     stopwords = {'và', 'là', 'của', 'có', 'trong', 'cho', 'không', 'được', 'các', 'với',
                 'những', 'để', 'này', 'một', 'về', 'đã', 'như', 'khi', 'từ', 'tới',
                 'theo', 'trên', 'tại', 'đến', 'bởi', 'cũng', 'vì', 'đây', 'còn', 'nên'}
 
-    filtered_words = [word for word in words if word not in stopwords and len(word) > 2]
-
-    # Đếm tần suất
-    word_counts = {}
-    for word in filtered_words:
-        if word in word_counts:
-            word_counts[word] += 1
-        else:
-            word_counts[word] = 1
+    candidates = np.fromiter(
+        (word not in stopwords and len(word) > 2 for word in vocabulary),
+        dtype=bool,
+        count=len(vocabulary)
+    )
+    candidate_ids = np.flatnonzero(candidates)
 
-    # Sắp xếp và lấy top N
-    sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
-    keywords = [word for word, count in sorted_words[:max_keywords]]
+    # Sắp xếp ổn định theo tần suất giảm dần và lấy top N
+    order = np.argsort(-counts[candidate_ids], kind="stable")[:max_keywords]
+    keywords = [vocabulary[i] for i in candidate_ids[order].tolist()]
 
     return keywords
 
@@ -228,16 +241,14 @@ def get_readability_score(text: str) -> Tuple[float, str]:
         Tuple gồm điểm số và mô tả
     """
     # Tính số từ
-    words = text.split()
-    word_count = len(words)
+    document = get_document(text)
+    word_count = document.word_count
 
     # Tính số câu
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
-    sentence_count = max(1, len(sentences))
+    sentence_count = max(1, count_sentences(text))
 
     # Tính số từ phức tạp (giả sử từ > 7 ký tự là phức tạp)
-    complex_words = [word for word in words if len(word) > 7]
-    complex_word_count = len(complex_words)
+    complex_word_count = int((document.token_lengths > 7).sum())
 
     # Tỷ lệ từ phức tạp
     complex_ratio = complex_word_count / max(1, word_count)
@@ -262,29 +273,6 @@ def get_readability_score(text: str) -> Tuple[float, str]:
         level = "Rất khó đọc"
 
     return score, level
-    if not sentences:
-        return []
-
-    # Tách query thành từ và loại bỏ stopwords
-    query_words = set(query.lower().split())
-    stopwords = {'và', 'là', 'của', 'có', 'trong', 'cho', 'không', 'được', 'các'}
-    query_words = {w for w in query_words if w not in stopwords and len(w) > 1}
-
-    # Tính điểm tương đồng cho mỗi câu
-    scores = []
-    for sentence in sentences:
-        sentence_words = set(sentence.lower().split())
-        # Số từ chung
-        common_words = query_words.intersection(sentence_words)
-        # Điểm = số từ chung / độ dài query
-        score = len(common_words) / max(1, len(query_words))
-        scores.append((sentence, score))
-
-    # Sắp xếp theo điểm giảm dần và lấy top N
-    scores.sort(key=lambda x: x[1], reverse=True)
-    similar_sentences = [s[0] for s in scores[:top_n]]
-
-    return similar_sentences
 
 def analyze_text_stats(text: str) -> Dict[str, any]:
     """Phân tích thống kê văn bản
@@ -308,24 +296,23 @@ def analyze_text_stats(text: str) -> Dict[str, any]:
 
     # Tách văn bản
     paragraphs = [p for p in text.split('\n') if p.strip()]
-    sentences = split_into_sentences(text)
-    words = text.split()
+    document = get_document(text)
     characters = len(text)
 
     # Tính toán
-    word_count = len(words)
-    sentence_count = len(sentences)
+    word_count = document.word_count
+    sentence_count = count_sentences(text)
     paragraph_count = len(paragraphs)
 
     # Độ dài trung bình
-    avg_word_length = sum(len(word) for word in words) / max(1, word_count)
+    avg_word_length = float(document.token_lengths.sum()) / max(1, word_count)
     avg_sentence_length = word_count / max(1, sentence_count)
 
     # Độ dễ đọc
     readability = calculate_readability(text)
 
     # Từ khóa
-    keywords = extract_keywords(text, num_keywords=10)
+    keywords = extract_keywords(text, max_keywords=10)
 
     return {
         "char_count": characters,
@@ -1,20 +1,278 @@
-import requests
-from bs4 import BeautifulSoup
+"""Module trích xuất nội dung từ website
 
-def scrape_url(url):
+Các URL được tải đồng thời bằng asyncio và một phiên aiohttp dùng chung
+(connection pool), có giới hạn số kết nối trên mỗi host, thử lại với thời
+gian chờ tăng dần và đọc nội dung theo luồng để dừng ngay khi vượt quá
+SCRAPER_CONFIG["max_content_size"]. Văn bản được trích xuất bằng
+src.utils.html_extractor theo SCRAPER_CONFIG["extraction_mode"] và lưu trong
+cache HTTP (src.utils.http_cache) để không phải tải lại trang chưa thay đổi.
+"""
+
+import asyncio
+import logging
+import random
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiohttp
+
+from src.config import SCRAPER_CONFIG
+from src.utils.html_extractor import extract_page
+from src.utils.http_cache import HTTPCache, get_http_cache
+from src.utils.progress import ProgressCallback, report_progress
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Mã trạng thái HTTP tạm thời, nên thử lại
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Kích thước mỗi lần đọc nội dung phản hồi
+READ_CHUNK_SIZE = 64 * 1024
+
+class ScrapeError(Exception):
+    """Lỗi khi tải một URL"""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None,
+                 status: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.status = status
+
+def create_session(per_host_limit: Optional[int] = None) -> aiohttp.ClientSession:
+    """Tạo phiên aiohttp với connection pool giới hạn theo SCRAPER_CONFIG
+
+    Phiên phải được tạo và dùng bên trong một event loop đang chạy.
+
+    Args:
+        per_host_limit: Số kết nối tối đa tới cùng một host, None để dùng SCRAPER_CONFIG["per_host_limit"]
+
+    Returns:
+        Phiên aiohttp
+    """
+    connector = aiohttp.TCPConnector(
+        limit=SCRAPER_CONFIG.get("max_concurrency", 16),
+        limit_per_host=per_host_limit or SCRAPER_CONFIG.get("per_host_limit", 4),
+        ttl_dns_cache=300
+    )
+    timeout = aiohttp.ClientTimeout(total=SCRAPER_CONFIG.get("timeout", 15))
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Đọc header Retry-After dạng số giây"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+async def _download_once(session: aiohttp.ClientSession, url: str,
+                         validators: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Tải nội dung một URL một lần
+
+    Args:
+        session: Phiên aiohttp
+        url: URL cần tải
+        validators: Header If-None-Match/If-Modified-Since cho request có điều kiện
+
+    Returns:
+        Dict gồm status, url (sau chuyển hướng), body (bytes, rỗng nếu 304), charset và headers
+
+    Raises:
+        ScrapeError: Khi phản hồi lỗi, sai loại nội dung hoặc quá lớn
+    """
+    max_size = SCRAPER_CONFIG.get("max_content_size", 10 * 1024 * 1024)
+    headers = {"User-Agent": random.choice(SCRAPER_CONFIG["user_agents"])}
+    headers.update(validators or {})
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304:
+            return {"status": 304, "url": str(response.url), "body": b"", "charset": None,
+                    "headers": response.headers.copy()}
+        if response.status in RETRY_STATUSES:
+            raise ScrapeError(f"HTTP {response.status}", retryable=True,
+                              retry_after=_retry_after(response.headers.get("Retry-After")), status=response.status)
+        if response.status >= 400:
+            raise ScrapeError(f"HTTP {response.status} {response.reason}", status=response.status)
+
+        content_type = response.headers.get("Content-Type", "").lower()
+        for blocked in SCRAPER_CONFIG.get("blocked_content_types", []):
+            if content_type.startswith(blocked):
+                raise ScrapeError(f"Không hỗ trợ loại nội dung {content_type}")
+
+        if response.content_length is not None and response.content_length > max_size:
+            raise ScrapeError(f"Nội dung quá lớn ({response.content_length} byte, tối đa {max_size} byte)")
+
+        # Đọc theo luồng và dừng ngay khi vượt quá giới hạn, kể cả khi không có Content-Length
+        body = bytearray()
+        async for block in response.content.iter_chunked(READ_CHUNK_SIZE):
+            body.extend(block)
+            if len(body) > max_size:
+                raise ScrapeError(f"Nội dung quá lớn (vượt quá {max_size} byte)")
+
+        return {"status": response.status, "url": str(response.url), "body": bytes(body),
+                "charset": response.charset, "headers": response.headers.copy()}
+
+async def download(session: aiohttp.ClientSession, url: str,
+                   validators: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Tải nội dung một URL, thử lại lỗi tạm thời với thời gian chờ tăng dần
+
+    Args:
+        session: Phiên aiohttp dùng chung
+        url: URL cần tải
+        validators: Header If-None-Match/If-Modified-Since cho request có điều kiện
+
+    Returns:
+        Dict gồm status, url (sau chuyển hướng), body (bytes, rỗng nếu 304), charset và headers
+
+    Raises:
+        ScrapeError: Khi không tải được sau số lần thử lại tối đa
+    """
+    max_retries = SCRAPER_CONFIG.get("max_retries", 3)
+    backoff = SCRAPER_CONFIG.get("backoff_base", 0.5)
+
+    for attempt in range(max_retries + 1):
+        status = None
+        try:
+            return await _download_once(session, url, validators)
+        except ScrapeError as e:
+            error, retryable, retry_after, status = str(e), e.retryable, e.retry_after, e.status
+        except aiohttp.InvalidURL as e:
+            error, retryable, retry_after = f"URL không hợp lệ {e}", False, None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error, retryable, retry_after = str(e) or type(e).__name__, True, None
+        except Exception as e:
+            error, retryable, retry_after = str(e) or type(e).__name__, False, None
+
+        if not retryable or attempt == max_retries:
+            break
+        delay = retry_after if retry_after is not None else backoff * (2 ** attempt) * (1 + random.random())
+        logger.warning(f"Lỗi khi tải {url} (lần {attempt + 1}): {error}, thử lại sau {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    raise ScrapeError(error, status=status)
+
+async def fetch_page(session: aiohttp.ClientSession, url: str,
+                     executor: Optional[Executor] = None) -> Dict[str, Any]:
+    """Lấy văn bản và liên kết của một trang, qua cache HTTP nếu được bật
+
+    Entry còn hạn được dùng ngay; entry hết hạn được kiểm tra lại bằng request
+    có điều kiện. Nếu không tải được trang, entry hết hạn vẫn được dùng. Việc
+    đọc/ghi cache và trích xuất HTML chạy trong nhóm luồng để không chặn event
+    loop khi trang lớn.
+
+    Args:
+        session: Phiên aiohttp dùng chung
+        url: URL cần tải
+        executor: Nhóm luồng chạy phần đọc/ghi cache và trích xuất, None để dùng nhóm mặc định của event loop
+
+    Returns:
+        Dict gồm url (sau chuyển hướng), text và links
+
+    Raises:
+        ScrapeError: Khi không tải được trang và không có entry trong cache
+    """
+    loop = asyncio.get_running_loop()
+    mode = SCRAPER_CONFIG.get("extraction_mode", "readability")
+    cache = get_http_cache()
+    entry = await loop.run_in_executor(executor, cache.lookup, url, mode) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        cache.record_fresh_hit()
+        return entry
+
+    try:
+        response = await download(session, url, HTTPCache.validators(entry) if entry is not None else None)
+    except ScrapeError as e:
+        if entry is None:
+            raise
+        logger.warning(f"Không tải được {url} ({str(e)}), dùng bản đã lưu trong cache")
+        cache.record_stale_served()
+        return entry
+
+    if response["status"] == 304 and entry is not None:
+        return await loop.run_in_executor(executor, cache.refresh, url, mode, entry, response["headers"])
+
+    def extract() -> Dict[str, Any]:
+        page = extract_page(response["body"], response["charset"], mode)
+        page = {"url": response["url"], "text": page["text"], "links": page["links"]}
+        if cache is not None:
+            page = cache.save(url, mode, page, response["headers"])
+        return page
+
+    return await loop.run_in_executor(executor, extract)
+
+async def fetch_url(session: aiohttp.ClientSession, url: str, executor: Optional[Executor] = None) -> str:
+    """Tải một URL và trích xuất văn bản
+
+    Args:
+        session: Phiên aiohttp dùng chung
+        url: URL cần tải
+        executor: Nhóm luồng chạy phần trích xuất (fetch_page)
+
+    Returns:
+        Văn bản của trang hoặc thông báo lỗi
+    """
+    try:
+        return (await fetch_page(session, url, executor))["text"]
+    except ScrapeError as e:
+        logger.error(f"Không tải được {url}: {str(e)}")
+        return f"Lỗi khi truy cập URL: {str(e)}"
+
+async def scrape_urls_async(urls: Sequence[str], session: Optional[aiohttp.ClientSession] = None,
+                            progress_callback: Optional[ProgressCallback] = None) -> List[str]:
+    """Tải đồng thời nhiều URL
+
+    Args:
+        urls: Danh sách URL
+        session: Phiên aiohttp dùng chung, None để tạo phiên mới cho lần gọi này
+        progress_callback: Hàm nhận (số URL đã xong, tổng số URL)
+
+    Returns:
+        Văn bản hoặc thông báo lỗi của từng URL, theo thứ tự đầu vào
+    """
+    if session is None:
+        async with create_session() as own_session:
+            return await scrape_urls_async(urls, own_session, progress_callback)
+
+    done = 0
+
+    async def fetch(url: str) -> str:
+        nonlocal done
+        result = await fetch_url(session, url)
+        done += 1
+        report_progress(progress_callback, done, len(urls))
+        return result
+
+    return list(await asyncio.gather(*(fetch(url) for url in urls)))
+
+def scrape_urls(urls: Sequence[str], progress_callback: Optional[ProgressCallback] = None) -> List[str]:
+    """Tải đồng thời nhiều URL từ code đồng bộ
+
+    Nếu luồng hiện tại đã có event loop đang chạy, việc tải được chạy trong
+    một luồng riêng với event loop mới.
+
+    Args:
+        urls: Danh sách URL
+        progress_callback: Hàm nhận (số URL đã xong, tổng số URL)
+
+    Returns:
+        Văn bản hoặc thông báo lỗi của từng URL, theo thứ tự đầu vào
+    """
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        return f"Lỗi khi truy cập URL: {e}"
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(scrape_urls_async(urls, progress_callback=progress_callback))
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, scrape_urls_async(urls, progress_callback=progress_callback)).result()
 
-    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-        tag.decompose()
+def scrape_url(url: str) -> str:
+    """Trích xuất văn bản từ một URL
 
-    text = soup.get_text(separator=" ")
-    lines = [line.strip() for line in text.splitlines()]
-    text_cleaned =" ".join([line for line in lines if line])
+    Args:
+        url: URL cần tải
 
-    return text_cleaned
\ No newline at end of file
+    Returns:
+        Văn bản của trang hoặc thông báo lỗi
+    """
+    return scrape_urls([url])[0]
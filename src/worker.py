@@ -0,0 +1,233 @@
+"""Worker xử lý hàng đợi công việc chạy nền
+
+Ví dụ:
+
+    python -m src.worker --processes 2
+
+Mỗi tiến trình worker lần lượt nhận công việc từ hàng đợi (src.utils.job_queue),
+chạy và ghi kết quả vào kho tài liệu, chỉ mục tìm kiếm và chỉ mục hỏi đáp. Giao
+diện Streamlit tự gửi việc vào hàng đợi khi có worker đang chạy và cập nhật
+trạng thái cho tới khi công việc xong. Các worker, giao diện và src.batch ghi
+chung kho nhiều tài liệu: CorpusIndex khóa thư mục kho giữa các tiến trình và
+đọc thêm tài liệu do tiến trình khác thêm trước mỗi lần tìm kiếm.
+
+Các loại công việc:
+    ingest_file: trích xuất file đã upload (payload: path, name)
+    ingest_url: tải một trang hoặc thu thập nhiều trang (payload: url, crawl, max_pages, max_depth)
+    summarize: tóm tắt tài liệu trong kho (payload: doc_hash, length)
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import JOB_CONFIG, MODEL_CONFIG
+from src.core.qa import add_to_corpus, get_retriever
+from src.core.summarizer import summarize
+from src.utils.crawler import crawl_text
+from src.utils.document_store import get_document_store, summary_params
+from src.utils.file_loader import load_file
+from src.utils.job_queue import CANCELLED, JobCancelled, JobQueue, get_job_queue, worker_name
+from src.utils.search_index import get_search_index
+from src.utils.web_scraper import scrape_url
+
+# Thiết lập logging
+logger = logging.getLogger(__name__)
+
+# Khoảng thời gian tối thiểu (giây) giữa hai lần ghi tiến độ vào hàng đợi
+PROGRESS_INTERVAL = 0.5
+
+class JobError(Exception):
+    """Công việc không thành công, thông báo được hiển thị cho người dùng"""
+
+def store_document(text: str, name: str) -> str:
+    """Lưu tài liệu vào kho và lập các chỉ mục (tìm kiếm, hỏi đáp, kho nhiều tài liệu)
+
+    Args:
+        text: Văn bản của tài liệu
+        name: Tên hiển thị (tên file hoặc URL)
+
+    Returns:
+        Mã băm của tài liệu
+    """
+    store = get_document_store()
+    if store is None:
+        raise JobError("Kho tài liệu đang tắt (STORE_CONFIG), không lưu được kết quả")
+    doc_hash = store.add(text, name)
+
+    search_index = get_search_index()
+    if search_index is not None:
+        search_index.add_document(doc_hash, name, text)
+
+    # Chỉ mục BM25 được lưu trong thư mục của tài liệu, giao diện chỉ cần mở lại
+    chunk_size = MODEL_CONFIG["qa"]["max_length"]
+    get_retriever(text, chunk_size, store.path(doc_hash, f"bm25-c{chunk_size}"))
+    if MODEL_CONFIG["qa"]["corpus"].get("enabled"):
+        add_to_corpus(text, name, chunk_size)
+    return doc_hash
+
+def _check_text(text: str) -> str:
+    if not text or text.startswith("Lỗi"):
+        raise JobError(text or "Lỗi: Không có nội dung")
+    return text
+
+def ingest_file(payload: Dict[str, Any], progress: Callable[[int, int], None]) -> Dict[str, Any]:
+    """Trích xuất file đã upload rồi lưu vào kho"""
+    with open(payload["path"], "rb") as f:
+        text = _check_text(load_file(f, progress_callback=progress))
+    doc_hash = store_document(text, payload["name"])
+    # Văn bản đã nằm trong kho (và cache trích xuất), không cần giữ file upload
+    try:
+        os.unlink(payload["path"])
+    except OSError:
+        pass
+    return {"doc_hash": doc_hash}
+
+def ingest_url(payload: Dict[str, Any], progress: Callable[[int, int], None]) -> Dict[str, Any]:
+    """Tải một trang hoặc thu thập nhiều trang cùng website rồi lưu vào kho"""
+    if payload.get("crawl"):
+        text = crawl_text(payload["url"], payload.get("max_pages"), payload.get("max_depth"), progress)
+    else:
+        text = scrape_url(payload["url"])
+    doc_hash = store_document(_check_text(text), payload["url"])
+    return {"doc_hash": doc_hash}
+
+def summarize_document(payload: Dict[str, Any], progress: Callable[[int, int], None]) -> Dict[str, Any]:
+    """Tóm tắt tài liệu trong kho, dùng lại bản tóm tắt đã có với cùng cấu hình"""
+    store = get_document_store()
+    text = store.text(payload["doc_hash"]) if store is not None else None
+    if text is None:
+        raise JobError("Không tìm thấy tài liệu trong kho")
+
+    params = summary_params(payload["length"])
+    if store.get(payload["doc_hash"], "summary", params) is None:
+        summary = summarize(text, payload["length"], progress_callback=progress)
+        if summary.startswith("Đã xảy ra lỗi"):
+            raise JobError(summary)
+        store.put(payload["doc_hash"], "summary", summary, params)
+    return {"doc_hash": payload["doc_hash"], "length": payload["length"]}
+
+# Hàm xử lý theo loại công việc
+HANDLERS: Dict[str, Callable[[Dict[str, Any], Callable[[int, int], None]], Dict[str, Any]]] = {
+    "ingest_file": ingest_file,
+    "ingest_url": ingest_url,
+    "summarize": summarize_document,
+}
+
+def run_job(queue: JobQueue, job: Dict[str, Any]):
+    """Chạy một công việc đã nhận và ghi kết quả vào hàng đợi
+
+    Args:
+        queue: Hàng đợi
+        job: Công việc (JobQueue.claim)
+    """
+    last_update = 0.0
+
+    def progress(done: int, total: int):
+        nonlocal last_update
+        now = time.monotonic()
+        if now - last_update < PROGRESS_INTERVAL and done < total:
+            return
+        last_update = now
+        if queue.update_progress(job["id"], done, total):
+            raise JobCancelled()
+
+    started = time.perf_counter()
+    try:
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            raise JobError(f"Không hỗ trợ loại công việc {job['kind']}")
+        result = handler(job["payload"], progress)
+    except JobCancelled:
+        logger.info(f"Công việc {job['id']} đã bị hủy")
+        queue.fail(job["id"], "Đã hủy", status=CANCELLED)
+    except JobError as e:
+        logger.warning(f"Công việc {job['id']} ({job['kind']}) không thành công: {str(e)}")
+        queue.fail(job["id"], str(e))
+    except Exception as e:
+        logger.exception(f"Lỗi khi chạy công việc {job['id']} ({job['kind']})")
+        queue.fail(job["id"], f"Đã xảy ra lỗi khi xử lý: {str(e)}")
+    else:
+        queue.complete(job["id"], result)
+        logger.info(f"Hoàn thành công việc {job['id']} ({job['kind']}) trong {time.perf_counter() - started:.1f}s")
+
+def run_worker(worker_id: Optional[str] = None, stop: Optional[threading.Event] = None,
+               max_jobs: Optional[int] = None):
+    """Vòng lặp của một worker: nhận việc, chạy, ghi nhịp tim
+
+    Args:
+        worker_id: Mã worker, mặc định theo máy và tiến trình
+        stop: Sự kiện để dừng worker sau công việc hiện tại
+        max_jobs: Dừng sau số công việc này (None để chạy mãi)
+    """
+    queue = get_job_queue()
+    if queue is None:
+        raise SystemExit("Hàng đợi công việc đang tắt (JOB_CONFIG['enabled'])")
+    worker_id = worker_id or worker_name()
+    stop = stop or threading.Event()
+    current_job: List[Optional[int]] = [None]
+
+    # Nhịp tim chạy trong luồng riêng để công việc dài (một lần gọi mô hình) không bị coi là đã dừng
+    def beat():
+        interval = JOB_CONFIG.get("heartbeat_interval", 5)
+        while not stop.wait(interval):
+            queue.heartbeat(worker_id, current_job[0])
+
+    threading.Thread(target=beat, daemon=True).start()
+    logger.info(f"Worker {worker_id} bắt đầu nhận việc")
+    processed = 0
+    try:
+        while not stop.is_set() and (max_jobs is None or processed < max_jobs):
+            queue.heartbeat(worker_id)
+            job = queue.claim(worker_id)
+            if job is None:
+                stop.wait(JOB_CONFIG.get("poll_interval", 1.0))
+                continue
+            current_job[0] = job["id"]
+            run_job(queue, job)
+            current_job[0] = None
+            processed += 1
+    finally:
+        stop.set()
+        queue.unregister_worker(worker_id)
+        logger.info(f"Worker {worker_id} dừng sau {processed} công việc")
+
+def _worker_process():
+    try:
+        run_worker()
+    except KeyboardInterrupt:
+        pass
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.worker",
+        description="Chạy các worker xử lý công việc nền (trích xuất, tải website, tóm tắt)"
+    )
+    parser.add_argument("-p", "--processes", type=int, default=JOB_CONFIG.get("workers", 2),
+                        help="Số tiến trình worker")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        try:
+            run_worker()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Mỗi tiến trình mở kết nối SQLite và mô hình của riêng nó
+    processes = [multiprocessing.Process(target=_worker_process) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join(timeout=10)
+
+if __name__ == "__main__":
+    main()
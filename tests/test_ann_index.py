@@ -0,0 +1,74 @@
+"""Kiểm thử kho tài liệu src.core.ann_index.CorpusIndex khi nhiều nơi mở cùng thư mục"""
+
+import multiprocessing
+
+import numpy as np
+
+from src.core.ann_index import CorpusIndex
+from src.core.vector_store import HashingEmbedder
+
+def chunks(doc: int, count: int = 3):
+    return [f"tài liệu {doc} đoạn {i} nội dung riêng {doc * 100 + i}" for i in range(count)]
+
+def assert_aligned(corpus: CorpusIndex):
+    """Hàng thứ i của chỉ mục phải là vector của đoạn thứ i trong entries.jsonl"""
+    assert len(corpus.entries) == corpus.index.size
+    expected = corpus.embedder.embed([entry["text"] for entry in corpus.entries])
+    assert np.allclose(expected, corpus.index.vectors)
+
+def test_sees_documents_added_by_another_instance(tmp_path):
+    embedder = HashingEmbedder(dim=32)
+    first = CorpusIndex(tmp_path, embedder, min_train_size=12)
+    second = CorpusIndex(tmp_path, embedder, min_train_size=12)
+
+    for doc in range(3):
+        first.add_document(f"a{doc}", f"a{doc}.pdf", chunks(doc))
+    assert len(second) == 3
+    # Chỉ mục được huấn luyện khi đủ 12 đoạn, tính cả các đoạn do kho kia ghi
+    second.add_document("b", "b.pdf", chunks(3))
+    assert second.index.trained
+    assert len(first) == 4 and first.index.trained
+    assert first.search(chunks(3)[1], top_k=1)[0]["doc_id"] == "b"
+    assert second.add_document("a0", "a0.pdf", chunks(0)) == 0
+    assert_aligned(first)
+    assert_aligned(second)
+
+def test_partial_write_is_dropped(tmp_path):
+    embedder = HashingEmbedder(dim=32)
+    corpus = CorpusIndex(tmp_path, embedder)
+    corpus.add_document("a", "a.pdf", chunks(0))
+
+    # Tiến trình ghi dừng giữa chừng: mô tả đoạn đã ghi một phần, vector ghi dở
+    with open(tmp_path / CorpusIndex.ENTRIES_FILE, "ab") as f:
+        f.write(b'{"doc_id": "x", "name": "x.pdf", "chunk": 0, "text": "x"}\n{"doc_id": "x", "na')
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(b"\0" * 10)
+
+    reopened = CorpusIndex(tmp_path, embedder)
+    assert len(reopened) == 1 and reopened.index.size == 3
+    reopened.add_document("b", "b.pdf", chunks(1))
+    assert len(corpus) == 2
+    assert_aligned(corpus)
+    assert_aligned(CorpusIndex(tmp_path, embedder))
+
+def _add_documents(directory: str, worker: int):
+    """Một tiến trình worker thêm tài liệu vào kho dùng chung"""
+    corpus = CorpusIndex(directory, HashingEmbedder(dim=32), min_train_size=40)
+    for doc in range(10):
+        corpus.add_document(f"{worker}-{doc}", f"{worker}-{doc}.pdf", chunks(worker * 10 + doc))
+
+def test_concurrent_worker_processes(tmp_path):
+    # Như src.worker: nhiều tiến trình cùng ghi vào kho, mỗi tiến trình mở kho riêng
+    viewer = CorpusIndex(tmp_path, HashingEmbedder(dim=32), min_train_size=40)
+    processes = [multiprocessing.Process(target=_add_documents, args=(str(tmp_path), worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    # Tiến trình giao diện thấy tài liệu do worker thêm mà không cần khởi động lại
+    assert len(viewer) == 40 and viewer.index.trained
+    assert viewer.search(chunks(25)[2], top_k=1)[0]["doc_id"] == "2-5"
+    assert_aligned(viewer)
+    assert_aligned(CorpusIndex(tmp_path, HashingEmbedder(dim=32)))
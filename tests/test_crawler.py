@@ -0,0 +1,46 @@
+"""Kiểm thử thu thập website của src.utils.crawler với máy chủ HTTP cục bộ"""
+
+import asyncio
+import random
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.config import CACHE_CONFIG
+from src.utils.crawler import crawl_text
+
+LINKS = [f"/trang-{i}" for i in range(8)]
+
+def site_app():
+    """Trang đầu liên kết tới 8 trang con, mỗi trang trả về sau một khoảng trễ ngẫu nhiên"""
+    rng = random.Random()
+
+    async def index(request):
+        links = "".join(f'<a href="{link}">{link}</a>' for link in LINKS)
+        return web.Response(text=f"<html><body><p>Trang chủ của website.</p>{links}</body></html>",
+                            content_type="text/html")
+
+    async def page(request):
+        await asyncio.sleep(rng.random() * 0.05)
+        name = request.match_info["name"]
+        return web.Response(text=f"<html><body><p>Nội dung của {name}.</p></body></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", index)
+    app.router.add_get("/{name}", page)
+    return app
+
+def test_crawl_text_is_deterministic(monkeypatch):
+    # Tắt cache HTTP để mỗi lần thu thập đều tải lại và hoàn thành theo thứ tự khác nhau
+    monkeypatch.setitem(CACHE_CONFIG, "http_enabled", False)
+
+    async def run():
+        async with TestServer(site_app()) as server:
+            loop = asyncio.get_running_loop()
+            url = str(server.make_url("/"))
+            return [await loop.run_in_executor(None, crawl_text, url, 20, 1) for _ in range(3)]
+
+    texts = asyncio.run(run())
+    assert texts[0].startswith("Trang chủ của website.")
+    assert all(f"Nội dung của trang-{i}." in texts[0] for i in range(8))
+    assert texts[0] == texts[1] == texts[2]
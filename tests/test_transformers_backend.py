@@ -0,0 +1,104 @@
+"""Kiểm thử backend tóm tắt transformers trên CPU với một mô hình BART rất nhỏ
+
+Mô hình có trọng số ngẫu nhiên được tạo cục bộ trong thư mục tạm, nên kiểm
+thử chạy được trên máy chỉ có CPU và không cần mạng. Bỏ qua khi chưa cài
+transformers/torch.
+"""
+
+import shutil
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+from src.config import MODEL_CONFIG
+from src.core import summarizer
+from src.core.summarizer import LENGTH_CONFIG, TransformersBackend
+
+TEXT = ("Doanh thu của công ty tăng mạnh trong quý ba nhờ mở rộng thị trường xuất khẩu. "
+        "Chi phí vận hành giảm sau khi tự động hóa dây chuyền sản xuất. "
+        "Ban lãnh đạo dự kiến lợi nhuận cả năm vượt kế hoạch đề ra.")
+
+SPECIAL_TOKENS = ["<pad>", "<s>", "</s>", "<unk>"]
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """Lưu một mô hình BART và tokenizer rất nhỏ, trả về đường dẫn thư mục"""
+    directory = tmp_path_factory.mktemp("tiny-bart")
+    words = sorted(set(TEXT.lower().replace(".", " .").split()))
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS + words)}
+
+    backend = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="<unk>"))
+    backend.normalizer = tokenizers.normalizers.Lowercase()
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.WhitespaceSplit()
+    backend.decoder = tokenizers.decoders.WordPiece()
+    tokenizer = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=backend, pad_token="<pad>", bos_token="<s>", eos_token="</s>",
+        unk_token="<unk>", model_max_length=512
+    )
+
+    config = transformers.BartConfig(
+        vocab_size=len(vocab), d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32,
+        max_position_embeddings=512, pad_token_id=0, bos_token_id=1, eos_token_id=2,
+        decoder_start_token_id=2, forced_bos_token_id=None, forced_eos_token_id=None
+    )
+    torch.manual_seed(0)
+    transformers.BartForConditionalGeneration(config).save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    return str(directory)
+
+@pytest.fixture(scope="module")
+def backend(tiny_model):
+    return TransformersBackend(tiny_model, use_gpu=False, batch_size=2)
+
+def generated_tokens(backend: TransformersBackend, summary: str) -> int:
+    return len(backend.tokenizer(summary, add_special_tokens=False)["input_ids"])
+
+def test_runs_on_cpu(backend):
+    assert backend.device == "cpu"
+    # Mô hình không đặt max_length trong generation_config nên độ dài chỉ theo LENGTH_CONFIG
+    assert backend.max_output_length is None
+
+def test_summarize_batch(backend):
+    texts = [TEXT, TEXT.upper(), TEXT[:80]]
+    summaries = backend.summarize_batch(texts, LENGTH_CONFIG["short"])
+    assert len(summaries) == len(texts)
+    assert all(isinstance(summary, str) and summary for summary in summaries)
+    budget = int(LENGTH_CONFIG["short"]["max_length"] * TransformersBackend.TOKENS_PER_WORD)
+    assert all(generated_tokens(backend, summary) <= budget for summary in summaries)
+    # Giải mã tham lam: kết quả theo lô giống kết quả từng đoạn
+    assert summaries[0] == backend.summarize(TEXT, LENGTH_CONFIG["short"])
+
+def test_stream_matches_summarize(backend):
+    pieces = list(backend.stream(TEXT, LENGTH_CONFIG["short"]))
+    assert pieces
+    assert "".join(pieces).strip() == backend.summarize(TEXT, LENGTH_CONFIG["short"])
+
+def test_generation_config_caps_length(tiny_model, tmp_path):
+    # Mô hình đặt max_length trong generation_config (như bart-large-cnn) giới hạn độ dài sinh ra
+    directory = tmp_path / "capped"
+    shutil.copytree(tiny_model, directory)
+    transformers.GenerationConfig(max_length=12, decoder_start_token_id=2).save_pretrained(directory)
+    capped = TransformersBackend(str(directory), use_gpu=False)
+    assert capped.max_output_length == 12
+    summary = capped.summarize(TEXT, LENGTH_CONFIG["long"])
+    assert generated_tokens(capped, summary) <= 12
+
+def test_summarize_stream_pipeline(tiny_model, monkeypatch):
+    monkeypatch.setitem(MODEL_CONFIG["summarization"], "backend", "transformers")
+    monkeypatch.setitem(MODEL_CONFIG["summarization"], "model_name", tiny_model)
+    monkeypatch.setitem(MODEL_CONFIG["summarization"], "use_gpu", False)
+    monkeypatch.setattr(summarizer, "_backends", {})
+
+    events = list(summarizer.summarize_stream(TEXT, "short"))
+    assert events[-1]["type"] == "done"
+    assert any(event["type"] == "token" for event in events)
+    # Nếu bản tóm tắt còn dài hơn max_length, cấp reduce sau sinh lại bản mới sau các token
+    # của bản trước, nên các token cuối cùng là bản tóm tắt cuối
+    tokens = "".join(event["text"] for event in events if event["type"] == "token")
+    assert tokens.strip().endswith(events[-1]["summary"])
+    assert events[-1]["summary"] == summarizer.summarize(TEXT, "short")
+    assert events[-1]["time_to_first_output"] <= events[-1]["total_seconds"]
@@ -0,0 +1,182 @@
+"""Kiểm thử tải trang của src.utils.web_scraper với máy chủ HTTP cục bộ"""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.config import SCRAPER_CONFIG
+from src.utils import web_scraper
+from src.utils.http_cache import HTTPCache
+from src.utils.web_scraper import ScrapeError, create_session, download, fetch_page
+
+PAGE = "<html><body><p>Nội dung trang thử nghiệm.</p></body></html>"
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    """Thử lại nhanh và không có phần ngẫu nhiên trong thời gian chờ"""
+    monkeypatch.setitem(SCRAPER_CONFIG, "max_retries", 3)
+    monkeypatch.setitem(SCRAPER_CONFIG, "backoff_base", 0.05)
+    monkeypatch.setattr(web_scraper.random, "random", lambda: 0.0)
+
+def flaky_app(status: int, failures: int, headers=None):
+    """Máy chủ trả về lỗi tạm thời `failures` lần rồi trả về trang, ghi lại thời điểm mỗi request"""
+    arrivals = []
+
+    async def handler(request):
+        arrivals.append(time.monotonic())
+        if len(arrivals) <= failures:
+            return web.Response(status=status, headers=headers or {})
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    return app, arrivals
+
+async def fetch(server: TestServer, path: str = "/"):
+    async with create_session() as session:
+        return await download(session, str(server.make_url(path)))
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retry_after_is_honoured(status, monkeypatch):
+    # Thời gian chờ theo backoff rất dài, nên chỉ Retry-After mới cho phép thử lại sớm
+    monkeypatch.setitem(SCRAPER_CONFIG, "backoff_base", 30)
+    app, arrivals = flaky_app(status, failures=2, headers={"Retry-After": "0.2"})
+
+    async def run():
+        async with TestServer(app) as server:
+            return await fetch(server)
+
+    response = asyncio.run(run())
+    assert response["status"] == 200
+    assert response["body"].decode("utf-8") == PAGE
+    assert len(arrivals) == 3
+    gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+    assert all(0.2 <= gap < 5 for gap in gaps)
+
+def test_exponential_backoff():
+    app, arrivals = flaky_app(503, failures=3)
+
+    async def run():
+        async with TestServer(app) as server:
+            return await fetch(server)
+
+    assert asyncio.run(run())["status"] == 200
+    gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+    # backoff_base * 2^lần thử: 0.05, 0.1, 0.2 giây
+    assert len(gaps) == 3
+    assert all(gap >= 0.05 * 2 ** attempt for attempt, gap in enumerate(gaps))
+
+def test_gives_up_after_max_retries():
+    app, arrivals = flaky_app(503, failures=100)
+
+    async def run():
+        async with TestServer(app) as server:
+            return await fetch(server)
+
+    with pytest.raises(ScrapeError) as info:
+        asyncio.run(run())
+    assert info.value.status == 503
+    assert len(arrivals) == SCRAPER_CONFIG["max_retries"] + 1
+
+def test_client_error_is_not_retried():
+    app, arrivals = flaky_app(404, failures=100)
+
+    async def run():
+        async with TestServer(app) as server:
+            return await fetch(server)
+
+    with pytest.raises(ScrapeError):
+        asyncio.run(run())
+    assert len(arrivals) == 1
+
+def test_per_host_concurrency_cap():
+    active = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{page}", handler)
+
+    async def run():
+        async with TestServer(app) as server, create_session(per_host_limit=2) as session:
+            urls = [str(server.make_url(f"/{i}")) for i in range(12)]
+            return await asyncio.gather(*(download(session, url) for url in urls))
+
+    responses = asyncio.run(run())
+    assert all(response["status"] == 200 for response in responses)
+    assert peak == 2
+
+def test_oversized_stream_is_aborted(monkeypatch):
+    monkeypatch.setitem(SCRAPER_CONFIG, "max_content_size", 100 * 1024)
+    sent = 0
+
+    async def handler(request):
+        # Không có Content-Length: nội dung được gửi từng khối và không bao giờ kết thúc
+        nonlocal sent
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        while True:
+            await response.write(b"x" * 16 * 1024)
+            sent += 16 * 1024
+            await asyncio.sleep(0.001)
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+
+    async def run():
+        async with TestServer(app) as server:
+            return await asyncio.wait_for(fetch(server), timeout=10)
+
+    with pytest.raises(ScrapeError, match="quá lớn"):
+        asyncio.run(run())
+    assert sent < 10 * SCRAPER_CONFIG["max_content_size"]
+
+def test_declared_oversized_body_is_rejected(monkeypatch):
+    monkeypatch.setitem(SCRAPER_CONFIG, "max_content_size", 1024)
+
+    async def handler(request):
+        return web.Response(body=b"x" * 4096, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+
+    async def run():
+        async with TestServer(app) as server:
+            return await fetch(server)
+
+    with pytest.raises(ScrapeError, match="quá lớn"):
+        asyncio.run(run())
+
+def test_cache_write_failure_does_not_fail_fetch(tmp_path, monkeypatch):
+    # Tiến trình khác dùng chung thư mục cache xóa entry đúng lúc đang ghi
+    cache = HTTPCache(tmp_path, max_bytes=1024 * 1024)
+
+    def evicted(key, value):
+        raise FileNotFoundError(2, "No such file or directory")
+
+    monkeypatch.setattr(cache.store, "put", evicted)
+    monkeypatch.setattr(web_scraper, "get_http_cache", lambda: cache)
+
+    async def handler(request):
+        return web.Response(text=PAGE, content_type="text/html", headers={"Cache-Control": "max-age=60"})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+
+    async def run():
+        async with TestServer(app) as server, create_session() as session:
+            return await fetch_page(session, str(server.make_url("/")))
+
+    assert "Nội dung trang thử nghiệm" in asyncio.run(run())["text"]
+    assert cache.stats()["fetched"] == 1